@@ -13,6 +13,11 @@ from datetime import datetime
 ALLOWED_MODULES = {
     "math", "cmath", "decimal", "fractions", "random", "statistics", "itertools", "functools", "operator", "string", "re", "datetime", "calendar", "time", "collections", "heapq", "bisect", "types", "copy", "enum", "uuid", "dataclasses", "typing", "pprint", "json", "base64", "hashlib", "hmac", "secrets", "struct", "zlib", "gzip", "bz2", "lzma", "io", "pathlib", "tempfile", "textwrap", "difflib", "unicodedata", "html", "html.parser", "xml", "xml.etree.ElementTree", "csv", "sqlite3", "contextlib", "traceback", "ast", "tokenize", "token", "builtins"
 }
+SAFE_BUILTINS = ("range", "len", "int", "float", "str", "list", "dict", "print", "sum", "__import__", "isinstance", "hasattr")
+SCOPE_VIOLATIONS = (
+    "completed_steps", "execution_result", "previous_step", "step_result",
+    "session", "plan_versions", "current_plan"
+)
 MAX_FUNCTIONS = 5
 TIMEOUT_PER_FUNCTION = 500  # seconds
 
@@ -56,7 +61,7 @@ def build_safe_globals(mcp_funcs: dict, multi_mcp=None) -> dict:
     safe_globals = {
         "__builtins__": {
             k: getattr(builtins, k)
-            for k in ("range", "len", "int", "float", "str", "list", "dict", "print", "sum", "__import__", "isinstance", "hasattr")
+            for k in SAFE_BUILTINS
         },
         **mcp_funcs,
     }
@@ -81,6 +86,42 @@ def build_safe_globals(mcp_funcs: dict, multi_mcp=None) -> dict:
     return safe_globals
 
 
+# ───────────────────────────────────────────────────────────────
+# STATIC VALIDATION
+# ───────────────────────────────────────────────────────────────
+def validate_code(code: str, tool_names) -> str | None:
+    """Check code against the sandbox rules without running it. Returns an error or None."""
+    cleaned_code = textwrap.dedent(code.strip())
+    if not cleaned_code:
+        return "Empty code"
+    for violation in SCOPE_VIOLATIONS:
+        if violation in cleaned_code:
+            return f"Variable scope violation: '{violation}'"
+    try:
+        tree = ast.parse(cleaned_code)
+    except SyntaxError as e:
+        return f"Syntax error: {e}"
+
+    func_count = sum(isinstance(node, ast.Call) for node in ast.walk(tree))
+    if func_count > MAX_FUNCTIONS:
+        return f"Too many functions ({func_count} > {MAX_FUNCTIONS})"
+
+    defined = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            defined.add(node.name)
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            defined.add(node.id)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            defined.update((alias.asname or alias.name).split(".")[0] for alias in node.names)
+    known = set(tool_names) | set(SAFE_BUILTINS) | ALLOWED_MODULES | defined | {"parallel", "final_answer"}
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id not in known:
+            return f"Unknown function '{node.func.id}'"
+    return None
+
+
 # ───────────────────────────────────────────────────────────────
 # MAIN EXECUTOR
 # ───────────────────────────────────────────────────────────────
@@ -109,12 +150,7 @@ async def run_user_code(code: str, multi_mcp) -> dict:
         cleaned_code = textwrap.dedent(code.strip())
         
         # Check for common variable scope violations before parsing
-        scope_violations = [
-            "completed_steps", "execution_result", "previous_step", "step_result",
-            "session", "plan_versions", "current_plan"
-        ]
-        
-        for violation in scope_violations:
+        for violation in SCOPE_VIOLATIONS:
             if violation in cleaned_code:
                 return {
                     "status": "error",
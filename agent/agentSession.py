@@ -1,23 +1,67 @@
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field, fields
 from typing import Any, Literal, Optional
 import uuid
 import time
 import json
 
-@dataclass
-class ToolCode:
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder is the fallback
+    orjson = None
+
+
+def dumps(obj: Any) -> str:
+    """Compact JSON text, via orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits (large factorials); json handles them
+    return json.dumps(obj)
+
+
+class _Memoized:
+    """
+    Cached serialization for slotted dataclasses: any attribute assignment drops the
+    cached dict/JSON text, so unchanged objects serialize for free. The cached dicts
+    are shared, so treat to_dict() results as read-only.
+    """
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name not in ("_dict", "_text"):
+            object.__setattr__(self, "_dict", None)
+
+    def to_json_text(self) -> str:
+        d = self.to_dict()
+        if self._text is None or self._text[0] is not d:
+            object.__setattr__(self, "_text", (d, dumps(d)))
+        return self._text[1]
+
+
+@dataclass(slots=True)
+class ToolCode(_Memoized):
     tool_name: str
     tool_arguments: dict[str, Any]
+    _dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    _text: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
 
     def to_dict(self):
-        return {
-            "tool_name": self.tool_name,
-            "tool_arguments": self.tool_arguments
-        }
+        if self._dict is None:
+            object.__setattr__(self, "_dict", {
+                "tool_name": self.tool_name,
+                "tool_arguments": self.tool_arguments
+            })
+        return self._dict
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "ToolCode":
+        return cls(tool_name=d["tool_name"], tool_arguments=d["tool_arguments"])
 
 
-@dataclass
-class PerceptionSnapshot:
+@dataclass(slots=True)
+class PerceptionSnapshot(_Memoized):
     entities: list[str]
     result_requirement: str
     original_goal_achieved: bool
@@ -27,9 +71,31 @@ class PerceptionSnapshot:
     last_tooluse_summary: str
     solution_summary: str
     confidence: str
+    _dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    _text: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+
+    def to_dict(self):
+        if self._dict is None:
+            object.__setattr__(self, "_dict", {
+                "entities": self.entities,
+                "result_requirement": self.result_requirement,
+                "original_goal_achieved": self.original_goal_achieved,
+                "reasoning": self.reasoning,
+                "local_goal_achieved": self.local_goal_achieved,
+                "local_reasoning": self.local_reasoning,
+                "last_tooluse_summary": self.last_tooluse_summary,
+                "solution_summary": self.solution_summary,
+                "confidence": self.confidence
+            })
+        return self._dict
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "PerceptionSnapshot":
+        return cls(**{k: d[k] for k in _PERCEPTION_FIELDS})
+
 
-@dataclass
-class Step:
+@dataclass(slots=True)
+class Step(_Memoized):
     index: int
     description: str
     type: Literal["CODE", "CONCLUDE", "NOOP"]
@@ -42,25 +108,49 @@ class Step:
     attempts: int = 0
     was_replanned: bool = False
     parent_index: Optional[int] = None
+    _dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    _text: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
 
     def to_dict(self):
-        return {
-            "index": self.index,
-            "description": self.description,
-            "type": self.type,
-            "code": self.code.to_dict() if self.code else None,
-            "conclusion": self.conclusion,
-            "execution_result": self.execution_result,
-            "error": self.error,
-            "perception": self.perception.__dict__ if self.perception else None,
-            "status": self.status,
-            "attempts": self.attempts,
-            "was_replanned": self.was_replanned,
-            "parent_index": self.parent_index
-        }
+        code = self.code.to_dict() if self.code else None
+        perception = self.perception.to_dict() if self.perception else None
+        cached = self._dict
+        # Rebuilt only when this step or its code/perception changed since the last call
+        if cached is None or cached["code"] is not code or cached["perception"] is not perception:
+            cached = {
+                "index": self.index,
+                "description": self.description,
+                "type": self.type,
+                "code": code,
+                "conclusion": self.conclusion,
+                "execution_result": self.execution_result,
+                "error": self.error,
+                "perception": perception,
+                "status": self.status,
+                "attempts": self.attempts,
+                "was_replanned": self.was_replanned,
+                "parent_index": self.parent_index
+            }
+            object.__setattr__(self, "_dict", cached)
+        return cached
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Step":
+        """Inverse of to_dict(), for steps restored from a stored session."""
+        return cls(**{
+            **{k: d[k] for k in _STEP_FIELDS if k in d},
+            "code": ToolCode.from_dict(d["code"]) if d.get("code") else None,
+            "perception": PerceptionSnapshot.from_dict(d["perception"]) if d.get("perception") else None,
+        })
+
+
+_PERCEPTION_FIELDS = [f.name for f in fields(PerceptionSnapshot) if f.init]
+_STEP_FIELDS = [f.name for f in fields(Step) if f.init]
 
 
 class AgentSession:
+    __slots__ = ("session_id", "original_query", "perception", "plan_versions", "state", "checkpoint")
+
     def __init__(self, session_id: str, original_query: str):
         self.session_id = session_id
         self.original_query = original_query
@@ -74,6 +164,8 @@ class AgentSession:
             "solution_summary": ""
             
         }
+        # Loop counters and failure memory at the last safe point; logged for resume, not part of to_json()
+        self.checkpoint: Optional[dict[str, Any]] = None
 
     def add_perception(self, snapshot: PerceptionSnapshot):
         self.perception = snapshot
@@ -94,23 +186,45 @@ class AgentSession:
         return {
             "session_id": self.session_id,
             "original_query": self.original_query,
-            "perception": asdict(self.perception) if self.perception else None,
+            "perception": self.perception.to_dict() if self.perception else None,
             "plan_versions": [
                 {
                     "plan_text": p["plan_text"],
-                    "steps": [asdict(s) for s in p["steps"]]
+                    "steps": [s.to_dict() for s in p["steps"]]
                 } for p in self.plan_versions
             ],
             "state_snapshot": self.get_snapshot_summary()
         }
 
+    @classmethod
+    def from_json(cls, data: dict) -> "AgentSession":
+        """
+        Rebuild a session from its to_json() form (or a replayed event log). The state is
+        taken from data["state"] when present, otherwise from the state snapshot.
+        """
+        session = cls(session_id=data["session_id"], original_query=data["original_query"])
+        if data.get("perception"):
+            session.perception = PerceptionSnapshot.from_dict(data["perception"])
+        session.plan_versions = [
+            {
+                "plan_text": p["plan_text"],
+                "steps": [Step.from_dict(s) for s in p["steps"] if s]
+            } for p in data.get("plan_versions", [])
+        ]
+        snapshot = data.get("state_snapshot") or {}
+        session.state.update(data.get("state") or {
+            k: snapshot[k] for k in ("final_answer", "confidence", "reasoning_note") if k in snapshot
+        })
+        session.checkpoint = data.get("checkpoint")
+        return session
+
     def get_snapshot_summary(self):
         return {
             "session_id": self.session_id,
             "query": self.original_query,
             "final_plan": self.plan_versions[-1]["plan_text"] if self.plan_versions else [],
            "final_steps": [
-                    asdict(s)
+                    s.to_dict()
                     for version in self.plan_versions
                     for s in version["steps"]
                     if s.status == "completed"
@@ -139,7 +253,7 @@ class AgentSession:
 
         if self.perception:
             print("\n[Perception 0] Initial ERORLL:")
-            print(f"  {asdict(self.perception)}")
+            print(f"  {self.perception.to_dict()}")
             time.sleep(delay)
 
         for i, version in enumerate(self.plan_versions):
@@ -163,7 +277,7 @@ class AgentSession:
                     print(f"  Error: {step.error}")
                 if step.perception:
                     print("  Perception ERORLL:")
-                    for k, v in asdict(step.perception).items():
+                    for k, v in step.perception.to_dict().items():
                         print(f"    {k}: {v}")
                 print(f"  Status: {step.status}")
                 if step.was_replanned:
@@ -1,15 +1,20 @@
 import uuid
 import json
+import asyncio
 import datetime
 import time
-import os
 from perception.perception import Perception
 from decision.decision import Decision
+from decision.fused import FusedPerceptionDecision
 from action.executor import run_user_code
 from agent.agentSession import AgentSession, PerceptionSnapshot, Step, ToolCode
-from memory.session_log import live_update_session
-from memory.memory_search import MemorySearch
+from agent.checkpoint import Checkpoint, checkpoint_state, load_checkpoint
+from agent.context import AgentContext, current_context
+from memory.session_log import live_update_session, compact_session_log, resume_session_log, release_session_log
+from memory.memory_search import get_shared_memory_search
 from mcp_servers.multiMCP import MultiMCP
+from llm.cache import get_shared_cache
+from llm.cascade import ModelCascade, load_cascade
 
 
 GLOBAL_PREVIOUS_FAILURE_STEPS = 3
@@ -17,77 +22,76 @@ MAX_STEPS = 3  # Assignment requirement: Maximum steps per session
 MAX_RETRIES = 3
 
 class AgentLoop:
-    def __init__(self, perception_prompt_path: str, decision_prompt_path: str, multi_mcp: MultiMCP, strategy: str = "exploratory"):
-        self.perception = Perception(perception_prompt_path)
-        self.decision = Decision(decision_prompt_path, multi_mcp)
+    def __init__(self, perception_prompt_path: str, decision_prompt_path: str, multi_mcp: MultiMCP, strategy: str = "exploratory",
+                 use_llm_cache: bool = True, stream_decisions: bool = False, fused_prompt_path: str | None = None,
+                 pre_router=None, llm_provider=None, cascade: ModelCascade | None = None,
+                 structured_output: bool = False, interactive: bool = True):
+        # One response cache shared by perception and decision; disable for non-deterministic runs
+        # (and never fill it from an offline mock/fake provider)
+        use_llm_cache = use_llm_cache and (llm_provider is None or llm_provider.cacheable)
+        self.llm_cache = get_shared_cache() if use_llm_cache else None
+        # Model cascade (cheap tier first) from the argument or profiles.yaml llm.cascade
+        self.cascade = cascade if cascade is not None else load_cascade(llm_provider)
+        # llm_provider overrides the default Gemini provider (e.g. the offline fake backend)
+        # structured_output requests schema-constrained JSON instead of fenced blocks
+        self.perception = Perception(perception_prompt_path, cache=self.llm_cache, use_cache=use_llm_cache,
+                                     provider=llm_provider, cascade=self.cascade, structured_output=structured_output)
+        self.decision = Decision(decision_prompt_path, multi_mcp, cache=self.llm_cache, use_cache=use_llm_cache,
+                                 provider=llm_provider, cascade=self.cascade, structured_output=structured_output)
         self.multi_mcp = multi_mcp
         self.strategy = strategy
-        self.step_count = 0
-        self.retry_count = 0
-        self.tool_performance_log = {}
-        self.load_tool_performance_log()
-
-    def load_tool_performance_log(self):
-        """Load existing tool performance log if available"""
-        log_file = "tool_performance_log.json"
-        if os.path.exists(log_file):
-            try:
-                with open(log_file, 'r') as f:
-                    self.tool_performance_log = json.load(f)
-            except (json.JSONDecodeError, IOError, OSError) as e:
-                print(f"Warning: Could not load tool performance log: {e}")
-                self.tool_performance_log = {}
-
-    def save_tool_performance_log(self):
-        """Save tool performance log to file"""
-        log_file = "tool_performance_log.json"
-        try:
-            with open(log_file, 'w') as f:
-                json.dump(self.tool_performance_log, f, indent=2)
-        except (IOError, OSError) as e:
-            print(f"Warning: Could not save tool performance log: {e}")
+        # Streaming mode starts executing a step's code as soon as the decision emits it
+        self.stream_decisions = stream_decisions
+        self.early_executions: dict[int, asyncio.Task] = {}
+        # Fused mode answers step perception and the next decision with a single LLM call
+        self.fused = FusedPerceptionDecision(fused_prompt_path, self.perception, self.decision) if fused_prompt_path else None
+        self.pending_decisions: dict[int, dict] = {}
+        # Optional zero-LLM router (e.g. FastPathRouter) tried before the full loop
+        self.pre_router = pre_router
+        # Without a human at a terminal (e.g. the agent service) failures are not escalated to input()
+        self.interactive = interactive
+        # step_count/retry_count belong to the session running in the current task (AgentContext)
+
+    @property
+    def context(self) -> AgentContext:
+        """Execution context of the session running in the current asyncio task."""
+        ctx = current_context.get()
+        if ctx is None:
+            ctx = AgentContext(self.multi_mcp)
+            current_context.set(ctx)
+        return ctx
+
+    @property
+    def step_count(self) -> int:
+        return self.context.step_count
+
+    @step_count.setter
+    def step_count(self, value: int):
+        self.context.step_count = value
+
+    @property
+    def retry_count(self) -> int:
+        return self.context.retry_count
+
+    @retry_count.setter
+    def retry_count(self, value: int):
+        self.context.retry_count = value
+
+    @property
+    def tool_performance_log(self) -> dict:
+        """Per-tool call totals from the shared performance store (MCP tool calls and code blocks)."""
+        return self.multi_mcp.performance.totals()
 
     def log_tool_performance(self, tool_name: str, success: bool, execution_time: float, error: str = None):
-        """Log tool performance for future reference"""
-        if tool_name not in self.tool_performance_log:
-            self.tool_performance_log[tool_name] = {
-                "total_calls": 0,
-                "successful_calls": 0,
-                "failed_calls": 0,
-                "avg_execution_time": 0,
-                "last_errors": []
-            }
-        
-        log = self.tool_performance_log[tool_name]
-        log["total_calls"] += 1
-        
-        if success:
-            log["successful_calls"] += 1
-        else:
-            log["failed_calls"] += 1
-            if error:
-                log["last_errors"].append(error)
-                # Keep only last 5 errors
-                log["last_errors"] = log["last_errors"][-5:]
-        
-        # Update average execution time
-        current_avg = log["avg_execution_time"]
-        total_calls = log["total_calls"]
-        log["avg_execution_time"] = (current_avg * (total_calls - 1) + execution_time) / total_calls
-        
-        self.save_tool_performance_log()
+        """Record a code block the agent ran (its MCP tool calls are recorded by MultiMCP)"""
+        self.multi_mcp.performance.record(tool_name, "executor", success, execution_time, error)
 
     def get_tool_reliability_score(self, tool_name: str) -> float:
-        """Get reliability score for a tool (0-1)"""
-        if tool_name not in self.tool_performance_log:
+        """Get reliability score for a tool (0-1): smoothed recent success rate across its servers"""
+        smoothed = self.multi_mcp.performance.ewma(tool_name)
+        if smoothed is None:
             return 0.5  # Default score for unknown tools
-        
-        log = self.tool_performance_log[tool_name]
-        if log["total_calls"] == 0:
-            return 0.5
-        
-        success_rate = log["successful_calls"] / log["total_calls"]
-        return success_rate
+        return smoothed["success"]
 
     def human_in_loop_tool_failure(self, step: Step, session: AgentSession) -> str:
         """Handle tool failure with human intervention"""
@@ -107,6 +111,9 @@ class AgentLoop:
         print(f"\n🤖 Tool failed: {step_description}")
         print(f"Error: {execution_result}")
         print(f"Tool: {step.code.tool_name if step.code else 'Unknown'}")
+
+        if not self.interactive:
+            return "No human in the loop; tool failure left for replanning"
         
         print("\n👤 Human-in-the-Loop: Tool Failure")
         print("Please provide guidance for this tool failure:")
@@ -139,6 +146,9 @@ class AgentLoop:
             print(f"Current plan: {session.plan_versions[-1]['plan_text']}")
         else:
             print("Current plan: No plan")
+
+        if not self.interactive:
+            return {"type": "stop", "description": "No human in the loop; stopped at max steps"}
         
         print("\n👤 Human-in-the-Loop: Plan Failure")
         print("Please suggest a new plan:")
@@ -187,26 +197,68 @@ class AgentLoop:
             else:
                 print("Invalid choice. Please enter 1-4.")
 
-    async def run(self, query: str):
-        session = AgentSession(session_id=str(uuid.uuid4()), original_query=query)
-        session_memory= []
+    async def run(self, query: str, session_id: str | None = None):
+        # A fresh context per run; after `await run()` the caller still sees its counters
+        ctx = AgentContext(self.multi_mcp)
+        current_context.set(ctx)
+        try:
+            session = await self.run_session(query, session_id=session_id)
+        except BaseException:
+            if ctx.session is not None:
+                release_session_log(ctx.session)
+            raise
+        # Live updates only appended deltas; write the final snapshot once
+        compact_session_log(session)
+        return session
+
+    async def run_many(self, queries: list[str], concurrency: int = 4) -> list:
+        """
+        Run queries concurrently on this loop and its MultiMCP, at most `concurrency` at a
+        time. Sessions are returned in query order; a run that raised returns its exception.
+        Concurrent sessions cannot share the terminal, so concurrency > 1 needs interactive=False.
+        """
+        if concurrency > 1 and self.interactive:
+            raise ValueError("run_many with concurrency > 1 needs an AgentLoop built with interactive=False")
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run_one(query):
+            async with semaphore:
+                return await self.run(query)
+
+        # gather wraps each run in its own task, so each gets its own AgentContext
+        return await asyncio.gather(*(run_one(q) for q in queries), return_exceptions=True)
+
+    async def run_session(self, query: str, session_id: str | None = None):
+        if self.pre_router is not None:
+            routed_session = await self.try_pre_router(query, session_id=session_id)
+            if routed_session is not None:
+                return routed_session
+
+        session = AgentSession(session_id=session_id or str(uuid.uuid4()), original_query=query)
+        ctx = self.context
+        ctx.session = session
+        session_memory = ctx.session_memory = []
         self.log_session_start(session, query)
         
         # Reset counters for new session
         self.step_count = 0
         self.retry_count = 0
 
-        memory_results = self.search_memory(query)
-        perception_result = self.run_perception(query, memory_results, memory_results)
+        memory_results = await asyncio.to_thread(self.search_memory, query)
+        perception_result = await self.run_perception(query, memory_results, memory_results)
         session.add_perception(PerceptionSnapshot(**perception_result))
+        live_update_session(session)
 
         if perception_result.get("original_goal_achieved"):
             self.handle_perception_completion(session, perception_result)
             return session
 
-        decision_output = self.make_initial_decision(query, perception_result)
+        return await self.plan_and_run(session, query, perception_result, session_memory)
+
+    async def plan_and_run(self, session, query, perception_result, session_memory):
+        decision_output = await self.make_initial_decision(query, perception_result)
         step = session.add_plan_version(decision_output["plan_text"], [self.create_step(decision_output)])
-        live_update_session(session)
+        self.save_checkpoint(session, session_memory, "execute")
         if session.plan_versions:
             print(f"\n[Decision Plan Text: V{len(session.plan_versions)}]:")
             for line in session.plan_versions[-1]["plan_text"]:
@@ -214,13 +266,23 @@ class AgentLoop:
         else:
             print("\n[Decision Plan Text: No plan versions available]")
 
-        while step and self.step_count < MAX_STEPS:
-            step_result = await self.execute_step(step, session, session_memory)
-            if step_result is None:
-                break  # 🔐 protect against CONCLUDE/NOP cases
-            
-            self.step_count += 1
-            step = self.evaluate_step(step_result, session, query)
+        return await self.run_steps(session, query, step, session_memory)
+
+    async def run_steps(self, session, query, step, session_memory, executed_step=None):
+        """Execute/evaluate loop; executed_step (on resume) is evaluated first instead of executing step."""
+        while executed_step is not None or (step and self.step_count < MAX_STEPS):
+            if executed_step is None:
+                step_result = await self.execute_step(step, session, session_memory)
+                if step_result is None:
+                    break  # 🔐 protect against CONCLUDE/NOP cases
+
+                self.step_count += 1
+                self.save_checkpoint(session, session_memory, "evaluate")
+            else:
+                step_result, executed_step = executed_step, None
+            step = await self.evaluate_step(step_result, session, query)
+            if step is not None:
+                self.save_checkpoint(session, session_memory, "execute")
             
             # Check if we've reached max steps
             if self.step_count >= MAX_STEPS:
@@ -251,6 +313,7 @@ class AgentLoop:
                     # Add new plan version and create first step
                     new_step = session.add_plan_version(decision_output["plan_text"], [self.create_step(decision_output)])
                     self.step_count = 0  # Reset step count for new plan
+                    self.save_checkpoint(session, session_memory, "execute")
                     
                     print(f"\n[New Decision Plan Text: V{len(session.plan_versions)}]:")
                     for line in decision_output["plan_text"]:
@@ -266,6 +329,10 @@ class AgentLoop:
                     # For now, just continue with current plan
                     continue
                     
+                elif human_guidance["type"] == "stop":
+                    print(f"\n⏹️ {human_guidance['description']}")
+                    break
+
                 elif human_guidance["type"] == "new_approach":
                     # Handle new approach
                     print(f"\n🔄 New approach: {human_guidance['approach']}")
@@ -276,6 +343,77 @@ class AgentLoop:
                     print(f"\n❌ Unknown human guidance type: {human_guidance.get('type', 'unknown')}")
                     break
 
+        self.release_pending_work(session)
+        return session
+
+    def save_checkpoint(self, session, session_memory, phase):
+        """Log the loop state with the session; phase is "execute" (step planned) or "evaluate" (step ran)."""
+        session.checkpoint = checkpoint_state(session, session_memory, phase, self.step_count, self.retry_count)
+        live_update_session(session)
+
+    async def resume(self, session_id: str, base_dir: str = "memory/session_logs"):
+        """
+        Continue a session whose process died, from its last checkpoint: logged perception,
+        decisions and tool results are reused, so only unfinished work runs again.
+        """
+        checkpoint = load_checkpoint(session_id, base_dir)
+        if checkpoint is None:
+            print(f"❌ No stored session found for {session_id}")
+            return None
+        if checkpoint.phase == "finished":
+            print(f"✅ Session {session_id} already finished; nothing to resume.")
+            return checkpoint.session
+
+        current_context.set(AgentContext(self.multi_mcp, checkpoint.session, checkpoint.session_memory))
+        resume_session_log(checkpoint.session, checkpoint.events_path)
+        try:
+            session = await self.resume_session(checkpoint)
+        except BaseException:
+            release_session_log(checkpoint.session)
+            raise
+        compact_session_log(session, base_dir)
+        return session
+
+    async def resume_session(self, checkpoint: Checkpoint):
+        session = checkpoint.session
+        query = session.original_query
+        session_memory = checkpoint.session_memory
+        self.log_session_start(session, query)
+        self.step_count = checkpoint.step_count
+        self.retry_count = checkpoint.retry_count
+        print(f"⏯️ Resuming at '{checkpoint.phase}' (Step Count: {self.step_count}, Retries: {self.retry_count})")
+
+        if checkpoint.phase == "start":
+            return await self.run_session(query, session_id=session.session_id)
+
+        if checkpoint.phase == "perceived":
+            perception_result = dict(session.perception.to_dict())
+            if perception_result.get("original_goal_achieved"):
+                self.handle_perception_completion(session, perception_result)
+                return session
+            return await self.plan_and_run(session, query, perception_result, session_memory)
+
+        if checkpoint.phase == "execute":
+            return await self.run_steps(session, query, checkpoint.step, session_memory)
+
+        # evaluate: the step's tool result and perception are logged; only the next decision is pending
+        if not checkpoint.counted:
+            self.step_count += 1
+            self.remember_failure(checkpoint.step, session_memory)
+            self.save_checkpoint(session, session_memory, "evaluate")
+        return await self.run_steps(session, query, None, session_memory, executed_step=checkpoint.step)
+
+    async def try_pre_router(self, query, session_id: str | None = None):
+        """Let the pre-router answer the query directly; None means run the full loop."""
+        session = await self.pre_router.try_route(query, self.multi_mcp, session_id=session_id)
+        if session is None:
+            return None
+
+        self.context.session = session
+        self.step_count = 1
+        self.retry_count = 0
+        print(f"🔵 Fast path answer: {session.state['final_answer']}")
+        live_update_session(session)
         return session
 
     def log_session_start(self, session, query):
@@ -286,7 +424,7 @@ class AgentLoop:
 
     def search_memory(self, query):
         print("Searching Recent Conversation History")
-        searcher = MemorySearch()
+        searcher = get_shared_memory_search()
         results = searcher.search_memory(query)
         if not results:
             print("❌ No matching memory entries found.\n")
@@ -296,7 +434,7 @@ class AgentLoop:
                 print(f"[{i}] File: {res['file']}\nQuery: {res['query']}\nResult Requirement: {res['result_requirement']}\nSummary: {res['solution_summary']}\n")
         return results
 
-    def run_perception(self, query, memory_results, session_memory=None, snapshot_type="user_query", current_plan=None):
+    async def run_perception(self, query, memory_results, session_memory=None, snapshot_type="user_query", current_plan=None):
         combined_memory = (memory_results or []) + (session_memory or [])
         perception_input = self.perception.build_perception_input(
             raw_input=query, 
@@ -304,7 +442,8 @@ class AgentLoop:
             current_plan=current_plan, 
             snapshot_type=snapshot_type
         )
-        perception_result = self.perception.run(perception_input)
+        # Blocking LLM call; in a worker thread so concurrent sessions keep running
+        perception_result = await asyncio.to_thread(self.perception.run, perception_input)
         print("\n[Perception Result]:")
         print(json.dumps(perception_result, indent=2, ensure_ascii=False))
         return perception_result
@@ -320,16 +459,47 @@ class AgentLoop:
         })
         live_update_session(session)
 
-    def make_initial_decision(self, query, perception_result):
+    async def make_initial_decision(self, query, perception_result):
         decision_input = {
             "plan_mode": "initial",
             "planning_strategy": self.strategy,
             "original_query": query,
             "perception": perception_result
         }
-        decision_output = self.decision.run(decision_input)
+        decision_output = await self.decide(decision_input)
+        return decision_output
+
+    async def decide(self, decision_input):
+        """Run the decision module, streaming and executing code early when enabled."""
+        if not self.stream_decisions:
+            return await asyncio.to_thread(self.decision.run, decision_input)
+
+        early = {}
+
+        def on_code(code):
+            early["code"] = code
+            early["task"] = asyncio.create_task(run_user_code(code, self.multi_mcp))
+
+        decision_output = await self.decision.run_streaming(decision_input, on_code=on_code)
+
+        task = early.get("task")
+        if task is not None:
+            if decision_output.get("type") == "CODE" and decision_output.get("code") == early["code"]:
+                decision_output["_early_execution"] = task
+            else:
+                # The final parse disagreed with what streamed; don't trust the early run
+                task.cancel()
         return decision_output
 
+    def release_pending_work(self, session):
+        """Drop early executions and fused decisions for steps of this session that were never consumed."""
+        for version in session.plan_versions:
+            for s in version["steps"]:
+                self.pending_decisions.pop(id(s), None)
+                task = self.early_executions.pop(id(s), None)
+                if task is not None:
+                    task.cancel()
+
     def create_step(self, decision_output):
         # Handle human-provided plans that might not have all standard fields
         step_index = decision_output.get("step_index", 0)
@@ -337,6 +507,8 @@ class AgentLoop:
         step_type = decision_output.get("type", "CODE")
         code = decision_output.get("code", "# Human-provided plan")
         conclusion = decision_output.get("conclusion")
+        early_execution = decision_output.pop("_early_execution", None)
+        streamed_code = code
         
         # Fix: Generate executable code for human-provided plans
         if step_type == "CODE" and (not code or code == "# Human-provided plan"):
@@ -435,7 +607,7 @@ class AgentLoop:
             else:
                 code = "result = 'Step completed successfully'\nreturn result"
         
-        return Step(
+        step = Step(
             index=step_index,
             description=description,
             type=step_type,
@@ -443,6 +615,14 @@ class AgentLoop:
             conclusion=conclusion,
         )
 
+        if early_execution is not None:
+            if step_type == "CODE" and code == streamed_code:
+                self.early_executions[id(step)] = early_execution
+            else:
+                early_execution.cancel()
+
+        return step
+
     async def execute_step(self, step, session, session_memory):
         if step is None:
             print("\n❌ Step is None, cannot execute")
@@ -469,7 +649,12 @@ class AgentLoop:
             print("-" * 50, "\n[EXECUTING CODE]\n", step.code.tool_arguments["code"])
             
             start_time = time.time()
-            executor_response = await run_user_code(step.code.tool_arguments["code"], self.multi_mcp)
+            early_execution = self.early_executions.pop(id(step), None)
+            if early_execution is not None:
+                print("⚡ Using result of early execution started during decision streaming")
+                executor_response = await early_execution
+            else:
+                executor_response = await run_user_code(step.code.tool_arguments["code"], self.multi_mcp)
             execution_time = time.time() - start_time
             
             if hasattr(step, 'execution_result'):
@@ -508,29 +693,20 @@ class AgentLoop:
                         }
 
             current_plan = session.plan_versions[-1]["plan_text"] if session.plan_versions else []
-            perception_result = self.run_perception(
-                query=executor_response.get('result', 'Tool Failed'),
-                memory_results=session_memory,
-                current_plan=current_plan,
-                snapshot_type="step_result"
-            )
+            perception_result = None
+            if self.fused is not None:
+                perception_result = await self.run_fused(step, session, session_memory, executor_response, current_plan)
+            if perception_result is None:
+                perception_result = await self.run_perception(
+                    query=executor_response.get('result', 'Tool Failed'),
+                    memory_results=session_memory,
+                    current_plan=current_plan,
+                    snapshot_type="step_result"
+                )
             if hasattr(step, 'perception'):
                 step.perception = PerceptionSnapshot(**perception_result)
 
-            if not hasattr(step, 'perception') or step.perception is None or not step.perception.local_goal_achieved:
-                step_description = step.description if hasattr(step, 'description') and step.description else "Unknown step"
-                execution_result_str = str(step.execution_result) if hasattr(step, 'execution_result') and step.execution_result else "No execution result"
-                
-                failure_memory = {
-                    "query": step_description,
-                    "result_requirement": "Tool failed",
-                    "solution_summary": execution_result_str[:300]
-                }
-                session_memory.append(failure_memory)
-
-                if len(session_memory) > GLOBAL_PREVIOUS_FAILURE_STEPS:
-                    session_memory.pop(0)
-
+            self.remember_failure(step, session_memory)
             live_update_session(session)
             return step
 
@@ -546,7 +722,7 @@ class AgentLoop:
                 step.status = "completed"
 
             current_plan = session.plan_versions[-1]["plan_text"] if session.plan_versions else []
-            perception_result = self.run_perception(
+            perception_result = await self.run_perception(
                 query=step.conclusion,
                 memory_results=session_memory,
                 current_plan=current_plan,
@@ -569,7 +745,55 @@ class AgentLoop:
             live_update_session(session)
             return None
 
-    def evaluate_step(self, step, session, query):
+    def remember_failure(self, step, session_memory):
+        """Keep unhelpful steps (last few) as memory for the following perceptions."""
+        if not hasattr(step, 'perception') or step.perception is None or not step.perception.local_goal_achieved:
+            step_description = step.description if hasattr(step, 'description') and step.description else "Unknown step"
+            execution_result_str = str(step.execution_result) if hasattr(step, 'execution_result') and step.execution_result else "No execution result"
+            
+            failure_memory = {
+                "query": step_description,
+                "result_requirement": "Tool failed",
+                "solution_summary": execution_result_str[:300]
+            }
+            session_memory.append(failure_memory)
+
+            if len(session_memory) > GLOBAL_PREVIOUS_FAILURE_STEPS:
+                session_memory.pop(0)
+
+    async def run_fused(self, step, session, session_memory, executor_response, current_plan):
+        """Perceive the step result and pick the next step in one call; the decision is kept for evaluate_step."""
+        memory_excerpt = self.perception.build_perception_input(
+            raw_input="", memory=session_memory, current_plan=current_plan, snapshot_type="step_result"
+        )["memory_excerpt"]
+        completed_steps = [s.to_dict() for s in session.plan_versions[-1]["steps"] if s.status == "completed"] if session.plan_versions else []
+        fused_output = await asyncio.to_thread(self.fused.run, {
+            "original_query": session.original_query,
+            "planning_strategy": self.strategy,
+            "step_result": executor_response.get('result', 'Tool Failed'),
+            "memory_excerpt": memory_excerpt,
+            "current_plan_version": len(session.plan_versions),
+            "current_plan": current_plan,
+            "completed_steps": completed_steps,
+            "current_step": step.to_dict()
+        })
+        if fused_output is None:
+            return None
+
+        self.pending_decisions[id(step)] = fused_output["decision"]
+        print("\n[Perception Result (fused)]:")
+        print(json.dumps(fused_output["perception"], indent=2, ensure_ascii=False))
+        return fused_output["perception"]
+
+    async def next_decision(self, step, decision_input):
+        """Use the decision produced together with the step's perception, or ask the decision module."""
+        pending = self.pending_decisions.pop(id(step), None)
+        if pending is not None:
+            print("⚡ Using decision from fused perception call")
+            return pending
+        return await self.decide(decision_input)
+
+    async def evaluate_step(self, step, session, query):
         if step is None:
             print("\n❌ Step is None, cannot evaluate")
             return None
@@ -583,17 +807,18 @@ class AgentLoop:
             return None
             
         if step.perception.original_goal_achieved:
+            self.pending_decisions.pop(id(step), None)
             print("\n✅ Goal achieved.")
             session.mark_complete(step.perception)
             live_update_session(session)
             return None
         elif step.perception.local_goal_achieved:
-            return self.get_next_step(session, query, step)
+            return await self.get_next_step(session, query, step)
         else:
             print("\n🔁 Step unhelpful. Replanning.")
             current_plan = session.plan_versions[-1]["plan_text"] if session.plan_versions else []
             completed_steps = [s.to_dict() for s in session.plan_versions[-1]["steps"] if s.status == "completed"] if session.plan_versions else []
-            decision_output = self.decision.run({
+            decision_output = await self.next_decision(step, {
                 "plan_mode": "mid_session",
                 "planning_strategy": self.strategy,
                 "original_query": query,
@@ -610,7 +835,7 @@ class AgentLoop:
 
             return new_step
 
-    def get_next_step(self, session, query, step):
+    async def get_next_step(self, session, query, step):
         if step is None:
             print("\n❌ Step is None, cannot get next step")
             return None
@@ -628,7 +853,7 @@ class AgentLoop:
         if next_index < total_steps:
             current_plan = session.plan_versions[-1]["plan_text"] if session.plan_versions else []
             completed_steps = [s.to_dict() for s in session.plan_versions[-1]["steps"] if s.status == "completed"] if session.plan_versions else []
-            decision_output = self.decision.run({
+            decision_output = await self.next_decision(step, {
                 "plan_mode": "mid_session",
                 "planning_strategy": self.strategy,
                 "original_query": query,
@@ -646,5 +871,6 @@ class AgentLoop:
             return new_step
 
         else:
+            self.pending_decisions.pop(id(step), None)
             print("\n✅ No more steps.")
             return None
\ No newline at end of file
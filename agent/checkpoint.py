@@ -0,0 +1,95 @@
+"""
+Checkpoints for resuming an agent session after the process died.
+
+AgentLoop.save_checkpoint() stores the loop counters and failure memory on the session at
+two safe points, and the live update logs them with the session:
+
+  execute   a step was planned (its decision is paid for) and has not run yet
+  evaluate  the step ran (tool output and step perception are logged), next decision pending
+
+load_checkpoint() replays the session's event log into an AgentSession and works out where
+AgentLoop.resume() continues, so finished perception, decision and tool work is not repeated.
+A step that was still executing when the process died runs again.
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from agent.agentSession import AgentSession, Step
+from memory.session_events import EVENTS_SUFFIX, load_session_file, replay_events
+
+
+@dataclass
+class Checkpoint:
+    session: AgentSession
+    phase: str                       # start | perceived | execute | evaluate | finished
+    events_path: Optional[Path] = None
+    step: Optional[Step] = None      # the step to execute, or the executed step to evaluate
+    step_count: int = 0
+    retry_count: int = 0
+    session_memory: list[dict[str, Any]] = field(default_factory=list)
+    counted: bool = True             # False: the step ran after the last checkpoint was logged
+
+
+def checkpoint_state(session: AgentSession, session_memory: list[dict[str, Any]], phase: str,
+                     step_count: int, retry_count: int) -> dict[str, Any]:
+    """What AgentLoop.save_checkpoint() stores on session.checkpoint at a safe point (execute | evaluate)."""
+    return {
+        "phase": phase,
+        "version": len(session.plan_versions) - 1,
+        "step_count": step_count,
+        "retry_count": retry_count,
+        "session_memory": list(session_memory),
+    }
+
+
+def find_session_files(session_id: str, base_dir: str | Path = "memory/session_logs") -> tuple[Optional[Path], Optional[Path]]:
+    """(event log, compacted snapshot) of a session under YYYY/MM/DD, either may be None."""
+    base_dir = Path(base_dir)
+    events = sorted(base_dir.glob(f"[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9]/{session_id}{EVENTS_SUFFIX}"))
+    snapshots = sorted(base_dir.glob(f"[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9]/{session_id}.json"))
+    return (events[-1] if events else None), (snapshots[-1] if snapshots else None)
+
+
+def load_checkpoint(session_id: str, base_dir: str | Path = "memory/session_logs") -> Optional[Checkpoint]:
+    """Restore a session and its resume point. Returns None when nothing is stored for it."""
+    events_path, snapshot_path = find_session_files(session_id, base_dir)
+    if snapshot_path is not None and (events_path is None or snapshot_path.parent == events_path.parent):
+        # Compacted: the run ended normally (an event log left beside it is about to be unlinked)
+        return Checkpoint(AgentSession.from_json(load_session_file(snapshot_path)), "finished")
+    if events_path is None:
+        return None
+    data = replay_events(events_path, include_runtime=True)
+    if data is None:
+        return None
+
+    session = AgentSession.from_json(data)
+    checkpoint = Checkpoint(session, "start", events_path)
+    saved = session.checkpoint or {}
+    checkpoint.step_count = saved.get("step_count", 0)
+    checkpoint.retry_count = saved.get("retry_count", 0)
+    checkpoint.session_memory = list(saved.get("session_memory", []))
+
+    if session.state.get("original_goal_achieved"):
+        checkpoint.phase = "finished"
+    elif session.perception is None:
+        checkpoint.phase = "start"
+    elif not session.plan_versions or not session.plan_versions[-1]["steps"]:
+        checkpoint.phase = "perceived"
+    else:
+        step = checkpoint.step = session.plan_versions[-1]["steps"][-1]
+        version = len(session.plan_versions) - 1
+        if step.status == "pending":
+            checkpoint.phase = "execute"
+        elif step.status == "completed" and step.type == "CODE" and step.perception is not None:
+            checkpoint.phase = "evaluate"
+            # Died between logging the executed step and its "evaluate" checkpoint
+            checkpoint.counted = saved.get("phase") == "evaluate" and saved.get("version") == version
+            if not saved:
+                checkpoint.step_count = sum(
+                    1 for p in session.plan_versions for s in p["steps"] if s.status == "completed"
+                )
+                checkpoint.counted = True
+        else:
+            checkpoint.phase = "finished"  # concluded or waiting for clarification
+    return checkpoint
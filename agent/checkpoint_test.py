@@ -0,0 +1,132 @@
+import tempfile
+from pathlib import Path
+
+from agent.agentSession import AgentSession, PerceptionSnapshot, Step, ToolCode
+from agent.checkpoint import checkpoint_state, load_checkpoint
+from memory.session_events import EVENTS_SUFFIX, SessionEventLog
+
+SESSION_ID = "checkpoint-test"
+DAY = Path("2026/01/05")
+
+
+def perception(goal_achieved=False, local_goal_achieved=False, summary="Not ready yet"):
+    return PerceptionSnapshot(
+        entities=["factorial", "5"], result_requirement="factorial of 5", original_goal_achieved=goal_achieved,
+        reasoning="test", local_goal_achieved=local_goal_achieved, local_reasoning="test",
+        last_tooluse_summary="None", solution_summary=summary, confidence="0.9",
+    )
+
+
+def code_step(index):
+    return Step(index=index, description=f"Step {index}", type="CODE",
+                code=ToolCode(tool_name="raw_code_block", tool_arguments={"code": "result = factorial(5)\nreturn result"}))
+
+
+def save_checkpoint(session, session_memory, phase, step_count, retry_count=0):
+    session.checkpoint = checkpoint_state(session, session_memory, phase, step_count, retry_count)
+
+
+def crash_points():
+    """The event log text at each point the process could die, in the order AgentLoop logs them."""
+    logged = []
+    with tempfile.TemporaryDirectory() as tmp:
+        log = SessionEventLog(Path(tmp) / f"{SESSION_ID}{EVENTS_SUFFIX}")
+
+        def crash(name):
+            log.record(session)
+            logged.append((name, log.path.read_text(encoding="utf-8")))
+
+        session = AgentSession(SESSION_ID, "What is the factorial of 5?")
+        session_memory = []
+        crash("start")
+
+        session.add_perception(perception())
+        crash("perceived")
+
+        step = session.add_plan_version(["Compute factorial(5)"], [code_step(0)])
+        save_checkpoint(session, session_memory, "execute", step_count=0)
+        crash("execute")
+
+        # The step ran and its result and perception were logged, but not its "evaluate" checkpoint
+        step.execution_result = "{'status': 'error'}"
+        step.status = "completed"
+        step.perception = perception()
+        crash("evaluate_uncounted")
+
+        session_memory.append({"query": step.description, "result_requirement": "Tool failed",
+                               "solution_summary": step.execution_result})
+        save_checkpoint(session, session_memory, "evaluate", step_count=1, retry_count=1)
+        crash("evaluate")
+
+        session.add_plan_version(["Retry factorial(5)"], [code_step(1)])
+        save_checkpoint(session, session_memory, "execute", step_count=1, retry_count=1)
+        crash("execute_replanned")
+
+        done = perception(goal_achieved=True, local_goal_achieved=True, summary="120")
+        session.plan_versions[-1]["steps"][-1].status = "completed"
+        session.plan_versions[-1]["steps"][-1].perception = done
+        session.mark_complete(done)
+        save_checkpoint(session, session_memory, "evaluate", step_count=2, retry_count=1)
+        crash("finished")
+    return logged
+
+
+def checkpoint_at(base_dir: Path, text: str):
+    path = base_dir / DAY / f"{SESSION_ID}{EVENTS_SUFFIX}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return load_checkpoint(SESSION_ID, base_dir)
+
+
+def test_checkpoint_at_each_crash_point():
+    failure = [{"query": "Step 0", "result_requirement": "Tool failed", "solution_summary": "{'status': 'error'}"}]
+    expected = {
+        # crash point: (phase, step_count, retry_count, session_memory, counted, index of step to resume)
+        "start": ("start", 0, 0, [], True, None),
+        "perceived": ("perceived", 0, 0, [], True, None),
+        "execute": ("execute", 0, 0, [], True, 0),
+        "evaluate_uncounted": ("evaluate", 0, 0, [], False, 0),
+        "evaluate": ("evaluate", 1, 1, failure, True, 0),
+        "execute_replanned": ("execute", 1, 1, failure, True, 1),
+        "finished": ("finished", 2, 1, failure, True, None),
+    }
+    points = crash_points()
+    assert [name for name, _ in points] == list(expected)
+    for name, text in points:
+        with tempfile.TemporaryDirectory() as tmp:
+            checkpoint = checkpoint_at(Path(tmp), text)
+        phase, step_count, retry_count, session_memory, counted, step_index = expected[name]
+        assert checkpoint is not None, name
+        assert checkpoint.phase == phase, (name, checkpoint.phase)
+        assert checkpoint.step_count == step_count, (name, checkpoint.step_count)
+        assert checkpoint.retry_count == retry_count, (name, checkpoint.retry_count)
+        assert checkpoint.session_memory == session_memory, (name, checkpoint.session_memory)
+        assert checkpoint.counted == counted, (name, checkpoint.counted)
+        if step_index is not None:
+            assert checkpoint.step is not None and checkpoint.step.index == step_index, name
+        assert checkpoint.session.session_id == SESSION_ID
+
+
+def test_checkpoint_without_saved_counters():
+    """A log written before checkpoints were logged: step_count is rebuilt from completed steps."""
+    with tempfile.TemporaryDirectory() as tmp:
+        log = SessionEventLog(Path(tmp) / "log")
+        session = AgentSession(SESSION_ID, "What is the factorial of 5?")
+        session.add_perception(perception())
+        step = session.add_plan_version(["Compute factorial(5)"], [code_step(0)])
+        step.status, step.perception = "completed", perception()
+        log.record(session)
+        checkpoint = checkpoint_at(Path(tmp), log.path.read_text(encoding="utf-8"))
+    assert (checkpoint.phase, checkpoint.step_count, checkpoint.counted, checkpoint.session_memory) == ("evaluate", 1, True, [])
+
+
+def test_missing_session():
+    with tempfile.TemporaryDirectory() as tmp:
+        assert load_checkpoint(SESSION_ID, tmp) is None
+
+
+if __name__ == "__main__":
+    test_checkpoint_at_each_crash_point()
+    test_checkpoint_without_saved_counters()
+    test_missing_session()
+    print("✅ checkpoint tests passed")
@@ -3,6 +3,7 @@ from typing import Optional
 from pydantic import BaseModel
 import time
 import uuid
+from contextvars import ContextVar
 from datetime import datetime
 
 class StrategyProfile(BaseModel):
@@ -13,12 +14,26 @@ class StrategyProfile(BaseModel):
     max_lifelines_per_step: int
 
 class AgentContext:
+    """
+    Execution state of one agent session: the session, its failure memory and the step and
+    retry counters. AgentLoop keeps only state shared by all sessions (modules, caches,
+    MultiMCP, tool performance) and binds one context per run, so a single AgentLoop can
+    run many sessions concurrently.
+    """
     def __init__(
         self,
         mcp_context: Optional[MultiMCP] = None,
-        
+        session=None,
+        session_memory: Optional[list] = None,
     ):
 
         self.mcp_context = mcp_context
+        self.session = session
+        self.session_memory = session_memory if session_memory is not None else []
+        self.step_count = 0
+        self.retry_count = 0
+
+
+# The context of the session running in the current asyncio task (each task gets its own copy)
+current_context: ContextVar[Optional[AgentContext]] = ContextVar("agent_context", default=None)
 
-        
@@ -0,0 +1,226 @@
+import ast
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from agent.agentSession import AgentSession, PerceptionSnapshot, Step, ToolCode
+
+
+@dataclass
+class FastPathRoute:
+    tool_name: str
+    args: list[Any]
+    expression: str
+
+
+# Leading phrases that carry no meaning for routing
+FILLER_PREFIXES = (
+    "what is", "what's", "whats", "calculate", "compute", "evaluate", "find", "get",
+    "work out", "tell me", "please", "the value of", "the result of", "value of", "result of",
+)
+
+# Word operators rewritten into symbols before the arithmetic grammar runs
+WORD_OPERATORS = [
+    (r"\bto the power of\b", "**"),
+    (r"\braised to(?: the power of)?\b", "**"),
+    (r"\bmultiplied by\b", "*"),
+    (r"\btimes\b", "*"),
+    (r"\bdivided by\b", "/"),
+    (r"\bover\b", "/"),
+    (r"\bplus\b", "+"),
+    (r"\bminus\b", "-"),
+    (r"\bmodulo\b", "%"),
+    (r"\bmod\b", "%"),
+]
+
+BINARY_TOOLS = {
+    ast.Add: ("add", "+"),
+    ast.Sub: ("subtract", "-"),
+    ast.Mult: ("multiply", "*"),
+    ast.Div: ("divide", "/"),
+    ast.Pow: ("power", "**"),
+    ast.Mod: ("remainder", "%"),
+}
+
+INT = r"(-?\d+)"
+
+# Largest operands answered without the full loop; bigger ones get the LLM's sanity checks
+MAX_FACTORIAL = 1000
+MAX_EXPONENT = 10000
+MAX_FIBONACCI_TERMS = 1000
+
+
+class FastPathRouter:
+    """
+    Zero-LLM pre-router for trivially answerable math queries.
+
+    A query is matched against phrase patterns ("factorial of 5", "sum of 3 and 4", ...)
+    and a small arithmetic grammar (a single binary operation on two integers). A match
+    maps to exactly one math tool call; the result is wrapped in a normal AgentSession.
+    Anything that does not match, exceeds the operand limits, or whose tool call fails,
+    returns None so the caller runs the full perception/decision loop.
+    """
+
+    def __init__(self, max_factorial: int = MAX_FACTORIAL, max_exponent: int = MAX_EXPONENT,
+                 max_fibonacci_terms: int = MAX_FIBONACCI_TERMS):
+        # Upper bounds per tool; a route above its bound falls back to the full loop
+        self.limits: dict[str, Callable[[list[Any]], bool]] = {
+            "factorial": lambda args: abs(args[0]) <= max_factorial,
+            "power": lambda args: abs(args[1]) <= max_exponent,
+            "fibonacci_numbers": lambda args: abs(args[0]) <= max_fibonacci_terms,
+        }
+        # (pattern, builder) pairs tried in order; easy to extend like QueryHeuristics.rules
+        self.patterns: list[tuple[re.Pattern, Callable[[re.Match], FastPathRoute]]] = [
+            (re.compile(rf"^(?:the )?factorial of {INT}!?$"),
+             lambda m: FastPathRoute("factorial", [int(m[1])], f"{m[1]}!")),
+            (re.compile(rf"^{INT}\s*!$"),
+             lambda m: FastPathRoute("factorial", [int(m[1])], f"{m[1]}!")),
+            (re.compile(rf"^(?:the )?cube root of {INT}$"),
+             lambda m: FastPathRoute("cbrt", [int(m[1])], f"cbrt({m[1]})")),
+            (re.compile(rf"^(?:the )?(?:first {INT} fibonacci numbers|fibonacci (?:sequence|numbers) (?:up to|upto|for) {INT}(?: numbers| terms)?)$"),
+             lambda m: FastPathRoute("fibonacci_numbers", [int(m[1] or m[2])], f"fibonacci({m[1] or m[2]})")),
+            (re.compile(rf"^(?:the )?sum of {INT} and {INT}$"),
+             lambda m: FastPathRoute("add", [int(m[1]), int(m[2])], f"{m[1]} + {m[2]}")),
+            (re.compile(rf"^add {INT} (?:and|to) {INT}$"),
+             lambda m: FastPathRoute("add", [int(m[1]), int(m[2])], f"{m[1]} + {m[2]}")),
+            (re.compile(rf"^(?:the )?difference between {INT} and {INT}$"),
+             lambda m: FastPathRoute("subtract", [int(m[1]), int(m[2])], f"{m[1]} - {m[2]}")),
+            (re.compile(rf"^subtract {INT} from {INT}$"),
+             lambda m: FastPathRoute("subtract", [int(m[2]), int(m[1])], f"{m[2]} - {m[1]}")),
+            (re.compile(rf"^(?:the )?product of {INT} and {INT}$"),
+             lambda m: FastPathRoute("multiply", [int(m[1]), int(m[2])], f"{m[1]} * {m[2]}")),
+            (re.compile(rf"^multiply {INT} (?:and|by) {INT}$"),
+             lambda m: FastPathRoute("multiply", [int(m[1]), int(m[2])], f"{m[1]} * {m[2]}")),
+            (re.compile(rf"^(?:the )?remainder of {INT} (?:divided by|/) {INT}$"),
+             lambda m: FastPathRoute("remainder", [int(m[1]), int(m[2])], f"{m[1]} % {m[2]}")),
+        ]
+
+    def normalize(self, query: str) -> str:
+        # Trailing punctuation goes, except the "!" of a factorial like "5!"
+        text = re.sub(r"(?:[?.\s]|(?<!\d)!)+$", "", query.strip().lower())
+        changed = True
+        while changed:
+            changed = False
+            for prefix in FILLER_PREFIXES:
+                if text.startswith(prefix + " "):
+                    text = text[len(prefix):].strip()
+                    changed = True
+        return re.sub(r"\s+", " ", text)
+
+    def route(self, query: str) -> Optional[FastPathRoute]:
+        """Map a query to a single math tool call, or None if it needs the full loop."""
+        text = self.normalize(query)
+        route = None
+        for pattern, build in self.patterns:
+            match = pattern.match(text)
+            if match:
+                route = build(match)
+                break
+        else:
+            route = self._parse_arithmetic(text)
+        if route is not None and not self.limits.get(route.tool_name, lambda args: True)(route.args):
+            print(f"⚠️ Fast path skipped: {route.expression} exceeds the operand limit for {route.tool_name}")
+            return None
+        return route
+
+    def _parse_arithmetic(self, text: str) -> Optional[FastPathRoute]:
+        expr = text
+        for pattern, symbol in WORD_OPERATORS:
+            expr = re.sub(pattern, symbol, expr)
+        expr = expr.replace("^", "**").replace("×", "*").replace("÷", "/")
+        if not re.fullmatch(r"[\d\s+\-*/%().]+", expr):
+            return None
+        try:
+            node = ast.parse(expr, mode="eval").body
+        except SyntaxError:
+            return None
+        if not isinstance(node, ast.BinOp) or type(node.op) not in BINARY_TOOLS:
+            return None
+        left, right = self._int_operand(node.left), self._int_operand(node.right)
+        if left is None or right is None:
+            return None
+        tool_name, symbol = BINARY_TOOLS[type(node.op)]
+        return FastPathRoute(tool_name, [left, right], f"{left} {symbol} {right}")
+
+    @staticmethod
+    def _int_operand(node: ast.AST) -> Optional[int]:
+        if isinstance(node, ast.Constant) and type(node.value) is int:
+            return node.value
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            inner = FastPathRouter._int_operand(node.operand)
+            return -inner if inner is not None else None
+        return None
+
+    async def try_route(self, query: str, multi_mcp, session_id: Optional[str] = None) -> Optional[AgentSession]:
+        """
+        Answer the query with one tool call, or return None to fall back to the full loop.
+        The session gets session_id when given (e.g. the service's job), else a new uuid.
+        """
+        route = self.route(query)
+        if route is None or route.tool_name not in multi_mcp.tool_map:
+            return None
+
+        args_text = ", ".join(repr(a) for a in route.args)
+        code = f"result = {route.tool_name}({args_text})\nreturn result"
+        start_time = time.perf_counter()
+        start_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            value = await multi_mcp.function_wrapper(route.tool_name, *route.args)
+        except Exception as e:
+            print(f"⚠️ Fast path tool '{route.tool_name}' failed ({e}); falling back to full loop.")
+            return None
+        if getattr(value, "isError", False):
+            return None
+
+        print(f"⚡ Fast path: {route.expression} → {route.tool_name}({args_text}) = {value}")
+        return self.build_session(query, route, code, value, start_timestamp, time.perf_counter() - start_time,
+                                  session_id=session_id)
+
+    def build_session(self, query: str, route: FastPathRoute, code: str, value: Any,
+                      start_timestamp: str, elapsed: float, session_id: Optional[str] = None) -> AgentSession:
+        session = AgentSession(session_id=session_id or str(uuid.uuid4()), original_query=query)
+        entities = [str(a) for a in route.args]
+        session.add_perception(PerceptionSnapshot(
+            entities=entities,
+            result_requirement="Numerical result of a single math operation",
+            original_goal_achieved=False,
+            reasoning=f"Query matched fast path as {route.expression}; answered with one {route.tool_name} call.",
+            local_goal_achieved=False,
+            local_reasoning="Routed without LLM planning.",
+            last_tooluse_summary="None",
+            solution_summary="Not ready yet",
+            confidence="1.0"
+        ))
+
+        summary = f"{route.expression} = {value}"
+        step = Step(
+            index=0,
+            description=f"Compute {route.expression} using {route.tool_name}",
+            type="CODE",
+            code=ToolCode(tool_name="raw_code_block", tool_arguments={"code": code}),
+            execution_result={
+                "status": "success",
+                "result": str(value),
+                "execution_time": start_timestamp,
+                "total_time": str(round(elapsed, 3))
+            },
+            status="completed",
+            attempts=1,
+            perception=PerceptionSnapshot(
+                entities=entities,
+                result_requirement="Numerical result of a single math operation",
+                original_goal_achieved=True,
+                reasoning=f"{route.tool_name} returned the requested value.",
+                local_goal_achieved=True,
+                local_reasoning=f"{route.tool_name} succeeded.",
+                last_tooluse_summary=f"{route.tool_name}: success",
+                solution_summary=summary,
+                confidence="1.0"
+            ),
+        )
+        session.add_plan_version([f"Step 0: Compute {route.expression} with {route.tool_name}."], [step])
+        session.mark_complete(step.perception, final_answer=summary)
+        return session
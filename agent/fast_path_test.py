@@ -0,0 +1,136 @@
+import asyncio
+from types import SimpleNamespace
+
+from agent.fast_path import MAX_EXPONENT, MAX_FACTORIAL, MAX_FIBONACCI_TERMS, FastPathRouter
+
+TOOLS = ["add", "subtract", "multiply", "divide", "power", "remainder", "factorial", "cbrt", "fibonacci_numbers"]
+
+
+def stub_mcp(result=None, error=None):
+    """A MultiMCP stand-in: every tool is registered and calls are recorded."""
+    calls = []
+
+    async def function_wrapper(tool_name, *args):
+        calls.append((tool_name, *args))
+        if error is not None:
+            raise error
+        return result
+
+    return SimpleNamespace(tool_map={name: None for name in TOOLS}, function_wrapper=function_wrapper), calls
+
+
+def routed(query, router=None):
+    route = (router or FastPathRouter()).route(query)
+    return None if route is None else (route.tool_name, route.args)
+
+
+def test_phrase_routes():
+    cases = {
+        "What is the factorial of 5?": ("factorial", [5]),
+        "7!": ("factorial", [7]),
+        "What is 5!?": ("factorial", [5]),
+        "factorial of 6!": ("factorial", [6]),
+        "Calculate the cube root of 27": ("cbrt", [27]),
+        "First 10 fibonacci numbers": ("fibonacci_numbers", [10]),
+        "fibonacci sequence up to 8 terms": ("fibonacci_numbers", [8]),
+        "What's the sum of 3 and 4?": ("add", [3, 4]),
+        "add 2 to 9": ("add", [2, 9]),
+        "difference between 10 and 4": ("subtract", [10, 4]),
+        "Subtract 3 from 10": ("subtract", [10, 3]),
+        "product of 6 and 7": ("multiply", [6, 7]),
+        "multiply 6 by -7": ("multiply", [6, -7]),
+        "remainder of 17 divided by 5": ("remainder", [17, 5]),
+    }
+    for query, expected in cases.items():
+        assert routed(query) == expected, (query, routed(query))
+
+
+def test_single_binop_grammar():
+    cases = {
+        "3 + 4": ("add", [3, 4]),
+        "what is 10 - 4?": ("subtract", [10, 4]),
+        "-3 * 4": ("multiply", [-3, 4]),
+        "(8) / (-2)": ("divide", [8, -2]),
+        "10 divided by 2": ("divide", [10, 2]),
+        "2 ^ 10": ("power", [2, 10]),
+        "2 to the power of 8": ("power", [2, 8]),
+        "17 mod 5": ("remainder", [17, 5]),
+        "6 × 7": ("multiply", [6, 7]),
+    }
+    for query, expected in cases.items():
+        assert routed(query) == expected, (query, routed(query))
+
+    # More than one operation, non-integer operands, or anything that is not arithmetic goes to the full loop
+    for query in ["2 + 3 * 4", "(2 + 3) * 4", "1.5 + 2", "2 // 3", "-5", "42", "2 +", "3 + 4 + 5",
+                  "What is the capital of France?", "factorial of x", "sum of three and four",
+                  "__import__('os').system('ls')", "find the ASCII values of INDIA and sum them", ""]:
+        assert routed(query) is None, (query, routed(query))
+
+
+def test_operand_limits():
+    assert routed(f"factorial of {MAX_FACTORIAL}") == ("factorial", [MAX_FACTORIAL])
+    assert routed(f"factorial of {MAX_FACTORIAL + 1}") is None
+    assert routed(f"{MAX_FACTORIAL + 1}!") is None
+    assert routed(f"2 ^ {MAX_EXPONENT}") == ("power", [2, MAX_EXPONENT])
+    assert routed(f"2 ^ {MAX_EXPONENT + 1}") is None
+    assert routed(f"2 ** -{MAX_EXPONENT + 1}") is None
+    assert routed(f"first {MAX_FIBONACCI_TERMS} fibonacci numbers") == ("fibonacci_numbers", [MAX_FIBONACCI_TERMS])
+    assert routed(f"first {MAX_FIBONACCI_TERMS + 1} fibonacci numbers") is None
+    # Tools without a limit take any operand
+    assert routed("123456789 * 987654321") == ("multiply", [123456789, 987654321])
+
+    strict = FastPathRouter(max_factorial=10, max_exponent=3, max_fibonacci_terms=5)
+    assert routed("factorial of 11", strict) is None
+    assert routed("2 ^ 4", strict) is None
+    assert routed("first 6 fibonacci numbers", strict) is None
+    assert routed("2 ^ 3", strict) == ("power", [2, 3])
+
+
+def test_try_route_answers_with_one_call():
+    multi_mcp, calls = stub_mcp(result=120)
+    session = asyncio.run(FastPathRouter().try_route("What is the factorial of 5?", multi_mcp, session_id="job-1"))
+    assert calls == [("factorial", 5)]
+    assert session.session_id == "job-1"
+    assert session.state["original_goal_achieved"] is True
+    assert session.state["final_answer"] == "5! = 120"
+    step = session.plan_versions[-1]["steps"][-1]
+    assert step.status == "completed"
+    assert step.code.tool_arguments["code"] == "result = factorial(5)\nreturn result"
+
+    session = asyncio.run(FastPathRouter().try_route("3 + 4", stub_mcp(result=7)[0]))
+    assert session.state["final_answer"] == "3 + 4 = 7"
+    assert session.session_id and session.session_id != "job-1"
+
+
+def test_try_route_falls_back():
+    router = FastPathRouter()
+
+    # Non-math text and over-limit operands never reach a tool
+    multi_mcp, calls = stub_mcp(result=1)
+    assert asyncio.run(router.try_route("Summarize the attached document", multi_mcp)) is None
+    assert asyncio.run(router.try_route(f"factorial of {MAX_FACTORIAL + 1}", multi_mcp)) is None
+    assert calls == []
+
+    # The routed tool is not loaded
+    multi_mcp.tool_map.pop("factorial")
+    assert asyncio.run(router.try_route("factorial of 5", multi_mcp)) is None
+    assert calls == []
+
+    # The tool call raises
+    multi_mcp, calls = stub_mcp(error=ValueError("boom"))
+    assert asyncio.run(router.try_route("factorial of 5", multi_mcp)) is None
+    assert calls == [("factorial", 5)]
+
+    # The tool reports an error result (e.g. every replica failed)
+    multi_mcp, calls = stub_mcp(result=SimpleNamespace(isError=True, content=[]))
+    assert asyncio.run(router.try_route("10 / 0", multi_mcp)) is None
+    assert calls == [("divide", 10, 0)]
+
+
+if __name__ == "__main__":
+    test_phrase_routes()
+    test_single_binop_grammar()
+    test_operand_limits()
+    test_try_route_answers_with_one_call()
+    test_try_route_falls_back()
+    print("✅ fast path tests passed")
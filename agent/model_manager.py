@@ -3,8 +3,8 @@ import json
 import yaml
 import requests
 from pathlib import Path
-from google import genai
 from dotenv import load_dotenv
+from llm.provider import get_provider
 
 load_dotenv()
 
@@ -13,47 +13,38 @@ MODELS_JSON = ROOT / "config" / "models.json"
 PROFILE_YAML = ROOT / "config" / "profiles.yaml"
 
 class ModelManager:
-    def __init__(self):
+    def __init__(self, model_key: str | None = None, provider=None):
         self.config = json.loads(MODELS_JSON.read_text())
         self.profile = yaml.safe_load(PROFILE_YAML.read_text())
 
-        self.text_model_key = self.profile["llm"]["text_generation"]
+        # model_key selects an entry of models.json; defaults to the profile's text model
+        self.text_model_key = model_key or self.profile["llm"]["text_generation"]
         self.model_info = self.config["models"][self.text_model_key]
         self.model_type = self.model_info["type"]
 
-        # ✅ Gemini initialization (your style)
-        if self.model_type == "gemini":
-            api_key = os.getenv("GEMINI_API_KEY")
-            self.client = genai.Client(api_key=api_key)
+        # ✅ Gemini and Ollama both go through the shared provider (pooling, retries, rate limits)
+        self.provider = provider or get_provider(os.getenv("GEMINI_API_KEY"))
 
     async def generate_text(self, prompt: str) -> str:
+        return self.generate(prompt)
+
+    def generate(self, prompt: str, response_schema: dict | None = None) -> str:
         if self.model_type == "gemini":
-            return self._gemini_generate(prompt)
+            return self._gemini_generate(prompt, response_schema)
 
         elif self.model_type == "ollama":
-            return self._ollama_generate(prompt)
+            return self._ollama_generate(prompt, response_schema)
 
         raise NotImplementedError(f"Unsupported model type: {self.model_type}")
 
-    def _gemini_generate(self, prompt: str) -> str:
-        response = self.client.models.generate_content(
-            model=self.model_info["model"],
-            contents=prompt
-        )
+    def _gemini_generate(self, prompt: str, response_schema: dict | None = None) -> str:
+        return self.provider.generate(prompt, model=self.model_info["model"], response_schema=response_schema)
 
-        # ✅ Safely extract response text
-        try:
-            return response.text.strip()
-        except AttributeError:
-            try:
-                return response.candidates[0].content.parts[0].text.strip()
-            except Exception:
-                return str(response)
-
-    def _ollama_generate(self, prompt: str) -> str:
-        response = requests.post(
-            self.model_info["url"]["generate"],
-            json={"model": self.model_info["model"], "prompt": prompt, "stream": False}
+    def _ollama_generate(self, prompt: str, response_schema: dict | None = None) -> str:
+        return self.provider.generate(
+            prompt,
+            model=self.model_info["model"],
+            backend="ollama",
+            url=self.model_info["url"]["generate"],
+            response_schema=response_schema
         )
-        response.raise_for_status()
-        return response.json()["response"].strip()
@@ -3,97 +3,269 @@ import json
 from pathlib import Path
 from dotenv import load_dotenv
 import re
+import asyncio
+from typing import Callable
 from mcp_servers.multiMCP import MultiMCP
+from decision.stream_parser import IncrementalJSONParser
+from llm.cache import LLMResponseCache, get_shared_cache
+from llm.prompt_governor import PromptGovernor, DECISION_BUDGETS
+from llm.provider import LLMProvider, get_provider
+from llm.cascade import ModelCascade, CascadeCheck, confidence_below
+from action.executor import validate_code
+from llm.hedging import has_json_block
+from llm.schemas import DECISION_SCHEMA, loads, parse_stats, schema_hash
 import ast
 
-# Only import Google AI if API key is available
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-
-if api_key:
-    from google import genai
-    from google.genai.errors import ServerError
-    client = genai.Client(api_key=api_key)
-else:
-    # Mock client for testing when no API key is available
-    class MockClient:
-        def __init__(self):
-            self.models = MockModels()
-    
-    class MockModels:
-        def generate_content(self, model, contents):
-            return MockResponse()
-    
-    class MockResponse:
-        @property
-        def candidates(self):
-            return [MockCandidate()]
-    
-    class MockCandidate:
-        @property
-        def content(self):
-            return MockContent()
-    
-    class MockContent:
-        @property
-        def parts(self):
-            return [MockPart()]
-    
-    class MockPart:
-        @property
-        def text(self):
-            return '''```json
+# Mock client for testing when no API key is available
+class MockClient:
+    offline = True  # canned answers: never cached (LLMProvider.cacheable)
+
+    def __init__(self):
+        self.models = MockModels()
+
+class MockModels:
+    def generate_content(self, model, contents):
+        return MockResponse()
+
+class MockResponse:
+    @property
+    def candidates(self):
+        return [MockCandidate()]
+
+class MockCandidate:
+    @property
+    def content(self):
+        return MockContent()
+
+class MockContent:
+    @property
+    def parts(self):
+        return [MockPart()]
+
+class MockPart:
+    @property
+    def text(self):
+        return '''```json
 {
-    "step_index": 0,
-    "description": "Test decision step",
-    "type": "CODE",
-    "code": "result = 2 + 2",
-    "conclusion": "",
-    "plan_text": ["Step 0: Test plan"]
+"step_index": 0,
+"description": "Test decision step",
+"type": "CODE",
+"code": "result = 2 + 2",
+"conclusion": "",
+"plan_text": ["Step 0: Test plan"]
 }
 ```'''
-    
-    client = MockClient()
+
 
 class Decision:
-    def __init__(self, decision_prompt_path: str, multi_mcp: MultiMCP, api_key: str | None = None, model: str = "gemini-2.0-flash",  ):
+    def __init__(self, decision_prompt_path: str, multi_mcp: MultiMCP, api_key: str | None = None, model: str = "gemini-2.0-flash",
+                 cache: LLMResponseCache | None = None, use_cache: bool = True, governor: PromptGovernor | None = None,
+                 provider: LLMProvider | None = None, cascade: ModelCascade | None = None,
+                 structured_output: bool = False):
         load_dotenv()
         self.decision_prompt_path = decision_prompt_path
         self.multi_mcp = multi_mcp
 
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
+        if provider is not None:
+            self.provider = provider
+        elif not self.api_key:
             print("⚠️ Warning: GEMINI_API_KEY not found. Using mock client for testing.")
-            self.client = MockClient()
+            self.provider = LLMProvider(client=MockClient())
         else:
-            self.client = genai.Client(api_key=self.api_key)
-        
+            self.provider = get_provider(self.api_key)
+        # Canned answers from a mock or fake client must not be replayed to real runs
+        use_cache = use_cache and self.provider.cacheable
+        self.model = model
+        self.use_cache = use_cache
+        self.cache = (cache if cache is not None else get_shared_cache()) if use_cache else None
+        self.governor = governor or PromptGovernor()
+        # Optional cheapest-first cascade; escalates on parse failure, low confidence or invalid code
+        self.cascade = cascade
+        # Structured mode asks the model for schema-constrained JSON instead of a fenced block
+        self.structured_output = structured_output
 
-    def run(self, decision_input: dict) -> dict:
-        prompt_template = Path(self.decision_prompt_path).read_text(encoding="utf-8")
+    def check_step(self, output: dict) -> str | None:
+        """Escalation reason for a parsed decision, or None if it is usable."""
+        if confidence_below(output, self.cascade.confidence_threshold if self.cascade else 0.0):
+            return "low_confidence"
+        step = {**output, **output.get("next_step", {})} if isinstance(output.get("next_step"), dict) else output
+        if step.get("type") == "CODE":
+            error = validate_code(str(step.get("code") or ""), self.multi_mcp.tool_map.keys())
+            if error:
+                print(f"⚠️ Decision code failed static validation: {error}")
+                return "invalid_code"
+        return None
+
+    def cascade_check(self, raw_text: str) -> str | None:
+        """Escalation reason for a cheaper cascade tier's response, or None to accept it."""
+        match = re.search(r"```json\s*(\{.*?\})\s*```", raw_text, re.DOTALL)
+        try:
+            output = json.loads(match.group(1) if match else raw_text)
+        except (json.JSONDecodeError, TypeError):
+            return "parse_failure"
+        return self.check_step(output)
+
+    def response_schema(self, response_schema: dict | None = None) -> dict | None:
+        """Schema requested from the model: the caller's, DECISION_SCHEMA in structured mode, else None."""
+        return response_schema or (DECISION_SCHEMA if self.structured_output else None)
+
+    def cache_params(self, response_schema: dict | None = None) -> dict:
+        """Cache key material besides model and prompt: who answers and in which output mode."""
+        params = {"provider": self.provider.identity,
+                  "response_schema": schema_hash(self.response_schema(response_schema))}
+        if self.cascade is not None:
+            params["cascade"] = self.cascade.cache_identity()
+        return params
+
+    def _generate(self, full_prompt: str, use_cache: bool, check: CascadeCheck | None = None,
+                  response_schema: dict | None = None) -> tuple[str, bool]:
+        """Call the model, serving repeated prompts from the response cache. Returns (text, from_cache)."""
+        if use_cache:
+            cached = self.cache.get(self.model, full_prompt, self.cache_params(response_schema))
+            if cached is not None:
+                print(f"⚡ Decision cache hit (hit rate {self.cache.hit_rate():.0%})")
+                return cached, True
+
+        schema = self.response_schema(response_schema)
+        if self.cascade is not None:
+            return self.cascade.generate(full_prompt, check or self.cascade_check, response_schema=schema), False
+        return self.provider.generate(full_prompt, model=self.model, validate=has_json_block, response_schema=schema), False
+
+    def tool_descriptions(self) -> str:
         function_list_text = self.multi_mcp.tool_description_wrapper()
         tool_descriptions = "\n".join(f"- `{desc.strip()}`" for desc in function_list_text)
-        tool_descriptions = "\n\n### The ONLY Available Tools\n\n---\n\n" + tool_descriptions
+        return "\n\n### The ONLY Available Tools\n\n---\n\n" + tool_descriptions
+
+    def build_prompt(self, decision_input: dict) -> str:
+        prompt_template = Path(self.decision_prompt_path).read_text(encoding="utf-8")
+        tool_descriptions = self.tool_descriptions()
+        decision_input = self.governor.govern(decision_input, DECISION_BUDGETS)
         full_prompt = f"{prompt_template.strip()}\n{tool_descriptions}\n\n```json\n{json.dumps(decision_input, indent=2)}\n```"
+        self.governor.log_prompt("Decision", full_prompt)
+        return full_prompt
+
+    def _error_output(self, e: Exception) -> dict:
+        print(f"🚫 Decision LLM Error: {e}")
+        return {
+            "step_index": 0,
+            "description": "Decision model unavailable due to error.",
+            "type": "NOP",
+            "code": "result = 'Decision model error occurred'\nreturn result",
+            "conclusion": "Model error prevented proper planning.",
+            "plan_text": ["Step 0: Decision model returned an error. Exiting to avoid loop."],
+            "raw_text": str(e)
+        }
+
+    def run(self, decision_input: dict, bypass_cache: bool = False) -> dict:
+        full_prompt = self.build_prompt(decision_input)
+        use_cache = self.cache is not None and self.use_cache and not bypass_cache
 
         try:
-            response = self.client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=full_prompt
-            )
+            raw_text, from_cache = self._generate(full_prompt, use_cache)
         except Exception as e:
-            print(f"🚫 Decision LLM Error: {e}")
-            return {
-                "step_index": 0,
-                "description": "Decision model unavailable due to error.",
-                "type": "NOP",
-                "code": "result = 'Decision model error occurred'\nreturn result",
-                "conclusion": "Model error prevented proper planning.",
-                "plan_text": ["Step 0: Decision model returned an error. Exiting to avoid loop."],
-                "raw_text": str(e)
-            }
+            return self._error_output(e)
 
-        raw_text = response.candidates[0].content.parts[0].text.strip()
+        output = self.parse_output(raw_text)
+
+        # Salvaged partial plans are not cached; only clean parses are replayed
+        if use_cache and not from_cache and "raw_text" not in output:
+            self.cache.put(self.model, full_prompt, raw_text, self.cache_params())
+
+        return output
+
+    async def run_streaming(self, decision_input: dict, on_code: Callable[[str], None] | None = None,
+                            bypass_cache: bool = False) -> dict:
+        """
+        Streaming variant of run(). The response is parsed incrementally and `on_code` is
+        called with the step code as soon as both `type == "CODE"` and `code` are complete,
+        so the caller can start executing while the rest of the plan is still generated.
+        The returned dict is identical to what run() would produce for the same response.
+        """
+        if self.cascade is not None:
+            # Cascade tiers are validated on the full response, so there is nothing to stream
+            return await asyncio.to_thread(self.run, decision_input, bypass_cache=bypass_cache)
+
+        full_prompt = self.build_prompt(decision_input)
+        use_cache = self.cache is not None and self.use_cache and not bypass_cache
+
+        if use_cache:
+            cached = self.cache.get(self.model, full_prompt, self.cache_params())
+            if cached is not None:
+                print(f"⚡ Decision cache hit (hit rate {self.cache.hit_rate():.0%})")
+                return self.parse_output(cached)
+
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        done_marker = object()
+
+        def pump():
+            # The genai stream is a blocking iterator; drain it off the event loop
+            try:
+                schema = self.response_schema()
+                for text in self.provider.stream(full_prompt, model=self.model, response_schema=schema):
+                    loop.call_soon_threadsafe(chunks.put_nowait, text)
+            except Exception as e:
+                loop.call_soon_threadsafe(chunks.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(chunks.put_nowait, done_marker)
+
+        producer = loop.run_in_executor(None, pump)
+        parser = IncrementalJSONParser()
+        parts: list[str] = []
+        code_sent = False
+
+        while True:
+            item = await chunks.get()
+            if item is done_marker:
+                break
+            if isinstance(item, Exception):
+                await producer
+                return self._error_output(item)
+            parts.append(item)
+            parser.feed(item)
+            if on_code and not code_sent:
+                step_type = parser.get("next_step.type", "type")
+                code = parser.get("next_step.code", "code")
+                if step_type == "CODE" and isinstance(code, str) and code.strip():
+                    print("⚡ Decision code complete, starting execution early")
+                    on_code(code)
+                    code_sent = True
+        await producer
+
+        raw_text = "".join(parts).strip()
+        output = self.parse_output(raw_text)
+        if use_cache and "raw_text" not in output:
+            self.cache.put(self.model, full_prompt, raw_text, self.cache_params())
+        return output
+
+    def normalize_output(self, output: dict) -> dict:
+        # Handle flattened or nested format
+        if "next_step" in output:
+            output.update(output.pop("next_step"))
+
+        defaults = {
+            "step_index": 0,
+            "description": "Missing from LLM response",
+            "type": "NOP",
+            "code": "",
+            "conclusion": "",
+            "plan_text": ["Step 0: No valid plan returned by LLM."]
+        }
+        for key, default in defaults.items():
+            output.setdefault(key, default)
+        return output
+
+    def parse_output(self, raw_text: str) -> dict:
+        # Structured output is bare JSON; parse it directly before the fence/salvage path
+        stripped = raw_text.strip()
+        if stripped.startswith("{"):
+            try:
+                output = loads(stripped)
+                parse_stats.record("decision", True)
+                return self.normalize_output(output)
+            except ValueError:
+                pass
 
         try:
             match = re.search(r"```json\s*(\{.*?\})\s*```", raw_text, re.DOTALL)
@@ -102,8 +274,10 @@ class Decision:
 
             json_block = match.group(1)
             try:
-                output = json.loads(json_block)
-            except json.JSONDecodeError as e:
+                output = loads(json_block)
+                parse_stats.record("decision", True)
+            except ValueError as e:
+                parse_stats.record("decision", False)
                 print("⚠️ JSON decode failed, attempting salvage via regex...")
 
                 # Attempt to extract a 'code' block manually
@@ -120,24 +294,10 @@ class Decision:
                     "raw_text": raw_text[:1000]
                 }
 
-            # Handle flattened or nested format
-            if "next_step" in output:
-                output.update(output.pop("next_step"))
-
-            defaults = {
-                "step_index": 0,
-                "description": "Missing from LLM response",
-                "type": "NOP",
-                "code": "",
-                "conclusion": "",
-                "plan_text": ["Step 0: No valid plan returned by LLM."]
-            }
-            for key, default in defaults.items():
-                output.setdefault(key, default)
-
-            return output
+            return self.normalize_output(output)
 
         except Exception as e:
+            parse_stats.record("decision", False)
             print("❌ Unrecoverable exception while parsing LLM response:", str(e))
             return {
                 "step_index": 0,
@@ -0,0 +1,77 @@
+import json
+import re
+from pathlib import Path
+from typing import Optional
+
+from perception.perception import Perception
+from decision.decision import Decision
+from llm.prompt_governor import FUSED_BUDGETS
+from llm.cascade import confidence_below
+from llm.schemas import FUSED_SCHEMA, extract_json, parse_stats
+
+
+class FusedPerceptionDecision:
+    """
+    Single-call perception + decision for step results.
+
+    One prompt carries both the ERORLL perception inputs and the mid-session decision
+    inputs; the model answers with {"perception": {...}, "decision": {...}}. The two
+    halves are normalized with the regular Perception/Decision defaults so AgentLoop can
+    build a PerceptionSnapshot and a Step from them unchanged. Returns None when the
+    response cannot be used, so the caller can fall back to the two-call path.
+    """
+
+    def __init__(self, fused_prompt_path: str, perception: Perception, decision: Decision):
+        self.fused_prompt_path = fused_prompt_path
+        self.perception = perception
+        self.decision = decision
+
+    def build_prompt(self, fused_input: dict) -> str:
+        prompt_template = Path(self.fused_prompt_path).read_text(encoding="utf-8")
+        tool_descriptions = self.decision.tool_descriptions()
+        fused_input = self.decision.governor.govern(fused_input, FUSED_BUDGETS)
+        full_prompt = f"{prompt_template.strip()}\n{tool_descriptions}\n\n```json\n{json.dumps(fused_input, indent=2)}\n```"
+        self.decision.governor.log_prompt("Fused", full_prompt)
+        return full_prompt
+
+    def cascade_check(self, raw_text: str) -> Optional[str]:
+        """Escalate a cheaper cascade tier unless both halves parse and pass their checks."""
+        try:
+            output = extract_json(raw_text)
+        except ValueError:
+            return "parse_failure"
+        if not isinstance(output.get("perception"), dict) or not isinstance(output.get("decision"), dict):
+            return "parse_failure"
+        if confidence_below(output["perception"], self.decision.cascade.confidence_threshold):
+            return "low_confidence"
+        return self.decision.check_step(output["decision"])
+
+    def run(self, fused_input: dict) -> Optional[dict]:
+        full_prompt = self.build_prompt(fused_input)
+        use_cache = self.decision.cache is not None and self.decision.use_cache
+
+        try:
+            schema = FUSED_SCHEMA if self.decision.structured_output else None
+            raw_text, from_cache = self.decision._generate(full_prompt, use_cache, check=self.cascade_check,
+                                                           response_schema=schema)
+        except Exception as e:
+            print(f"🚫 Fused LLM Error: {e}")
+            return None
+
+        try:
+            output = extract_json(raw_text)
+            if not isinstance(output.get("perception"), dict) or not isinstance(output.get("decision"), dict):
+                raise ValueError("Response is missing the perception or decision object")
+            parse_stats.record("fused", True)
+        except Exception as e:
+            parse_stats.record("fused", False)
+            print(f"⚠️ Fused response unusable, falling back to separate calls: {e}")
+            return None
+
+        if use_cache and not from_cache:
+            self.decision.cache.put(self.decision.model, full_prompt, raw_text, self.decision.cache_params(schema))
+
+        return {
+            "perception": self.perception.normalize_output(output["perception"]),
+            "decision": self.decision.normalize_output(output["decision"]),
+        }
@@ -0,0 +1,108 @@
+import json
+from typing import Any
+
+
+class IncrementalJSONParser:
+    """
+    Incremental parser for a single JSON object arriving in arbitrary text chunks.
+
+    Leading text (markdown fences, prose) is skipped until the first '{'. Every scalar
+    value whose ancestors are all objects is reported as soon as its closing token has
+    been seen, keyed by its dotted path (e.g. "code" or "next_step.code"). Values inside
+    arrays are not reported; they are only needed once the full response is parsed.
+    """
+
+    WHITESPACE = " \t\r\n"
+
+    def __init__(self):
+        self.fields: dict[str, Any] = {}
+        self.done = False
+        self._started = False
+        self._stack: list[list] = []  # frames: ["obj", current_key] or ["arr", None]
+        self._expect_key = False
+        self._in_string = False
+        self._escape = False
+        self._string_buf: list[str] = []
+        self._scalar_buf: list[str] = []
+
+    def feed(self, chunk: str) -> dict[str, Any]:
+        """Consume a chunk and return the fields completed by it."""
+        completed: dict[str, Any] = {}
+        for ch in chunk:
+            if self.done:
+                break
+            self._consume(ch, completed)
+        return completed
+
+    def _consume(self, ch: str, completed: dict[str, Any]) -> None:
+        if not self._started:
+            if ch == "{":
+                self._started = True
+                self._stack.append(["obj", None])
+                self._expect_key = True
+            return
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+                self._string_buf.append(ch)
+            elif ch == "\\":
+                self._escape = True
+                self._string_buf.append(ch)
+            elif ch == '"':
+                self._in_string = False
+                value = json.loads('"' + "".join(self._string_buf) + '"')
+                if self._expect_key:
+                    self._stack[-1][1] = value
+                    self._expect_key = False
+                else:
+                    self._complete(value, completed)
+            else:
+                self._string_buf.append(ch)
+            return
+
+        if self._scalar_buf:
+            if ch not in self.WHITESPACE and ch not in ",}]":
+                self._scalar_buf.append(ch)
+                return
+            token = "".join(self._scalar_buf)
+            self._scalar_buf = []
+            try:
+                self._complete(json.loads(token), completed)
+            except json.JSONDecodeError:
+                pass  # malformed literal; the final full parse will report it
+
+        if ch in self.WHITESPACE or ch == ":":
+            return
+        if ch == '"':
+            self._in_string = True
+            self._string_buf = []
+        elif ch == "{":
+            self._stack.append(["obj", None])
+            self._expect_key = True
+        elif ch == "[":
+            self._stack.append(["arr", None])
+            self._expect_key = False
+        elif ch in "}]":
+            self._stack.pop()
+            self._expect_key = False
+            if not self._stack:
+                self.done = True
+        elif ch == ",":
+            self._expect_key = self._stack[-1][0] == "obj"
+        else:
+            self._scalar_buf.append(ch)
+
+    def _complete(self, value: Any, completed: dict[str, Any]) -> None:
+        if any(kind != "obj" for kind, _ in self._stack):
+            return
+        path = ".".join(str(key) for _, key in self._stack)
+        self.fields[path] = value
+        completed[path] = value
+
+    def get(self, *paths: str) -> Any:
+        """Return the first completed field among the given paths."""
+        for path in paths:
+            if path in self.fields:
+                return self.fields[path]
+        return None
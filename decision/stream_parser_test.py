@@ -0,0 +1,146 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+from decision.decision import Decision
+from decision.stream_parser import IncrementalJSONParser
+
+RESPONSE = {
+    "plan_text": ["Step 0: add", "Step 1: conclude"],
+    "next_step": {
+        "step_index": 0,
+        "description": "Add \"two\" numbers\\nthen écho",
+        "type": "CODE",
+        "code": "text = \"a\\\\b {x}\"\nresult = add(2, 3)\nreturn result",
+    },
+    "confidence": 0.75,
+    "final": True,
+    "notes": None,
+}
+
+
+def chunked(text: str, size: int) -> list[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def parse(chunks: list[str]) -> IncrementalJSONParser:
+    parser = IncrementalJSONParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser
+
+
+def test_every_chunk_boundary_gives_the_same_fields():
+    text = "```json\n" + json.dumps(RESPONSE, indent=2, ensure_ascii=False) + "\n```"
+    expected = {
+        "next_step.step_index": 0,
+        "next_step.description": RESPONSE["next_step"]["description"],
+        "next_step.type": "CODE",
+        "next_step.code": RESPONSE["next_step"]["code"],
+        "confidence": 0.75,
+        "final": True,
+        "notes": None,
+    }
+    for size in range(1, 40):  # splits land inside strings, escapes, literals and the fence
+        parser = parse(chunked(text, size))
+        assert parser.fields == expected, size
+        assert parser.done
+
+
+def test_split_escapes():
+    parser = parse(['{"code": "line1\\', 'nline2 \\"q\\', '" \\u00', 'e9\\\\', '"}'])
+    assert parser.fields == {"code": 'line1\nline2 "q" é\\'}
+
+
+def test_prose_and_fence_before_the_object_are_skipped():
+    parser = parse(["Here is the plan:\n`", "``json\n", '{"type": "CODE",', ' "code": "return 1"}', "\n```"])
+    assert parser.get("next_step.code", "code") == "return 1"
+    assert parser.get("next_step.type", "type") == "CODE"
+
+
+def test_truncated_stream_leaves_code_incomplete():
+    text = json.dumps(RESPONSE)
+    cut = text.index("result = add")
+    parser = parse(chunked(text[:cut], 7))
+    assert "next_step.code" not in parser.fields and not parser.done
+    assert parser.get("next_step.type") == "CODE"
+
+
+def test_arrays_and_values_after_the_object_are_ignored():
+    parser = parse(['{"plan_text": ["a", {"code": "x"}], "n": 1} {"code": "late"}'])
+    assert parser.fields == {"n": 1}
+
+
+class StreamingProvider:
+    """Streams chunks of a canned response; pauses after `hold_after` chunks until early execution starts."""
+
+    identity = "stub"
+    cacheable = False
+
+    def __init__(self, chunks: list[str], hold_after: int | None = None):
+        self.chunks = chunks
+        self.hold_after = hold_after
+        self.code_started = threading.Event()
+        self.streamed_before_code = None
+
+    def stream(self, prompt, model=None, response_schema=None):
+        for i, chunk in enumerate(self.chunks):
+            if i == self.hold_after:
+                self.code_started.wait(5)
+            yield chunk
+
+
+def decision_with(provider) -> Decision:
+    multi_mcp = SimpleNamespace(tool_map={"add": None}, tool_description_wrapper=lambda: ["add(integer, integer)  # Add"])
+    return Decision("prompts/decision_prompt.txt", multi_mcp, provider=provider, use_cache=False)
+
+
+def run_streaming(provider):
+    started = []
+
+    def on_code(code):
+        started.append(code)
+        provider.code_started.set()
+
+    output = asyncio.run(decision_with(provider).run_streaming({"original_query": "add 2 and 3"}, on_code=on_code))
+    return output, started
+
+
+def test_run_streaming_starts_code_before_the_stream_ends():
+    text = "```json\n" + json.dumps(RESPONSE, indent=2) + "\n```"
+    chunks = chunked(text, 9)
+    code_end = text.index('"code"') + len(json.dumps(RESPONSE["next_step"]["code"])) + len('"code": ')
+    hold_after = code_end // 9 + 2  # just past the chunk that closes the code string
+    provider = StreamingProvider(chunks, hold_after=hold_after)
+    output, started = run_streaming(provider)
+    assert started == [RESPONSE["next_step"]["code"]]
+    assert provider.code_started.is_set()
+    assert output["type"] == "CODE" and output["code"] == RESPONSE["next_step"]["code"]
+    assert output["plan_text"] == RESPONSE["plan_text"]
+
+
+def test_run_streaming_does_not_start_truncated_code():
+    text = json.dumps(RESPONSE)
+    provider = StreamingProvider(chunked(text[:text.index("return result")], 5))
+    output, started = run_streaming(provider)
+    assert started == []
+
+
+def test_run_streaming_does_not_start_conclusions():
+    response = {"plan_text": ["done"], "next_step": {"step_index": 0, "description": "d", "type": "CONCLUDE",
+                                                       "code": "", "conclusion": "5"}}
+    output, started = run_streaming(StreamingProvider(chunked(json.dumps(response), 4)))
+    assert started == [] and output["type"] == "CONCLUDE"
+
+
+if __name__ == "__main__":
+    test_every_chunk_boundary_gives_the_same_fields()
+    test_split_escapes()
+    test_prose_and_fence_before_the_object_are_skipped()
+    test_truncated_stream_leaves_code_incomplete()
+    test_arrays_and_values_after_the_object_are_ignored()
+    test_run_streaming_starts_code_before_the_stream_ends()
+    test_run_streaming_does_not_start_truncated_code()
+    test_run_streaming_does_not_start_conclusions()
+    print("✅ stream parser tests passed")
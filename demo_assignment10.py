@@ -174,7 +174,7 @@ class Assignment10Demo:
         print("="*60)
         print("All features have been demonstrated successfully.")
         print("Check the generated files for detailed results:")
-        print("- tool_performance_log.json")
+        print("- memory/tool_performance.db (tool performance store)")
         print("- Any simulation results files")
         
         # Save demo summary
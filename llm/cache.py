@@ -0,0 +1,169 @@
+import json
+import time
+import atexit
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+
+DEFAULT_CACHE_PATH = "memory/llm_cache/responses.db"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # 64 MB of cached response text
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600   # one week
+DEFAULT_TOUCH_INTERVAL = 30.0         # seconds between batched last_access writes
+
+
+class LLMResponseCache:
+    """
+    Content-addressed, on-disk cache of LLM responses.
+
+    Entries are keyed by (model, sha256(prompt), generation params) and stored in a
+    small SQLite file. The cache is bounded by total response size (least recently
+    used entries are evicted first) and every entry expires after `ttl_seconds`.
+
+    The file is in WAL mode, so processes sharing it read while another writes. A hit
+    does not write: its access time is kept in memory and written in one batch every
+    `touch_interval` seconds, before each eviction pass and on flush().
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS, touch_interval: float = DEFAULT_TOUCH_INTERVAL):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched: dict[str, float] = {}  # key -> last hit not yet written
+        self._touches_written = time.time()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA busy_timeout=5000;
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access);
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, prompt: str, params: Optional[dict[str, Any]] = None) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        material = json.dumps({"model": model, "prompt": prompt_hash, "params": params or {}}, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, model: str, prompt: str, params: Optional[dict[str, Any]] = None) -> Optional[str]:
+        key = self.make_key(model, prompt, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            response, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._touched.pop(key, None)
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self._touched[key] = now
+            if now - self._touches_written >= self.touch_interval:
+                self._write_touches(now)
+                self._conn.commit()
+            self.hits += 1
+            return response
+
+    def put(self, model: str, prompt: str, response: str, params: Optional[dict[str, Any]] = None) -> None:
+        key = self.make_key(model, prompt, params)
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            # Eviction below must see this process's recent hits
+            self._write_touches(now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _write_touches(self, now: float) -> None:
+        """Write pending hit times (the caller commits)."""
+        if self._touched:
+            self._conn.executemany("UPDATE responses SET last_access = MAX(last_access, ?) WHERE key = ?",
+                                   [(t, k) for k, t in self._touched.items()])
+            self._touched.clear()
+        self._touches_written = now
+
+    def flush(self) -> None:
+        """Write pending hit times now (e.g. at exit, so other processes' evictions see them)."""
+        with self._lock:
+            self._write_touches(time.time())
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones until under max_bytes."""
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate(), 4),
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_shared_cache: Optional[LLMResponseCache] = None
+
+
+def get_shared_cache() -> LLMResponseCache:
+    """Process-wide cache shared by Perception and Decision; pending hit times are written at exit."""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = LLMResponseCache()
+        atexit.register(_shared_cache.flush)
+    return _shared_cache
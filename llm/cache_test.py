@@ -0,0 +1,151 @@
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from decision.decision import Decision
+from llm.cache import LLMResponseCache
+from llm.fake_backend import FakeLLMBackend
+from llm.provider import LLMProvider
+from perception.perception import MockClient, MockModels, Perception
+
+MODEL = "gemini-2.0-flash"
+PERCEPTION_INPUT = {"snapshot_type": "user_query", "original_query": "What is 2 + 2?", "raw_input": "What is 2 + 2?",
+                    "memory_excerpt": {}, "current_plan": "Initial plan"}
+
+
+def last_access(path: Path) -> dict[str, float]:
+    """Access times as another process sees them."""
+    conn = sqlite3.connect(str(path))
+    try:
+        return dict(conn.execute("SELECT key, last_access FROM responses").fetchall())
+    finally:
+        conn.close()
+
+
+def test_ttl_expiry():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMResponseCache(str(Path(tmp) / "cache.db"), ttl_seconds=0.2)
+        cache.put(MODEL, "prompt", "answer", {"provider": "gemini"})
+        assert cache.get(MODEL, "prompt", {"provider": "gemini"}) == "answer"
+        assert cache.get(MODEL, "prompt", {"provider": "other"}) is None
+        time.sleep(0.3)
+        assert cache.get(MODEL, "prompt", {"provider": "gemini"}) is None
+        assert cache.stats()["entries"] == 0
+
+        # Expired entries are also dropped by the next put
+        cache.put(MODEL, "old", "answer")
+        time.sleep(0.3)
+        cache.put(MODEL, "new", "answer")
+        assert cache.stats()["entries"] == 1
+        assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_lru_eviction_sees_batched_hits():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "cache.db"
+        cache = LLMResponseCache(str(path), max_bytes=30, touch_interval=3600)
+        for prompt in ("a", "b", "c"):
+            cache.put(MODEL, prompt, "x" * 10)
+            time.sleep(0.01)
+        before = last_access(path)
+
+        # A hit is not written until the batch is due
+        assert cache.get(MODEL, "a") == "x" * 10
+        assert last_access(path) == before
+
+        # The next put writes it first, so the least recently used entry is b, not a
+        cache.put(MODEL, "d", "x" * 10)
+        assert cache.get(MODEL, "b") is None
+        assert all(cache.get(MODEL, p) == "x" * 10 for p in ("a", "c", "d"))
+        assert cache.stats()["bytes"] == 30
+
+        # Responses larger than the whole cache are never stored
+        cache.put(MODEL, "huge", "x" * 31)
+        assert cache.get(MODEL, "huge") is None and cache.stats()["entries"] == 3
+
+
+def test_hit_times_are_written_in_batches():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "cache.db"
+        cache = LLMResponseCache(str(path), touch_interval=3600)
+        cache.put(MODEL, "a", "answer")
+        key = LLMResponseCache.make_key(MODEL, "a")
+        written = last_access(path)[key]
+        for _ in range(50):
+            cache.get(MODEL, "a")
+        assert last_access(path)[key] == written
+        cache.flush()
+        assert last_access(path)[key] > written
+
+        # With no interval every hit is written at once
+        eager = LLMResponseCache(str(path), touch_interval=0)
+        time.sleep(0.01)
+        eager.get(MODEL, "a")
+        assert last_access(path)[key] > written
+
+
+def test_reads_alongside_another_writer():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "cache.db"
+        cache = LLMResponseCache(str(path), touch_interval=0)
+        cache.put(MODEL, "a", "answer")
+        conn = sqlite3.connect(str(path))
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert cache._conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+        # Another process is writing: hits still read, and a put waits for the lock instead of failing
+        other = sqlite3.connect(str(path), isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+        cache.touch_interval = 3600  # a hit whose batch is due would wait for the lock like a put
+        assert cache.get(MODEL, "a") == "answer"
+        done = threading.Event()
+        writer = threading.Thread(target=lambda: (cache.put(MODEL, "b", "answer"), done.set()))
+        writer.start()
+        time.sleep(0.2)
+        assert not done.is_set()
+        other.execute("COMMIT")
+        writer.join(5)
+        assert done.is_set() and cache.get(MODEL, "b") == "answer"
+        other.close()
+        conn.close()
+
+
+class OnlineClient:
+    """A genai-style client that is not an offline stand-in (answers like the mock client)."""
+
+    def __init__(self):
+        self.models = MockModels()
+
+
+def test_offline_answers_stay_out_of_the_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMResponseCache(str(Path(tmp) / "cache.db"))
+        for client in (MockClient(), FakeLLMBackend()):
+            provider = LLMProvider(client=client)
+            assert not provider.cacheable
+            perception = Perception("prompts/perception_prompt.txt", provider=provider, cache=cache)
+            assert perception.cache is None
+            perception.run(dict(PERCEPTION_INPUT))
+            decision = Decision("prompts/decision_prompt.txt", None, provider=provider, cache=cache)
+            assert decision.cache is None
+        assert cache.stats()["entries"] == 0
+
+        # A real provider fills the cache and is served from it
+        provider = LLMProvider(client=OnlineClient())
+        assert provider.cacheable
+        perception = Perception("prompts/perception_prompt.txt", provider=provider, cache=cache)
+        assert perception.cache is cache
+        first = perception.run(dict(PERCEPTION_INPUT))
+        assert perception.run(dict(PERCEPTION_INPUT)) == first
+        assert cache.stats()["entries"] == 1 and cache.hits == 1
+
+
+if __name__ == "__main__":
+    test_ttl_expiry()
+    test_lru_eviction_sees_batched_hits()
+    test_hit_times_are_written_in_batches()
+    test_reads_alongside_another_writer()
+    test_offline_answers_stay_out_of_the_cache()
+    print("✅ LLM cache tests passed")
@@ -0,0 +1,113 @@
+import time
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import yaml
+
+from agent.model_manager import ModelManager, PROFILE_YAML
+
+# A check inspects a tier's raw response and returns an escalation reason, or None to accept it
+CascadeCheck = Callable[[str], Optional[str]]
+
+
+def confidence_below(output: dict, threshold: float) -> bool:
+    """True when the output carries a confidence under the threshold (missing confidence passes)."""
+    if "confidence" not in output:
+        return False
+    try:
+        return float(output["confidence"]) < threshold
+    except (TypeError, ValueError):
+        return True
+
+
+class ModelCascade:
+    """
+    Cheapest-first model cascade for perception and decision calls.
+
+    Tiers are models.json keys (e.g. ["phi4", "gemini"]), each served by its own
+    ModelManager. A tier's response is accepted unless the caller's check returns an
+    escalation reason (parse failure, low confidence, invalid code) or the call raises;
+    the next tier is then tried. The last tier's response is always returned so the
+    caller's normal error handling applies. Per-tier calls, acceptances, escalation
+    reasons and latency are recorded in `tier_stats`.
+    """
+
+    def __init__(self, tiers: list[str], confidence_threshold: float = 0.6, provider=None):
+        if not tiers:
+            raise ValueError("ModelCascade needs at least one tier")
+        self.tiers = list(tiers)
+        self.confidence_threshold = confidence_threshold
+        self.managers = {key: ModelManager(model_key=key, provider=provider) for key in self.tiers}
+        self.tier_stats = {
+            key: {"calls": 0, "accepted": 0, "errors": 0, "escalations": {}, "latency_total": 0.0}
+            for key in self.tiers
+        }
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str, check: Optional[CascadeCheck] = None, response_schema: Optional[dict] = None) -> str:
+        for i, key in enumerate(self.tiers):
+            last = i == len(self.tiers) - 1
+            start = time.perf_counter()
+            try:
+                text = self.managers[key].generate(prompt, response_schema=response_schema)
+            except Exception as e:
+                self._record(key, time.perf_counter() - start, reason="error")
+                if last:
+                    raise
+                print(f"⤴️ Cascade tier '{key}' failed ({type(e).__name__}: {e}); escalating")
+                continue
+
+            reason = None if (last or check is None) else check(text)
+            self._record(key, time.perf_counter() - start, reason=reason)
+            if reason is None:
+                return text
+            print(f"⤴️ Cascade tier '{key}' rejected ({reason}); escalating to '{self.tiers[i + 1]}'")
+
+    def cache_identity(self) -> dict[str, Any]:
+        """
+        Cache key material for answers produced by this cascade. A cheaper tier's answer is
+        only ever replayed to the same cascade, never served as the top tier's response.
+        """
+        return {"tiers": self.tiers, "confidence_threshold": self.confidence_threshold}
+
+    def _record(self, key: str, elapsed: float, reason: Optional[str]):
+        with self._lock:
+            stats = self.tier_stats[key]
+            stats["calls"] += 1
+            stats["latency_total"] += elapsed
+            if reason is None:
+                stats["accepted"] += 1
+            else:
+                if reason == "error":
+                    stats["errors"] += 1
+                stats["escalations"][reason] = stats["escalations"].get(reason, 0) + 1
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Per-tier hit rate (accepted / calls) and average latency."""
+        with self._lock:
+            return {
+                key: {
+                    **s,
+                    "escalations": dict(s["escalations"]),
+                    "hit_rate": s["accepted"] / s["calls"] if s["calls"] else 0.0,
+                    "avg_latency": s["latency_total"] / s["calls"] if s["calls"] else 0.0,
+                }
+                for key, s in self.tier_stats.items()
+            }
+
+
+def load_cascade(provider=None, profile_path: Path = PROFILE_YAML) -> Optional[ModelCascade]:
+    """Build the cascade from profiles.yaml `llm.cascade`, or None when it is disabled."""
+    try:
+        profile = yaml.safe_load(Path(profile_path).read_text()) or {}
+    except (OSError, yaml.YAMLError):
+        return None
+    config = (profile.get("llm") or {}).get("cascade") or {}
+    if not config.get("enabled"):
+        return None
+    return ModelCascade(
+        tiers=config.get("tiers") or ["gemini"],
+        confidence_threshold=float(config.get("confidence_threshold", 0.6)),
+        provider=provider,
+    )
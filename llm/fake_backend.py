@@ -0,0 +1,387 @@
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, Optional
+
+import yaml
+
+ROOT = Path(__file__).parent.parent
+FIXTURES_YAML = ROOT / "config" / "fake_llm_fixtures.yaml"
+
+ERROR_MARKERS = ("tool failed", "error", "traceback", "exception", "invalid")
+STREAM_CHUNK_CHARS = 40
+EMBEDDING_DIM = 768
+
+
+class ServerError(Exception):
+    """Injected 5xx failure; named like google.genai's ServerError so the provider retries it."""
+
+    def __init__(self, message: str = "503 UNAVAILABLE (fake backend)", code: int = 503):
+        super().__init__(message)
+        self.code = code
+
+
+class RateLimitError(Exception):
+    def __init__(self, message: str = "429 RESOURCE_EXHAUSTED (fake backend)", code: int = 429):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeResponse:
+    """Mimics the genai response shape: `.text` and `.candidates[0].content.parts[0].text`."""
+
+    def __init__(self, text: str):
+        self.text = text
+        part = type("Part", (), {"text": text})()
+        content = type("Content", (), {"parts": [part]})()
+        self.candidates = [type("Candidate", (), {"content": content})()]
+
+
+class FakeModels:
+    def __init__(self, backend: "FakeLLMBackend"):
+        self.backend = backend
+
+    def generate_content(self, model: str, contents: str, config: Any = None) -> FakeResponse:
+        return FakeResponse(self.backend.complete(contents, model, json_mode=_json_mode(config)))
+
+    def generate_content_stream(self, model: str, contents: str, config: Any = None) -> Iterator[FakeResponse]:
+        for chunk in self.backend.complete_stream(contents, model, json_mode=_json_mode(config)):
+            yield FakeResponse(chunk)
+
+
+def _json_mode(config: Any) -> bool:
+    """True when the caller asked for schema-constrained JSON (response_mime_type application/json)."""
+    if isinstance(config, dict):
+        return config.get("response_mime_type") == "application/json"
+    return getattr(config, "response_mime_type", None) == "application/json"
+
+
+class FakeLLMBackend:
+    """
+    Offline stand-in for the Gemini/Ollama models used by the agent.
+
+    Prompts are recognised by their trailing ```json input block (perception, decision
+    or fused) and answered with schema-valid JSON built from query fixtures in
+    config/fake_llm_fixtures.yaml. Every call sleeps for a sample of the configured
+    latency distribution and fails with the configured error / rate-limit rates, so the
+    simulator can generate realistic load without network access.
+
+    Usable as a genai-style client (`LLMProvider(client=FakeLLMBackend.from_yaml())`) or
+    over HTTP through the Ollama-compatible server started by `serve()`.
+    """
+
+    offline = True  # canned answers: never cached (LLMProvider.cacheable)
+
+    def __init__(self, fixtures: Optional[list[dict]] = None, default: Optional[dict] = None,
+                 latency: Optional[dict] = None, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 stream_chunk_delay: float = 0.0, seed: Optional[int] = None):
+        self.fixtures = [(re.compile(f["match"], re.IGNORECASE), f) for f in (fixtures or [])]
+        self.default = default or {"type": "NOP", "description": "Please clarify the request."}
+        self.latency = latency or {"distribution": "fixed", "median": 0.0}
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.stream_chunk_delay = stream_chunk_delay
+        self.random = random.Random(seed)
+        self.models = FakeModels(self)
+        self.stats = {"calls": 0, "errors": 0, "rate_limited": 0, "latency_total": 0.0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_yaml(cls, path: Path = FIXTURES_YAML, **overrides) -> "FakeLLMBackend":
+        config = yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {}
+        kwargs = {
+            "fixtures": config.get("fixtures"),
+            "default": config.get("default"),
+            "latency": config.get("latency"),
+            "error_rate": config.get("error_rate", 0.0),
+            "rate_limit_rate": config.get("rate_limit_rate", 0.0),
+            "stream_chunk_delay": config.get("stream_chunk_delay", 0.0),
+        }
+        kwargs.update(overrides)
+        return cls(**kwargs)
+
+    # ------------------------------------------------------------------
+    # Latency and failure injection
+    # ------------------------------------------------------------------
+
+    def sample_latency(self) -> float:
+        spec = self.latency
+        kind = spec.get("distribution", "fixed")
+        median = float(spec.get("median", 0.0))
+        with self._lock:
+            if kind == "uniform":
+                value = self.random.uniform(float(spec.get("low", 0.0)), float(spec.get("high", median)))
+            elif kind == "normal":
+                value = self.random.gauss(median, float(spec.get("sigma", 0.0)))
+            elif kind == "lognormal":
+                value = self.random.lognormvariate(math.log(median), float(spec.get("sigma", 0.0))) if median > 0 else 0.0
+            else:
+                value = median
+        return max(value, 0.0)
+
+    def _simulate_call(self):
+        delay = self.sample_latency()
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["latency_total"] += delay
+            roll = self.random.random()
+        time.sleep(delay)
+        if roll < self.rate_limit_rate:
+            with self._lock:
+                self.stats["rate_limited"] += 1
+            raise RateLimitError()
+        if roll < self.rate_limit_rate + self.error_rate:
+            with self._lock:
+                self.stats["errors"] += 1
+            raise ServerError()
+
+    def complete(self, prompt: str, model: str = "fake", json_mode: bool = False) -> str:
+        self._simulate_call()
+        return self.respond(prompt, json_mode)
+
+    def complete_stream(self, prompt: str, model: str = "fake", json_mode: bool = False) -> Iterator[str]:
+        self._simulate_call()
+        text = self.respond(prompt, json_mode)
+        for i in range(0, len(text), STREAM_CHUNK_CHARS):
+            if i and self.stream_chunk_delay:
+                time.sleep(self.stream_chunk_delay)
+            yield text[i:i + STREAM_CHUNK_CHARS]
+
+    # ------------------------------------------------------------------
+    # Responses
+    # ------------------------------------------------------------------
+
+    def respond(self, prompt: str, json_mode: bool = False) -> str:
+        """Build the JSON reply for a perception, decision or fused prompt (bare JSON in json_mode)."""
+        payload = self._prompt_input(prompt)
+        if "snapshot_type" in payload:
+            output = self.perception_output(payload)
+        elif "plan_mode" in payload:
+            output = self.decision_output(payload)
+        elif "step_result" in payload:
+            output = {
+                "perception": self.perception_output({"snapshot_type": "step_result", "raw_input": payload["step_result"]}),
+                "decision": self.decision_output({**payload, "plan_mode": "mid_session"}),
+            }
+        else:
+            return "{}" if json_mode else "OK"
+        if json_mode:
+            return json.dumps(output)
+        return f"```json\n{json.dumps(output, indent=2)}\n```"
+
+    @staticmethod
+    def _prompt_input(prompt: str) -> dict:
+        blocks = re.findall(r"```json\s*(\{.*?\})\s*```", prompt, re.DOTALL)
+        for block in reversed(blocks):
+            try:
+                return json.loads(block)
+            except json.JSONDecodeError:
+                continue
+        return {}
+
+    def match_fixture(self, query: str) -> dict:
+        for pattern, fixture in self.fixtures:
+            match = pattern.search(query)
+            if match:
+                return self._fill(fixture, match, query)
+        return dict(self.default)
+
+    def _fill(self, value: Any, match: re.Match, query: str) -> Any:
+        if isinstance(value, str):
+            def sub(m):
+                if m[1] == "query":
+                    return query.replace("\\", "\\\\").replace('"', '\\"')
+                return match.group(int(m[1])) or ""
+            return re.sub(r"\{(query|\d+)\}", sub, value)
+        if isinstance(value, list):
+            return [self._fill(v, match, query) for v in value]
+        if isinstance(value, dict):
+            return {k: self._fill(v, match, query) for k, v in value.items() if k != "match"}
+        return value
+
+    def perception_output(self, payload: dict) -> dict:
+        raw_input = str(payload.get("raw_input", ""))
+        if payload.get("snapshot_type") == "step_result":
+            failed = not raw_input.strip() or any(marker in raw_input.lower() for marker in ERROR_MARKERS)
+            return {
+                "entities": [],
+                "result_requirement": "Result of the executed step",
+                "original_goal_achieved": not failed,
+                "reasoning": "The step failed." if failed else "The step returned the requested result.",
+                "local_goal_achieved": not failed,
+                "local_reasoning": "Tool output indicates an error." if failed else "Tool output looks valid.",
+                "last_tooluse_summary": "Tool failed" if failed else "Tool succeeded",
+                "solution_summary": "Not ready yet" if failed else raw_input[:500],
+                "confidence": "0.3" if failed else "0.9",
+            }
+
+        fixture = self.match_fixture(raw_input)
+        return {
+            "entities": fixture.get("entities", []),
+            "result_requirement": fixture.get("result_requirement", "Answer the query"),
+            "original_goal_achieved": False,
+            "reasoning": "A tool call is needed to answer the query.",
+            "local_goal_achieved": False,
+            "local_reasoning": "No tool has been run yet.",
+            "last_tooluse_summary": "None",
+            "solution_summary": "Not ready yet",
+            "confidence": "0.8",
+        }
+
+    def decision_output(self, payload: dict) -> dict:
+        query = str(payload.get("original_query", ""))
+        step_index = len(payload.get("completed_steps") or []) + int(payload.get("completed_steps_omitted") or 0)
+
+        if payload.get("plan_mode") == "mid_session":
+            current = payload.get("current_step") or {}
+            result = current.get("execution_result")
+            if isinstance(result, dict) and result.get("status") == "success":
+                conclusion = f"The answer is {result.get('result')}"
+                return {
+                    "plan_text": [f"Step {step_index}: Report the result."],
+                    "step_index": step_index,
+                    "description": "Report the final answer",
+                    "type": "CONCLUDE",
+                    "code": "",
+                    "conclusion": conclusion,
+                }
+            return {
+                "plan_text": [f"Step {step_index}: Ask the user for clarification."],
+                "step_index": step_index,
+                "description": "The previous step failed; please clarify or rephrase the request.",
+                "type": "NOP",
+                "code": "",
+                "conclusion": "",
+            }
+
+        fixture = self.match_fixture(query)
+        step_type = fixture.get("type", "CODE" if fixture.get("code") else "NOP")
+        description = fixture.get("description", "Answer the query")
+        return {
+            "plan_text": [f"Step 0: {description}"],
+            "step_index": 0,
+            "description": description,
+            "type": step_type,
+            "code": fixture.get("code", "") if step_type == "CODE" else "",
+            "conclusion": fixture.get("conclusion", ""),
+        }
+
+    def embed(self, text: str) -> list[float]:
+        """Deterministic unit-length pseudo-embedding so document tools work offline."""
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+        vector = [rng.gauss(0.0, 1.0) for _ in range(EMBEDDING_DIM)]
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+
+# ----------------------------------------------------------------------
+# Ollama-compatible HTTP endpoint
+# ----------------------------------------------------------------------
+
+def _make_handler(backend: FakeLLMBackend):
+    class OllamaHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, body: dict):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_stream(self, model: str, chunks: Iterator[str], wrap):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            for chunk in chunks:
+                self.wfile.write((json.dumps({"model": model, "created_at": _now(), **wrap(chunk), "done": False}) + "\n").encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write((json.dumps({"model": model, "created_at": _now(), **wrap(""), "done": True}) + "\n").encode("utf-8"))
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._send_json(200, {"models": [{"name": "fake", "model": "fake"}]})
+            else:
+                self._send_json(404, {"error": f"unknown path {self.path}"})
+
+        def do_POST(self):
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            except json.JSONDecodeError as e:
+                self._send_json(400, {"error": f"invalid JSON: {e}"})
+                return
+
+            model = body.get("model", "fake")
+            try:
+                if self.path == "/api/generate":
+                    prompt = body.get("prompt", "")
+                    wrap = lambda text: {"response": text}
+                elif self.path == "/api/chat":
+                    messages = body.get("messages") or []
+                    prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+                    wrap = lambda text: {"message": {"role": "assistant", "content": text}}
+                elif self.path in ("/api/embeddings", "/api/embed"):
+                    backend._simulate_call()
+                    text = body.get("prompt") or body.get("input") or ""
+                    self._send_json(200, {"embedding": backend.embed(text if isinstance(text, str) else text[0])})
+                    return
+                else:
+                    self._send_json(404, {"error": f"unknown path {self.path}"})
+                    return
+
+                json_mode = bool(body.get("format"))
+                if body.get("stream", True):
+                    self._send_stream(model, backend.complete_stream(prompt, model, json_mode), wrap)
+                else:
+                    self._send_json(200, {"model": model, "created_at": _now(), **wrap(backend.complete(prompt, model, json_mode)), "done": True})
+            except (ServerError, RateLimitError) as e:
+                self._send_json(e.code, {"error": str(e)})
+
+    return OllamaHandler
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def serve(backend: FakeLLMBackend, host: str = "127.0.0.1", port: int = 11435) -> ThreadingHTTPServer:
+    """Start the Ollama-compatible server on a daemon thread and return it (call .shutdown() to stop)."""
+    server = ThreadingHTTPServer((host, port), _make_handler(backend))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🧪 Fake LLM backend listening on http://{host}:{server.server_address[1]}")
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline fake LLM backend with an Ollama-compatible API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--fixtures", default=str(FIXTURES_YAML))
+    parser.add_argument("--error-rate", type=float, help="override the fixture file's error_rate")
+    parser.add_argument("--latency", type=float, help="fixed latency in seconds (overrides the distribution)")
+    args = parser.parse_args()
+
+    overrides = {}
+    if args.error_rate is not None:
+        overrides["error_rate"] = args.error_rate
+    if args.latency is not None:
+        overrides["latency"] = {"distribution": "fixed", "median": args.latency}
+    server = serve(FakeLLMBackend.from_yaml(args.fixtures, **overrides), args.host, args.port)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import re
+import json
+import math
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import yaml
+
+PROFILE_YAML = Path(__file__).parent.parent / "config" / "profiles.yaml"
+
+
+def percentile(values, q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0..1) of values, or None when empty."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def has_json_block(text: Any) -> bool:
+    """A response is usable when it carries a ```json block (or is bare JSON) that parses."""
+    if not isinstance(text, str) or not text.strip():
+        return False
+    match = re.search(r"```json\s*(\{.*\})\s*```", text, re.DOTALL)
+    try:
+        json.loads(match.group(1) if match else text)
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
+class HedgingPolicy:
+    """
+    Hedged requests for the long latency tail.
+
+    A call that has not returned within the observed p90 latency of its model gets a
+    duplicate request; the first valid response wins and the other is left to finish in
+    the background. Hedges are capped per minute to protect quota, and no hedging
+    happens until `min_samples` latencies have been observed.
+
+    Every primary request's full latency is recorded even when it loses, so `metrics()`
+    can compare the p99 the caller actually saw against the p99 without hedging.
+    """
+
+    def __init__(self, percentile: float = 0.9, max_hedges_per_minute: int = 10, min_samples: int = 20,
+                 window: int = 200, min_delay: float = 0.05, max_workers: int = 32):
+        self.percentile = percentile
+        self.max_hedges_per_minute = max_hedges_per_minute
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.primary_latencies: dict[str, deque] = {}
+        self.effective_latencies: deque = deque(maxlen=window * 5)
+        self.unhedged_latencies: deque = deque(maxlen=window * 5)
+        self.window = window
+        self.hedge_times: deque = deque()
+        self.counts = {"calls": 0, "hedged": 0, "hedge_wins": 0, "capped": 0}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+        self._lock = threading.Lock()
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging a call to `model`, or None while there is too little data."""
+        with self._lock:
+            samples = list(self.primary_latencies.get(model, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return max(percentile(samples, self.percentile), self.min_delay)
+
+    def _take_hedge_slot(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self.hedge_times and now - self.hedge_times[0] > 60:
+                self.hedge_times.popleft()
+            if len(self.hedge_times) >= self.max_hedges_per_minute:
+                self.counts["capped"] += 1
+                return False
+            self.hedge_times.append(now)
+            self.counts["hedged"] += 1
+            return True
+
+    def _record_primary(self, model: str, started: float, future: Future):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.primary_latencies.setdefault(model, deque(maxlen=self.window)).append(elapsed)
+            self.unhedged_latencies.append(elapsed)
+
+    def call(self, model: str, fn: Callable[[], Any], validate: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Run fn(), hedging it with a duplicate once it exceeds the model's p90 latency."""
+        validate = validate or (lambda result: result is not None)
+        started = time.perf_counter()
+        with self._lock:
+            self.counts["calls"] += 1
+
+        primary = self._pool.submit(fn)
+        primary.add_done_callback(lambda f: self._record_primary(model, started, f))
+        pending = {primary}
+
+        delay = self.hedge_delay(model)
+        if delay is not None:
+            done, _ = wait(pending, timeout=delay)
+            if not done and self._take_hedge_slot():
+                print(f"🪃 {model} call exceeded p{int(self.percentile * 100)} ({delay:.2f}s); sending hedge request")
+                pending.add(self._pool.submit(fn))
+
+        first_error: Optional[BaseException] = None
+        last_result: Any = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is not None:
+                    first_error = first_error or error
+                    continue
+                result = future.result()
+                last_result = result
+                if validate(result):
+                    with self._lock:
+                        self.effective_latencies.append(time.perf_counter() - started)
+                        if future is not primary:
+                            self.counts["hedge_wins"] += 1
+                    return result
+
+        with self._lock:
+            self.effective_latencies.append(time.perf_counter() - started)
+        if last_result is not None:
+            return last_result
+        raise first_error
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            unhedged = list(self.unhedged_latencies)
+            effective = list(self.effective_latencies)
+            counts = dict(self.counts)
+        p99_unhedged, p99_effective = percentile(unhedged, 0.99), percentile(effective, 0.99)
+        return {
+            **counts,
+            "p50": percentile(effective, 0.5),
+            "p99": p99_effective,
+            "p99_without_hedging": p99_unhedged,
+            "p99_reduction": (p99_unhedged - p99_effective) if p99_unhedged is not None and p99_effective is not None else None,
+        }
+
+
+def load_hedging(profile_path: Path = PROFILE_YAML) -> Optional[HedgingPolicy]:
+    """Build the policy from profiles.yaml `llm.hedging`, or None when it is disabled."""
+    try:
+        profile = yaml.safe_load(Path(profile_path).read_text()) or {}
+    except (OSError, yaml.YAMLError):
+        return None
+    config = (profile.get("llm") or {}).get("hedging") or {}
+    if not config.get("enabled"):
+        return None
+    return HedgingPolicy(
+        percentile=float(config.get("percentile", 0.9)),
+        max_hedges_per_minute=int(config.get("max_hedges_per_minute", 10)),
+        min_samples=int(config.get("min_samples", 20)),
+    )
@@ -0,0 +1,205 @@
+import json
+import math
+from typing import Any, Optional
+
+
+CHARS_PER_TOKEN = 4  # rough estimate for English/JSON with Gemini-style tokenizers
+
+# Per-section token budgets for each prompt kind
+PERCEPTION_BUDGETS = {
+    "raw_input": 2000,
+    "memory_excerpt": 600,
+    "current_plan": 300,
+}
+
+DECISION_BUDGETS = {
+    "perception": 600,
+    "current_plan": 300,
+    "completed_steps": 1500,
+    "current_step": 800,
+}
+
+FUSED_BUDGETS = {
+    "step_result": 2000,
+    "memory_excerpt": 600,
+    "current_plan": 300,
+    "completed_steps": 1500,
+    "current_step": 800,
+}
+
+STEP_RESULT_CHARS = 600
+STEP_CODE_CHARS = 600
+STEP_TEXT_CHARS = 240
+
+
+def estimate_tokens(value: Any) -> int:
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_text(text: str, max_chars: int) -> str:
+    """Keep the head and tail of long text, which is where tool output is most informative."""
+    if len(text) <= max_chars:
+        return text
+    keep = max(max_chars - 40, 20)
+    head, tail = keep * 2 // 3, keep // 3
+    return f"{text[:head]} …[{len(text) - head - tail} chars truncated]… {text[-tail:]}"
+
+
+def is_step(value: Any) -> bool:
+    return isinstance(value, dict) and "description" in value and "execution_result" in value
+
+
+def summarize_step(step: dict) -> dict:
+    """Compact a Step.to_dict() for prompt use: short result, only the perception verdict."""
+    summary = {
+        "index": step.get("index"),
+        "description": truncate_text(str(step.get("description") or ""), STEP_TEXT_CHARS),
+        "type": step.get("type"),
+        "status": step.get("status"),
+    }
+
+    code = step.get("code")
+    if isinstance(code, dict):
+        code_text = code.get("tool_arguments", {}).get("code", "")
+        summary["code"] = truncate_text(str(code_text), STEP_CODE_CHARS)
+
+    result = step.get("execution_result")
+    if isinstance(result, dict):
+        summary["execution_result"] = {
+            k: truncate_text(str(result[k]), STEP_RESULT_CHARS)
+            for k in ("status", "result", "error", "original_error") if result.get(k) is not None
+        }
+    elif result is not None:
+        summary["execution_result"] = truncate_text(str(result), STEP_RESULT_CHARS)
+
+    if step.get("conclusion"):
+        summary["conclusion"] = truncate_text(str(step["conclusion"]), STEP_RESULT_CHARS)
+    if step.get("error"):
+        summary["error"] = truncate_text(str(step["error"]), STEP_TEXT_CHARS)
+
+    perception = step.get("perception")
+    if isinstance(perception, dict):
+        summary["perception"] = {
+            "local_goal_achieved": perception.get("local_goal_achieved"),
+            "original_goal_achieved": perception.get("original_goal_achieved"),
+            "last_tooluse_summary": truncate_text(str(perception.get("last_tooluse_summary", "")), STEP_TEXT_CHARS),
+            "local_reasoning": truncate_text(str(perception.get("local_reasoning", "")), STEP_TEXT_CHARS),
+        }
+
+    if step.get("was_replanned"):
+        summary["was_replanned"] = True
+        summary["parent_index"] = step.get("parent_index")
+    return summary
+
+
+class PromptGovernor:
+    """
+    Keeps perception/decision prompt inputs within per-section token budgets.
+
+    Oversized sections are reduced in order of least information lost: steps are
+    summarized, the oldest list entries (or lowest-ranked memory entries) are dropped,
+    and finally long strings are truncated. Each governed call logs its section sizes
+    and the final prompt size.
+    """
+
+    def __init__(self, enabled: bool = True, verbose: bool = True):
+        self.enabled = enabled
+        self.verbose = verbose
+        self.last_report: Optional[dict] = None
+
+    def govern(self, payload: dict, budgets: dict[str, int]) -> dict:
+        """Return a copy of payload with every budgeted section fitted to its budget."""
+        if not self.enabled:
+            return payload
+        governed = dict(payload)
+        actions = {}
+        for section, budget in budgets.items():
+            if section not in governed:
+                continue
+            value, action, omitted = self.fit(governed[section], budget)
+            governed[section] = value
+            if omitted:
+                # Lists stay homogeneous; the prompt learns how many older entries are missing here
+                governed[f"{section}_omitted"] = omitted
+            if action:
+                actions[section] = action
+        self.last_report = {
+            "sections": {s: estimate_tokens(governed[s]) for s in budgets if s in governed},
+            "actions": actions,
+        }
+        return governed
+
+    def log_prompt(self, label: str, prompt: str) -> int:
+        tokens = estimate_tokens(prompt)
+        if self.last_report is not None:
+            self.last_report["prompt_tokens"] = tokens
+        if self.verbose:
+            actions = (self.last_report or {}).get("actions") or {}
+            details = f" (governed: {', '.join(f'{k} {v}' for k, v in actions.items())})" if actions else ""
+            print(f"📏 {label} prompt: ~{tokens} tokens{details}")
+        return tokens
+
+    def fit(self, value: Any, budget: int) -> tuple[Any, Optional[str], int]:
+        """Return (fitted value, action taken, number of list entries dropped from the front)."""
+        if estimate_tokens(value) <= budget:
+            return value, None, 0
+
+        if isinstance(value, str):
+            return truncate_text(value, budget * CHARS_PER_TOKEN), "truncated", 0
+
+        if isinstance(value, list):
+            items = [summarize_step(v) if is_step(v) else v for v in value]
+            dropped = 0
+            while len(items) > 1 and estimate_tokens(items) > budget:
+                items.pop(0)
+                dropped += 1
+            action = f"kept {len(items)}/{len(value)}"
+            if estimate_tokens(items) > budget:
+                items = [self._truncate_leaves(v, budget // max(len(items), 1)) for v in items]
+                action += ", truncated"
+            return items, action, dropped
+
+        if isinstance(value, dict):
+            if is_step(value):
+                value = summarize_step(value)
+            action = "summarized"
+            if value and all(isinstance(v, dict) for v in value.values()):
+                # Ranked entries (e.g. memory_1, memory_2, ...): drop the lowest-ranked first
+                keys = list(value.keys())
+                while len(keys) > 1 and estimate_tokens({k: value[k] for k in keys}) > budget:
+                    keys.pop()
+                if len(keys) < len(value):
+                    action = f"kept {len(keys)}/{len(value)}"
+                value = {k: value[k] for k in keys}
+            if estimate_tokens(value) > budget:
+                value = self._truncate_leaves(value, budget)
+                action += ", truncated"
+            return value, action, 0
+
+        return value, None, 0
+
+    def _truncate_leaves(self, value: Any, budget: int) -> Any:
+        """Truncate every string leaf so the structure roughly fits the budget."""
+        leaves = self._count_string_leaves(value)
+        max_chars = max(budget * CHARS_PER_TOKEN // max(leaves, 1), 80)
+
+        def walk(v):
+            if isinstance(v, str):
+                return truncate_text(v, max_chars)
+            if isinstance(v, list):
+                return [walk(i) for i in v]
+            if isinstance(v, dict):
+                return {k: walk(i) for k, i in v.items()}
+            return v
+
+        return walk(value)
+
+    def _count_string_leaves(self, value: Any) -> int:
+        if isinstance(value, str):
+            return 1
+        if isinstance(value, list):
+            return sum(self._count_string_leaves(i) for i in value)
+        if isinstance(value, dict):
+            return sum(self._count_string_leaves(i) for i in value.values())
+        return 0
@@ -0,0 +1,86 @@
+from llm.fake_backend import FakeLLMBackend
+from llm.prompt_governor import DECISION_BUDGETS, PromptGovernor, estimate_tokens
+
+
+def step(index, result_chars=2000):
+    return {
+        "index": index,
+        "description": f"Step {index}: look up part {index}",
+        "type": "CODE",
+        "code": {"tool_name": "raw_code_block", "tool_arguments": {"code": f"result = search('part {index}')\nreturn result"}},
+        "execution_result": {"status": "success", "result": f"part {index} " + "x" * result_chars},
+        "status": "completed",
+        "perception": {"local_goal_achieved": True, "original_goal_achieved": False,
+                       "last_tooluse_summary": "search: success", "local_reasoning": "found it"},
+    }
+
+
+def decision_input(steps):
+    return {
+        "plan_mode": "mid_session",
+        "original_query": "Summarize every part",
+        "completed_steps": steps,
+        "current_step": {"index": len(steps), "execution_result": {"status": "success", "result": "done"}},
+    }
+
+
+def test_drop_keeps_steps_homogeneous():
+    governor = PromptGovernor(verbose=False)
+    steps = [step(i) for i in range(40)]
+    governed = governor.govern(decision_input(steps), DECISION_BUDGETS)
+
+    kept = governed["completed_steps"]
+    omitted = governed["completed_steps_omitted"]
+    assert 0 < len(kept) < len(steps)
+    assert len(kept) + omitted == len(steps)
+    assert all(isinstance(s, dict) for s in kept)
+    # The newest steps survive, summarized
+    assert [s["index"] for s in kept] == list(range(omitted, len(steps)))
+    assert estimate_tokens(kept) <= DECISION_BUDGETS["completed_steps"]
+    assert governor.last_report["actions"]["completed_steps"] == f"kept {len(kept)}/{len(steps)}"
+    assert steps[0]["execution_result"]["result"].endswith("x"), "the caller's payload is not modified"
+
+    # The decision stub numbers the next step after every completed one, dropped or not
+    decision = FakeLLMBackend().decision_output(governed)
+    assert decision["step_index"] == len(steps)
+
+
+def test_within_budget_is_untouched():
+    governor = PromptGovernor(verbose=False)
+    payload = decision_input([step(0, result_chars=100), step(1, result_chars=100)])
+    governed = governor.govern(payload, DECISION_BUDGETS)
+    assert governed["completed_steps"] == payload["completed_steps"]
+    assert "completed_steps_omitted" not in governed
+    assert governor.last_report["actions"] == {}
+    assert PromptGovernor(enabled=False).govern(payload, DECISION_BUDGETS) is payload
+
+
+def test_truncate_branches():
+    governor = PromptGovernor(verbose=False)
+
+    # A string is cut to its budget, keeping head and tail
+    text = "HEAD " + "y" * 20000 + " TAIL"
+    value, action, omitted = governor.fit(text, 100)
+    assert action == "truncated" and omitted == 0
+    assert value.startswith("HEAD") and value.endswith("TAIL") and "chars truncated" in value
+    assert estimate_tokens(value) <= 100
+
+    # A single step larger than the budget is summarized and truncated, never dropped
+    value, action, omitted = governor.fit([step(0, result_chars=100000)], 200)
+    assert action == "kept 1/1, truncated" and omitted == 0
+    assert len(value) == 1 and value[0]["index"] == 0
+    assert "chars truncated" in value[0]["execution_result"]["result"]
+
+    # Ranked memory entries drop from the lowest rank and are never counted as omitted steps
+    memory = {f"memory_{i}": {"solution_summary": "z" * 400} for i in range(1, 11)}
+    governed = governor.govern({"memory_excerpt": memory}, {"memory_excerpt": 300})
+    assert list(governed["memory_excerpt"]) == [f"memory_{i}" for i in range(1, len(governed["memory_excerpt"]) + 1)]
+    assert len(governed["memory_excerpt"]) < len(memory)
+    assert "memory_excerpt_omitted" not in governed
+
+
+if __name__ == "__main__":
+    test_drop_keeps_steps_homogeneous()
+    test_within_budget_is_untouched()
+    test_truncate_branches()
+    print("✅ prompt governor tests passed")
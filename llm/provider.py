@@ -0,0 +1,251 @@
+import os
+import time
+import random
+import itertools
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+import yaml
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from llm.prompt_governor import estimate_tokens
+from llm.hedging import HedgingPolicy, load_hedging
+from llm.schemas import to_genai_schema
+
+ROOT = Path(__file__).parent.parent
+PROFILE_YAML = ROOT / "config" / "profiles.yaml"
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class RateLimitScheduler:
+    """
+    Token-bucket scheduler shared by every LLM caller in the process.
+
+    Each model has a requests-per-minute and a tokens-per-minute bucket that refill
+    continuously. acquire() blocks the calling thread until both buckets can cover the
+    request, so concurrent sessions queue up smoothly instead of tripping 429s together.
+    Models without configured limits are not throttled.
+    """
+
+    def __init__(self, limits: Optional[dict[str, dict]] = None):
+        self.limits = limits or {}
+        self._buckets: dict[str, dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, model: str, now: float) -> Optional[dict[str, float]]:
+        limit = self.limits.get(model)
+        if not limit:
+            return None
+        bucket = self._buckets.get(model)
+        if bucket is None:
+            bucket = {"requests": float(limit.get("rpm", 0)), "tokens": float(limit.get("tpm", 0)), "updated": now}
+            self._buckets[model] = bucket
+        elapsed = now - bucket["updated"]
+        bucket["updated"] = now
+        if limit.get("rpm"):
+            bucket["requests"] = min(limit["rpm"], bucket["requests"] + elapsed * limit["rpm"] / 60)
+        if limit.get("tpm"):
+            bucket["tokens"] = min(limit["tpm"], bucket["tokens"] + elapsed * limit["tpm"] / 60)
+        return bucket
+
+    def acquire(self, model: str, tokens: int = 0) -> float:
+        """Wait for capacity for one request of `tokens` tokens. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                bucket = self._bucket(model, now)
+                if bucket is None:
+                    return waited
+                limit = self.limits[model]
+                rpm, tpm = limit.get("rpm"), limit.get("tpm")
+                need_tokens = min(tokens, tpm) if tpm else 0
+                wait = 0.0
+                if rpm and bucket["requests"] < 1:
+                    wait = max(wait, (1 - bucket["requests"]) * 60 / rpm)
+                if tpm and bucket["tokens"] < need_tokens:
+                    wait = max(wait, (need_tokens - bucket["tokens"]) * 60 / tpm)
+                if wait == 0.0:
+                    if rpm:
+                        bucket["requests"] -= 1
+                    if tpm:
+                        bucket["tokens"] -= need_tokens
+                    return waited
+            pause = min(wait, 1.0)
+            time.sleep(pause)
+            waited += pause
+
+
+def is_retryable(error: Exception) -> bool:
+    """ServerError, 429 rate limits and transient HTTP failures are worth retrying."""
+    code = getattr(error, "code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if code in RETRYABLE_STATUS:
+        return True
+    if type(error).__name__ == "ServerError":
+        return True
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class LLMProvider:
+    """
+    Single entry point for text generation used by Perception, Decision and ModelManager.
+
+    - Gemini: one shared genai.Client per API key (its HTTP connection pool is reused)
+    - Ollama: one pooled requests.Session
+    - Retries ServerError / 429 / transient HTTP errors with jittered exponential backoff
+    - Every request passes through the shared RateLimitScheduler first
+    - With a HedgingPolicy, slow generate() calls get a duplicate request after the p90
+    An explicit `client` (anything with `models.generate_content`) replaces Gemini, e.g.
+    the offline mock clients used when no API key is configured (`offline = True` on the
+    client keeps its answers out of the response cache).
+    """
+
+    def __init__(self, api_key: Optional[str] = None, client: Any = None,
+                 scheduler: Optional[RateLimitScheduler] = None, max_retries: int = 4,
+                 base_delay: float = 1.0, max_delay: float = 30.0, output_token_reserve: int = 512,
+                 pool_size: int = 16, hedging: Optional[HedgingPolicy] = None):
+        self.api_key = api_key
+        self._client = client
+        self._client_lock = threading.Lock()
+        self.scheduler = scheduler or RateLimitScheduler()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.output_token_reserve = output_token_reserve
+        self.hedging = hedging
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "throttled_seconds": 0.0}
+
+    @property
+    def identity(self) -> str:
+        """Backend that answers, for cache keys: "gemini" for the shared genai client, else the client's class."""
+        return "gemini" if self._client is None else type(self._client).__name__
+
+    @property
+    def cacheable(self) -> bool:
+        """Offline stand-ins (mock and fake clients) must never fill the shared response cache."""
+        return not getattr(self._client, "offline", False)
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from google import genai
+                    self._client = genai.Client(api_key=self.api_key)
+        return self._client
+
+    def _call_with_retries(self, model: str, prompt: str, fn: Callable[[], Any]) -> Any:
+        tokens = estimate_tokens(prompt) + self.output_token_reserve
+        for attempt in range(self.max_retries + 1):
+            self.stats["throttled_seconds"] += self.scheduler.acquire(model, tokens)
+            self.stats["requests"] += 1
+            try:
+                return fn()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self.stats["failures"] += 1
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                self.stats["retries"] += 1
+                print(f"🔁 LLM call to {model} failed ({type(e).__name__}: {e}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    @staticmethod
+    def response_text(response: Any) -> str:
+        try:
+            return response.text.strip()
+        except AttributeError:
+            return response.candidates[0].content.parts[0].text.strip()
+
+    def generate(self, prompt: str, model: str = "gemini-2.0-flash", backend: str = "gemini",
+                 url: Optional[str] = None, config: Optional[dict] = None,
+                 validate: Optional[Callable[[str], bool]] = None, response_schema: Optional[dict] = None) -> str:
+        """
+        Generate text for `prompt`. `config` is passed through as generation config.
+        `validate` decides which response wins when the call is hedged (default: non-empty).
+        `response_schema` (JSON schema) requests schema-constrained JSON output: genai's
+        response_schema for Gemini, the `format` option for Ollama.
+        """
+        if backend == "ollama":
+            def call():
+                payload = {"model": model, "prompt": prompt, "stream": False}
+                if config:
+                    payload["options"] = config
+                if response_schema:
+                    payload["format"] = response_schema
+                response = self.http.post(url or "http://localhost:11434/api/generate", json=payload, timeout=300)
+                response.raise_for_status()
+                return response.json()["response"].strip()
+        else:
+            if response_schema:
+                config = {**(config or {}), "response_mime_type": "application/json",
+                          "response_schema": to_genai_schema(response_schema)}
+
+            def call():
+                kwargs = {"model": model, "contents": prompt}
+                if config:
+                    kwargs["config"] = config
+                return self.response_text(self.client.models.generate_content(**kwargs))
+
+        if self.hedging is not None:
+            return self.hedging.call(model, lambda: self._call_with_retries(model, prompt, call),
+                                     validate or (lambda text: bool(text)))
+        return self._call_with_retries(model, prompt, call)
+
+    def stream(self, prompt: str, model: str = "gemini-2.0-flash", response_schema: Optional[dict] = None) -> Iterator[str]:
+        """Yield text chunks. Retries only happen before the first chunk is produced."""
+        stream_fn = getattr(self.client.models, "generate_content_stream", None)
+        if stream_fn is None:
+            yield self.generate(prompt, model=model, response_schema=response_schema)
+            return
+        kwargs = {"model": model, "contents": prompt}
+        if response_schema:
+            kwargs["config"] = {"response_mime_type": "application/json", "response_schema": to_genai_schema(response_schema)}
+
+        def open_stream():
+            # The request is only sent when the first chunk is pulled
+            chunks = iter(stream_fn(**kwargs))
+            return next(chunks, None), chunks
+
+        first, chunks = self._call_with_retries(model, prompt, open_stream)
+        if first is None:
+            return
+        for chunk in itertools.chain([first], chunks):
+            if chunk.text:
+                yield chunk.text
+
+
+def load_rate_limits(profile_path: Path = PROFILE_YAML) -> dict[str, dict]:
+    try:
+        profile = yaml.safe_load(profile_path.read_text())
+        return (profile.get("llm") or {}).get("rate_limits") or {}
+    except (OSError, yaml.YAMLError):
+        return {}
+
+
+_providers: dict[Optional[str], LLMProvider] = {}
+_shared_scheduler: Optional[RateLimitScheduler] = None
+_shared_hedging: Optional[HedgingPolicy] = None
+_providers_lock = threading.Lock()
+
+
+def get_provider(api_key: Optional[str] = None) -> LLMProvider:
+    """Process-wide provider per API key; all providers share one rate-limit scheduler and hedging policy."""
+    global _shared_scheduler, _shared_hedging
+    load_dotenv()
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    with _providers_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = RateLimitScheduler(load_rate_limits())
+            _shared_hedging = load_hedging(PROFILE_YAML)
+        if api_key not in _providers:
+            _providers[api_key] = LLMProvider(api_key=api_key, scheduler=_shared_scheduler, hedging=_shared_hedging)
+        return _providers[api_key]
@@ -0,0 +1,125 @@
+import re
+import json
+import hashlib
+import threading
+import dataclasses
+from typing import Any, Literal, get_args, get_origin, get_type_hints
+
+from agent.agentSession import PerceptionSnapshot
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib parser is the fallback
+    orjson = None
+
+JSON_TYPES = {str: "string", bool: "boolean", int: "integer", float: "number"}
+
+FENCED_JSON = re.compile(r"```json\s*(.*?)\s*```", re.DOTALL)
+
+
+def type_schema(hint: Any) -> dict:
+    """JSON schema for a dataclass field type hint (str, bool, int, float, list[...], Literal[...])."""
+    if hint in JSON_TYPES:
+        return {"type": JSON_TYPES[hint]}
+    origin = get_origin(hint)
+    if origin is list:
+        (item,) = get_args(hint) or (str,)
+        return {"type": "array", "items": type_schema(item)}
+    if origin is Literal:
+        return {"type": "string", "enum": [str(v) for v in get_args(hint)]}
+    return {"type": "string"}
+
+
+def dataclass_schema(cls, overrides: dict[str, dict] | None = None) -> dict:
+    """Object schema with every dataclass field required."""
+    hints = get_type_hints(cls)
+    properties = {f.name: type_schema(hints[f.name]) for f in dataclasses.fields(cls)}
+    properties.update(overrides or {})
+    return {"type": "object", "properties": properties, "required": list(properties)}
+
+
+PERCEPTION_SCHEMA = dataclass_schema(PerceptionSnapshot)
+
+# Decision output as requested by prompts/decision_prompt.txt
+DECISION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "step_index": {"type": "integer"},
+        "description": {"type": "string"},
+        "type": {"type": "string", "enum": ["CODE", "CONCLUDE", "NOP"]},
+        "code": {"type": "string"},
+        "conclusion": {"type": "string"},
+        "plan_text": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["step_index", "description", "type", "code", "conclusion", "plan_text"],
+}
+
+FUSED_SCHEMA = {
+    "type": "object",
+    "properties": {"perception": PERCEPTION_SCHEMA, "decision": DECISION_SCHEMA},
+    "required": ["perception", "decision"],
+}
+
+
+def to_genai_schema(schema: dict) -> dict:
+    """genai's response_schema spells JSON types in upper case (OBJECT, STRING, ...)."""
+    converted = {}
+    for key, value in schema.items():
+        if key == "type":
+            converted[key] = value.upper()
+        elif key == "properties":
+            converted[key] = {name: to_genai_schema(prop) for name, prop in value.items()}
+            converted["property_ordering"] = list(value)
+        elif key == "items":
+            converted[key] = to_genai_schema(value)
+        else:
+            converted[key] = value
+    return converted
+
+
+def schema_hash(schema: dict | None) -> str | None:
+    """Short stable digest of a response schema for cache keys (None in free-text mode)."""
+    if schema is None:
+        return None
+    return hashlib.sha256(json.dumps(schema, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def loads(text: str | bytes) -> Any:
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+
+def extract_json(text: str) -> Any:
+    """Parse a bare JSON response (structured output) or the first ```json fenced block."""
+    stripped = text.strip()
+    if stripped.startswith(("{", "[")):
+        try:
+            return loads(stripped)
+        except ValueError:
+            pass
+    match = FENCED_JSON.search(text)
+    if not match:
+        raise ValueError("No JSON block found")
+    return loads(match.group(1))
+
+
+class ParseStats:
+    """Per-module counts of responses that did or did not parse as JSON."""
+
+    def __init__(self):
+        self.counts: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, label: str, ok: bool):
+        with self._lock:
+            entry = self.counts.setdefault(label, {"parsed": 0, "failed": 0})
+            entry["parsed" if ok else "failed"] += 1
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {
+                label: {**c, "failure_rate": c["failed"] / (c["parsed"] + c["failed"]) if c["parsed"] + c["failed"] else 0.0}
+                for label, c in self.counts.items()
+            }
+
+
+parse_stats = ParseStats()
@@ -10,6 +10,7 @@ BANNER = """
 ──────────────────────────────────────────────────────
 🔸  Agentic Query Assistant  🔸
 Type your question and press Enter.
+Type 'resume <session_id>' to continue an interrupted session.
 Type 'exit' or 'quit' to leave.
 ──────────────────────────────────────────────────────
 """
@@ -40,7 +41,12 @@ async def interactive() -> None:
             break
 
 
-        response = await loop.run(query)
+        if query.lower().startswith("resume "):
+            response = await loop.resume(query.split(maxsplit=1)[1])
+            if response is None:
+                continue
+        else:
+            response = await loop.run(query)
         # response = await loop.run("What is 4 + 4?")
         # pprint(f"🔵  Agent: {response.state['final_answer']}\n {response.state['reasoning_note']}\n")
         print(f"🔵 Agent: {response.state['solution_summary']}\n")
@@ -49,6 +55,7 @@ async def interactive() -> None:
         if follow.lower() in {"exit", "quit"}:
             print("👋  Goodbye!")
             break
+    await multi_mcp.shutdown()
 
 if __name__ == "__main__":
     asyncio.run(interactive())
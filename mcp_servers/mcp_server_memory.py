@@ -0,0 +1,121 @@
+from mcp.server.fastmcp import FastMCP
+import sys
+import math
+import argparse
+import traceback
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))  # the memory package lives at the repo root
+
+from memory.memory_search import get_live_index
+from memory.manifest import MEMORY_ENTRIES_NAME
+from memory.session_events import ARCHIVE_SUFFIXES, load_session_file
+from models import SearchMemoryInput, ConversationsPageInput, FetchConversationInput, PythonCodeOutput
+
+LOGS_PATH = ROOT / "memory" / "session_logs"
+
+mcp = FastMCP("memory")
+# Loaded on first use and refreshed incrementally from the day manifests as sessions are stored
+index = get_live_index(LOGS_PATH)
+
+
+def page_info(page: int, page_size: int, total: int) -> dict:
+    return {
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "total_pages": math.ceil(total / page_size) if total else 0,
+        "has_more": page * page_size < total,
+    }
+
+
+def load_conversation(session_id: str) -> dict | None:
+    """Full stored session: the day's JSON file, or its copy in the day archive."""
+    source = index.source_of(session_id)
+    if source is None:
+        return None
+    if source.name == MEMORY_ENTRIES_NAME:
+        return None  # expired by retention; only the memory entry survives
+    day = source.name[:2]
+    entry = next((e for e in index.entries() if e["session_id"] == session_id), None)
+    candidates = [source.parent / day / entry["file"]] if entry else []
+    candidates += [source.parent / f"{day}{suffix}" for suffix in ARCHIVE_SUFFIXES.values()]
+    for path in candidates:
+        if not path.exists():
+            continue
+        content = load_session_file(path)
+        sessions = content if isinstance(content, list) else content.get("turns", [content]) if isinstance(content, dict) else []
+        for session in sessions:
+            if isinstance(session, dict) and session.get("session_id", session_id) == session_id:
+                return session
+    return None
+
+
+@mcp.tool()
+def search_historical_conversations(input: SearchMemoryInput) -> PythonCodeOutput:
+    """Search past solved conversations by query (fuzzy match), one page at a time. """
+    print("CALLED: search_historical_conversations(SearchMemoryInput) -> PythonCodeOutput", file=sys.stderr)
+    try:
+        offset = (input.page - 1) * input.page_size
+        results, total = index.search(input.query, offset=offset, limit=input.page_size)
+        return PythonCodeOutput(result={"results": results, **page_info(input.page, input.page_size, total)})
+    except Exception as e:
+        traceback.print_exc(file=sys.stderr)
+        return PythonCodeOutput(result=f"An error occurred while searching memory: {e}")
+
+
+@mcp.tool()
+def get_current_conversations(input: ConversationsPageInput) -> PythonCodeOutput:
+    """List the most recent solved conversations, newest first, one page at a time. """
+    print("CALLED: get_current_conversations(ConversationsPageInput) -> PythonCodeOutput", file=sys.stderr)
+    try:
+        offset = (input.page - 1) * input.page_size
+        results, total = index.recent(offset=offset, limit=input.page_size)
+        return PythonCodeOutput(result={"results": results, **page_info(input.page, input.page_size, total)})
+    except Exception as e:
+        traceback.print_exc(file=sys.stderr)
+        return PythonCodeOutput(result=f"An error occurred while listing conversations: {e}")
+
+
+@mcp.tool()
+def fetch_conversation(input: FetchConversationInput) -> PythonCodeOutput:
+    """Fetch one stored conversation by session_id; its steps are paginated. """
+    print("CALLED: fetch_conversation(FetchConversationInput) -> PythonCodeOutput", file=sys.stderr)
+    try:
+        session = load_conversation(input.session_id)
+        if session is None:
+            entry = next((e for e in index.entries() if e["session_id"] == input.session_id), None)
+            if entry is None:
+                return PythonCodeOutput(result=f"No conversation found for session_id '{input.session_id}'")
+            return PythonCodeOutput(result={"entry": entry, "steps": [], **page_info(input.page, input.page_size, 0)})
+
+        steps = [step for version in session.get("plan_versions", []) for step in version.get("steps", []) if step]
+        offset = (input.page - 1) * input.page_size
+        snapshot = {k: v for k, v in (session.get("state_snapshot") or {}).items() if k != "final_steps"}
+        return PythonCodeOutput(result={
+            "session_id": input.session_id,
+            "original_query": session.get("original_query", snapshot.get("query")),
+            "perception": session.get("perception"),
+            "state_snapshot": snapshot,
+            "steps": steps[offset:offset + input.page_size],
+            **page_info(input.page, input.page_size, len(steps)),
+        })
+    except Exception as e:
+        traceback.print_exc(file=sys.stderr)
+        return PythonCodeOutput(result=f"An error occurred while fetching the conversation: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory MCP server")
+    parser.add_argument("mode", nargs="?", default="stdio", help="'dev' runs without a transport")
+    parser.add_argument("--transport", choices=["stdio", "sse", "streamable-http"], default="stdio",
+                        help="run as a long-lived sse/http server to share one warm index between agent processes")
+    args = parser.parse_args()
+
+    print("mcp_server_memory.py starting", file=sys.stderr)
+    index.refresh()
+    if args.mode == "dev":
+        mcp.run()  # Run without transport for dev server
+    else:
+        mcp.run(transport=args.transport)
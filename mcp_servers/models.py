@@ -151,6 +151,17 @@ class ChunkListOutput(BaseModel):
 
 class SearchMemoryInput(BaseModel):
     query: str
+    page: int = Field(default=1, ge=1, description="1-based page number")
+    page_size: int = Field(default=5, ge=1, le=50, description="Results per page")
+
+class ConversationsPageInput(BaseModel):
+    page: int = Field(default=1, ge=1, description="1-based page number")
+    page_size: int = Field(default=10, ge=1, le=50, description="Conversations per page")
+
+class FetchConversationInput(BaseModel):
+    session_id: str
+    page: int = Field(default=1, ge=1, description="1-based page of the session's steps")
+    page_size: int = Field(default=10, ge=1, le=50, description="Steps per page")
 
 class EmptyInput(BaseModel):
     pass
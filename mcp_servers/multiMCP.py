@@ -1,5 +1,6 @@
 import os
 import sys
+import time
 import asyncio
 import json
 from typing import Optional, Any, List, Dict
@@ -8,6 +9,9 @@ from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 import ast
 
+from mcp_servers.tool_performance import ToolPerformanceStore, get_tool_performance_store
+from mcp_servers.tool_routing import ReplicaRouter, load_router
+
 class MCP:
     def __init__(
         self,
@@ -43,20 +47,41 @@ class MCP:
                 return await session.call_tool(tool_name, arguments=arguments)
 
 class MultiMCP:
-    def __init__(self, server_configs: List[dict]):
+    def __init__(self, server_configs: List[dict], performance_store: Optional[ToolPerformanceStore] = None,
+                 router: Optional[ReplicaRouter] = None):
         self.server_configs = server_configs
+        # tool name -> {"config", "tool", "replicas": [config of every server exposing the same tool]}
         self.tool_map: Dict[str, Dict[str, Any]] = {}
         self.server_tools: Dict[str, List[Any]] = {}
+        # Every call's outcome and latency, shared with other agent processes (tool_performance.py)
+        self.performance = performance_store or get_tool_performance_store()
+        # Picks the replica for each call from those stats (tool_routing.py)
+        self.router = router or load_router(self.performance)
+        # server id -> long-lived session of a `persistent: true` server (see persistent_session)
+        self._persistent: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def server_params(config: dict) -> StdioServerParameters:
+        return StdioServerParameters(
+            command=sys.executable,
+            args=[config["script"]],
+            cwd=config.get("cwd", os.getcwd())
+        )
 
     async def initialize(self):
         print("in MultiMCP initialize")
         for config in self.server_configs:
+            if config.get("persistent"):
+                try:
+                    session = await self.persistent_session(config)
+                    tools = await session.list_tools()
+                    print(f"\n→ Tools received: {[tool.name for tool in tools.tools]}")
+                    self.register_server(config, tools.tools)
+                except Exception as e:
+                    print(f"❌ Error initializing MCP server {config['script']}: {e}")
+                continue
             try:
-                params = StdioServerParameters(
-                    command=sys.executable,
-                    args=[config["script"]],
-                    cwd=config.get("cwd", os.getcwd())
-                )
+                params = self.server_params(config)
                 print(f"→ Scanning tools from: {config['script']} in {params.cwd}")
                 async with stdio_client(params) as (read, write):
                     print("Connection established, creating session...")
@@ -67,36 +92,81 @@ class MultiMCP:
                             print("[agent] MCP session initialized")
                             tools = await session.list_tools()
                             print(f"\n→ Tools received: {[tool.name for tool in tools.tools]}")
-                            for tool in tools.tools:
-                                self.tool_map[tool.name] = {
-                                    "config": config,
-                                    "tool": tool
-                                }
-                                server_key = config["id"]
-                                if server_key not in self.server_tools:
-                                    self.server_tools[server_key] = []
-                                self.server_tools[server_key].append(tool)
+                            self.register_server(config, tools.tools)
                     except Exception as se:
                         print(f"❌ Session error: {se}")
             except Exception as e:
                 print(f"❌ Error initializing MCP server {config['script']}: {e}")
 
+    def register_server(self, config: dict, tools: List[Any]):
+        for tool in tools:
+            self.register_tool(tool, config)
+            self.server_tools.setdefault(config["id"], []).append(tool)
+
+    def register_tool(self, tool: Any, config: dict):
+        """Add a server's tool; a server exposing a known tool with the same input schema becomes a replica."""
+        entry = self.tool_map.get(tool.name)
+        if entry is not None and entry["tool"].inputSchema == tool.inputSchema:
+            entry["replicas"].append(config)
+            print(f"🔁 {tool.name} replicated on {[c['id'] for c in entry['replicas']]}")
+            return
+        if entry is not None:
+            print(f"⚠️ {tool.name} on {config['id']} has a different signature than on "
+                  f"{entry['config']['id']}; using {config['id']}")
+        self.tool_map[tool.name] = {"config": config, "tool": tool, "replicas": [config]}
+
     async def call_tool(self, tool_name: str, arguments: dict) -> Any:
+        """
+        Call the tool on its best replica right now, failing over to the others if a server
+        raises or returns an error result. The last replica's error is raised or returned.
+        """
         entry = self.tool_map.get(tool_name)
         if not entry:
             raise ValueError(f"Tool '{tool_name}' not found on any server.")
 
-        config = entry["config"]
-        params = StdioServerParameters(
-            command=sys.executable,
-            args=[config["script"]],
-            cwd=config.get("cwd", os.getcwd())
-        )
+        replicas = self.router.rank(tool_name, entry["replicas"])
+        for i, config in enumerate(replicas):
+            last = i == len(replicas) - 1
+            try:
+                result = await self.call_replica(tool_name, config, arguments)
+            except Exception as e:
+                if last:
+                    raise
+                print(f"⚠️ {tool_name} failed on {config['id']} ({e}); retrying on {replicas[i + 1]['id']}")
+                continue
+            if last or not getattr(result, "isError", False):
+                return result
+            print(f"⚠️ {tool_name} returned an error on {config['id']}; retrying on {replicas[i + 1]['id']}")
 
-        async with stdio_client(params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                return await session.call_tool(tool_name, arguments)
+    async def call_replica(self, tool_name: str, config: dict, arguments: dict) -> Any:
+        start = time.perf_counter()
+        try:
+            if config.get("persistent"):
+                session = await self.persistent_session(config)
+                try:
+                    result = await session.call_tool(tool_name, arguments)
+                except Exception:
+                    await self.close_persistent(config["id"])  # reconnect on the next call
+                    raise
+            else:
+                async with stdio_client(self.server_params(config)) as (read, write):
+                    async with ClientSession(read, write) as session:
+                        await session.initialize()
+                        result = await session.call_tool(tool_name, arguments)
+        except Exception as e:
+            self.performance.record(tool_name, config["id"], False, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+            raise
+        failed = bool(getattr(result, "isError", False))
+        error = None
+        if failed:
+            content = getattr(result, "content", None) or []
+            error = getattr(content[0], "text", None) if content else None
+        self.performance.record(tool_name, config["id"], not failed, time.perf_counter() - start, error or None)
+        return result
+
+    def routing_table(self) -> Dict[str, Dict[str, float]]:
+        """Current routing score of each server for every replicated tool."""
+        return self.router.table({name: [c["id"] for c in entry["replicas"]] for name, entry in self.tool_map.items()})
 
 
 
@@ -198,5 +268,47 @@ class MultiMCP:
                 tools.extend(self.server_tools[server])
         return tools
 
+    async def persistent_session(self, config: dict) -> ClientSession:
+        """
+        The session to a `persistent: true` server. Other servers are spawned per call, which
+        would start a stateful server (e.g. the memory index) cold every time; this one process
+        is started on first use and shared by every call on this event loop until shutdown(),
+        and restarted if it dies or a call on it raises.
+        """
+        loop = asyncio.get_running_loop()
+        held = self._persistent.get(config["id"])
+        if held is None or held["loop"] is not loop or held["task"].done():
+            ready = loop.create_future()
+            stop = asyncio.Event()
+            task = asyncio.create_task(self._hold_session(config, ready, stop))
+            held = self._persistent[config["id"]] = {"ready": ready, "stop": stop, "task": task, "loop": loop}
+        return await asyncio.shield(held["ready"])
+
+    async def _hold_session(self, config: dict, ready: asyncio.Future, stop: asyncio.Event):
+        # stdio_client/ClientSession must be entered and exited by the same task, so this task owns them
+        try:
+            async with stdio_client(self.server_params(config)) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    print(f"🔌 Persistent session to {config['id']} started")
+                    ready.set_result(session)
+                    await stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                print(f"⚠️ Persistent session to {config['id']} closed: {e}")
+        finally:
+            if not ready.done():
+                ready.cancel()
+
+    async def close_persistent(self, server_id: str):
+        held = self._persistent.pop(server_id, None)
+        if held is None or held["loop"] is not asyncio.get_running_loop():
+            return
+        held["stop"].set()
+        await asyncio.gather(held["task"], return_exceptions=True)
+
     async def shutdown(self):
-        pass
+        for server_id in list(self._persistent):
+            await self.close_persistent(server_id)
@@ -0,0 +1,272 @@
+import time
+import atexit
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+import yaml
+
+from llm.hedging import percentile
+
+PROFILE_YAML = Path(__file__).parent.parent / "config" / "profiles.yaml"
+DEFAULT_STORE_PATH = "memory/tool_performance.db"
+ALL = "*"  # ewma rows for a whole tool (server = ALL) or a whole server (tool = ALL)
+PRIOR_SUCCESS = 1.0  # a new ewma row starts from this, blended with its first call
+
+
+class ToolPerformanceStore:
+    """
+    Tool call outcomes in SQLite (WAL), shared by every agent process on the machine.
+
+    record() only appends to an in-memory batch; a daemon thread writes batches in one
+    transaction every `flush_interval` seconds (or as soon as `batch_size` calls are
+    pending), so tool calls never wait on the disk. Each call row keeps its tool, server,
+    outcome and latency; EWMAs of latency and success are maintained per replica
+    (tool, server), per tool and per server; a new row blends its first call into a
+    PRIOR_SUCCESS prior like any later one, so a single early failure does not zero it. stats() aggregates a time window into count,
+    success rate, p50/p95/p99 latency and the EWMAs. Rows older than `retention_days`
+    are pruned as batches are written.
+
+    Reads never wait on the writer (safe on the event loop): ewma() and replicas() return an
+    in-memory copy of the EWMA table that the background thread reloads after every batch
+    and every flush_interval (picking up other processes' calls), and stats()/totals() use
+    a separate read-only connection, which WAL lets read alongside a write. Reads do not
+    flush, so they trail this process's own calls by up to flush_interval; call flush()
+    first, off the event loop, when a report must include every call.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_STORE_PATH, flush_interval: float = 1.0, batch_size: int = 200,
+                 ewma_alpha: float = 0.2, retention_days: float = 7):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.ewma_alpha = ewma_alpha
+        self.retention_days = retention_days
+        self._pending: list[tuple] = []
+        self._pending_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._last_prune = 0.0
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS calls (
+                ts REAL NOT NULL,
+                tool TEXT NOT NULL,
+                server TEXT NOT NULL,
+                success INTEGER NOT NULL,
+                latency REAL NOT NULL,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_calls_tool ON calls(tool, ts);
+            CREATE INDEX IF NOT EXISTS idx_calls_server ON calls(server, ts);
+            CREATE INDEX IF NOT EXISTS idx_calls_ts ON calls(ts);
+            CREATE TABLE IF NOT EXISTS ewma (
+                tool TEXT NOT NULL,
+                server TEXT NOT NULL,
+                latency REAL NOT NULL,
+                success REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (tool, server)
+            );
+            """
+        )
+        self._conn.commit()
+        self._read_conn = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True,
+                                          check_same_thread=False, timeout=30)
+        self._read_conn.row_factory = sqlite3.Row
+        self._read_lock = threading.Lock()
+        # (tool, server) -> {"latency", "success", "updated_at"}; replaced, never mutated
+        self._ewma: dict[tuple[str, str], dict[str, float]] = {}
+        self._load_ewma()
+        self._thread = threading.Thread(target=self._run, name="tool-performance", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def record(self, tool: str, server: str, success: bool, latency: float, error: Optional[str] = None):
+        """Queue one call outcome (latency in seconds); written by the background thread."""
+        with self._pending_lock:
+            self._pending.append((time.time(), tool, server, int(bool(success)), float(latency),
+                                  str(error)[:500] if error else None))
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> bool:
+        """
+        Write everything recorded so far and reload the EWMAs. Blocks while another process
+        writes, so call it off the event loop. Returns False when nothing was pending.
+        """
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return False
+        a = self.ewma_alpha
+        with self._db_lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.executemany(
+                    "INSERT INTO calls (ts, tool, server, success, latency, error) VALUES (?, ?, ?, ?, ?, ?)", batch
+                )
+                for ts, tool, server, success, latency, _ in batch:
+                    for key in ((tool, server), (tool, ALL), (ALL, server)):
+                        self._conn.execute(
+                            """
+                            INSERT INTO ewma (tool, server, latency, success, updated_at) VALUES (?, ?, ?, ?, ?)
+                            ON CONFLICT(tool, server) DO UPDATE SET
+                                latency = latency * (1 - ?) + excluded.latency * ?,
+                                success = success * (1 - ?) + ? * ?,
+                                updated_at = excluded.updated_at
+                            """,
+                            (*key, latency, PRIOR_SUCCESS * (1 - a) + success * a, ts, a, a, a, success, a),
+                        )
+                if time.time() - self._last_prune > 3600:
+                    self._conn.execute("DELETE FROM calls WHERE ts < ?", (time.time() - self.retention_days * 86400,))
+                    self._last_prune = time.time()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                print(f"⚠️ Could not write tool performance batch ({len(batch)} calls): {e}")
+        self._load_ewma()
+        return True
+
+    def _load_ewma(self):
+        try:
+            with self._read_lock:
+                rows = self._read_conn.execute("SELECT tool, server, latency, success, updated_at FROM ewma").fetchall()
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not read tool performance EWMAs: {e}")
+            return
+        self._ewma = {(r["tool"], r["server"]): {"latency": r["latency"], "success": r["success"],
+                                                 "updated_at": r["updated_at"]} for r in rows}
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if not self.flush():
+                self._load_ewma()  # calls written by other processes
+
+    def close(self):
+        self.flush()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def stats(self, by: str = "tool", window_seconds: float = 3600, name: Optional[str] = None) -> dict[str, dict[str, Any]]:
+        """
+        Aggregates over the last window_seconds, keyed by tool, server or "tool@server"
+        (by = "tool" | "server" | "replica"), optionally for one name only.
+        """
+        if by not in ("tool", "server", "replica"):
+            raise ValueError("by must be 'tool', 'server' or 'replica'")
+        sql = "SELECT tool, server, success, latency, error FROM calls WHERE ts >= ?"
+        args: list[Any] = [time.time() - window_seconds]
+        if name is not None and by != "replica":
+            sql += f" AND {by} = ?"
+            args.append(name)
+        sql += " ORDER BY ts"
+        with self._read_lock:
+            rows = self._read_conn.execute(sql, args).fetchall()
+        ewma = self._ewma
+
+        groups: dict[str, dict[str, list]] = {}
+        for r in rows:
+            key = r["tool"] if by == "tool" else r["server"] if by == "server" else f"{r['tool']}@{r['server']}"
+            if by == "replica" and name is not None and key != name:
+                continue
+            g = groups.setdefault(key, {"latency": [], "success": [], "errors": [], "pair": (r["tool"], r["server"])})
+            g["latency"].append(r["latency"])
+            g["success"].append(r["success"])
+            if r["error"]:
+                g["errors"].append(r["error"])
+
+        result = {}
+        for key, g in groups.items():
+            tool, server = g["pair"]
+            smoothed = ewma.get((tool, ALL) if by == "tool" else (ALL, server) if by == "server" else (tool, server))
+            count = len(g["success"])
+            result[key] = {
+                "count": count,
+                "successes": sum(g["success"]),
+                "success_rate": round(sum(g["success"]) / count, 4),
+                "p50": round(percentile(g["latency"], 0.5), 4),
+                "p95": round(percentile(g["latency"], 0.95), 4),
+                "p99": round(percentile(g["latency"], 0.99), 4),
+                "ewma_latency": round(smoothed["latency"], 4) if smoothed else None,
+                "ewma_success": round(smoothed["success"], 4) if smoothed else None,
+                "last_errors": g["errors"][-5:],
+            }
+        return result
+
+    def ewma(self, tool: str = ALL, server: str = ALL) -> Optional[dict[str, float]]:
+        """Smoothed latency/success of a replica, a tool (server=ALL) or a server (tool=ALL)."""
+        smoothed = self._ewma.get((tool, server))
+        return {"latency": smoothed["latency"], "success": smoothed["success"]} if smoothed else None
+
+    def replicas(self, tool: str) -> dict[str, dict[str, float]]:
+        """Smoothed latency/success/updated_at of each server that ran the tool."""
+        return {server: dict(smoothed) for (name, server), smoothed in self._ewma.items()
+                if name == tool and server != ALL}
+
+    def totals(self) -> dict[str, dict[str, Any]]:
+        """All-time (within retention) per-tool totals in the old tool_performance_log.json shape."""
+        with self._read_lock:
+            rows = self._read_conn.execute(
+                "SELECT tool, COUNT(*) AS n, SUM(success) AS ok, AVG(latency) AS avg FROM calls GROUP BY tool"
+            ).fetchall()
+            errors = self._read_conn.execute(
+                "SELECT tool, error FROM calls WHERE error IS NOT NULL ORDER BY ts DESC LIMIT 500"
+            ).fetchall()
+        last_errors: dict[str, list[str]] = {}
+        for r in errors:
+            if len(last_errors.setdefault(r["tool"], [])) < 5:
+                last_errors[r["tool"]].insert(0, r["error"])
+        return {
+            r["tool"]: {
+                "total_calls": r["n"],
+                "successful_calls": r["ok"],
+                "failed_calls": r["n"] - r["ok"],
+                "avg_execution_time": r["avg"],
+                "last_errors": last_errors.get(r["tool"], []),
+            } for r in rows
+        }
+
+
+def load_store_config(profile_path: Path = PROFILE_YAML) -> dict:
+    """profiles.yaml `tool_performance`."""
+    try:
+        profile = yaml.safe_load(Path(profile_path).read_text()) or {}
+    except (OSError, yaml.YAMLError):
+        return {}
+    return profile.get("tool_performance") or {}
+
+
+_stores: dict[Path, ToolPerformanceStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_tool_performance_store(path: str | Path | None = None) -> ToolPerformanceStore:
+    """Process-wide store per file (profiles.yaml settings); flushed at interpreter exit."""
+    config = load_store_config()
+    key = Path(path or config.get("path", DEFAULT_STORE_PATH)).resolve()
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = ToolPerformanceStore(
+                key,
+                flush_interval=float(config.get("flush_interval", 1.0)),
+                batch_size=int(config.get("batch_size", 200)),
+                ewma_alpha=float(config.get("ewma_alpha", 0.2)),
+                retention_days=float(config.get("retention_days", 7)),
+            )
+            atexit.register(store.close)
+        return store
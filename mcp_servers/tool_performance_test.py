@@ -0,0 +1,152 @@
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from mcp_servers.tool_performance import ALL, PRIOR_SUCCESS, ToolPerformanceStore
+
+# The background thread only wakes for a full batch; tests flush by hand
+IDLE = 3600
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def test_batched_flushing():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ToolPerformanceStore(Path(tmp) / "perf.db", flush_interval=IDLE, batch_size=5)
+        assert store.flush() is False
+
+        for i in range(4):
+            store.record("add", "math", True, 0.01 * (i + 1))
+        time.sleep(0.2)
+        assert store.totals() == {}, "calls below batch_size wait for the interval"
+        assert store.ewma("add") is None
+
+        store.record("add", "math", False, 0.05, error="boom")
+        assert wait_for(lambda: store.totals().get("add", {}).get("total_calls") == 5), "a full batch is written at once"
+        totals = store.totals()["add"]
+        assert (totals["successful_calls"], totals["failed_calls"], totals["last_errors"]) == (4, 1, ["boom"])
+        assert store.ewma("add") is not None, "EWMAs reload after the batch"
+
+        store.record("add", "math", True, 0.01)
+        assert store.flush() is True
+        assert store.flush() is False
+        assert store.totals()["add"]["total_calls"] == 6
+
+        # Another store on the same file (another process) sees the written calls
+        other = ToolPerformanceStore(Path(tmp) / "perf.db", flush_interval=IDLE)
+        assert other.totals() == store.totals()
+        assert other.replicas("add") == store.replicas("add")
+
+
+def test_windowed_percentiles():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "perf.db"
+        store = ToolPerformanceStore(path, flush_interval=IDLE)
+        for ms in range(1, 101):
+            store.record("search", "docs-a" if ms % 2 else "docs-b", ms % 10 != 0, ms / 1000)
+        store.flush()
+        # Old, slow calls written directly, as if recorded two hours ago
+        conn = sqlite3.connect(str(path))
+        conn.executemany("INSERT INTO calls (ts, tool, server, success, latency, error) VALUES (?, ?, ?, ?, ?, ?)",
+                         [(time.time() - 7200, "search", "docs-a", 0, 9.0, "old") for _ in range(50)])
+        conn.commit()
+        conn.close()
+
+        recent = store.stats(window_seconds=3600)["search"]
+        assert (recent["count"], recent["successes"], recent["success_rate"]) == (100, 90, 0.9)
+        assert (recent["p50"], recent["p95"], recent["p99"]) == (0.05, 0.095, 0.099)
+        assert "old" not in recent["last_errors"]
+
+        everything = store.stats(window_seconds=3 * 3600)["search"]
+        assert everything["count"] == 150 and everything["p99"] == 9.0
+
+        by_replica = store.stats(by="replica", window_seconds=3600)
+        assert set(by_replica) == {"search@docs-a", "search@docs-b"}
+        assert by_replica["search@docs-b"]["p50"] == 0.05
+        assert set(store.stats(by="server", window_seconds=3600, name="docs-a")) == {"docs-a"}
+        assert store.stats(by="replica", name="search@docs-b")["search@docs-b"]["count"] == 50
+
+
+def test_ewma_blends_with_prior():
+    with tempfile.TemporaryDirectory() as tmp:
+        a = 0.5
+        store = ToolPerformanceStore(Path(tmp) / "perf.db", flush_interval=IDLE, ewma_alpha=a)
+
+        # A first failure blends into the prior instead of zeroing the success rate
+        store.record("add", "math-1", False, 2.0)
+        store.flush()
+        first = PRIOR_SUCCESS * (1 - a)
+        assert store.ewma("add", "math-1") == {"latency": 2.0, "success": first}
+
+        store.record("add", "math-1", True, 1.0)
+        store.record("add", "math-2", True, 4.0)
+        store.flush()
+        replica = store.ewma("add", "math-1")
+        assert replica == {"latency": 2.0 * (1 - a) + 1.0 * a, "success": first * (1 - a) + a}
+        assert store.ewma("add", "math-2") == {"latency": 4.0, "success": PRIOR_SUCCESS}
+
+        # The per-tool row saw all three calls in order; per-server rows only their own
+        tool = store.ewma("add", ALL)
+        assert tool["latency"] == (2.0 * (1 - a) + 1.0 * a) * (1 - a) + 4.0 * a
+        assert tool["success"] == (first * (1 - a) + a) * (1 - a) + a
+        assert store.ewma(ALL, "math-1") == replica
+        assert set(store.replicas("add")) == {"math-1", "math-2"}
+        assert store.replicas("add")["math-1"]["updated_at"] > 0
+        assert store.stats(by="replica")["add@math-2"]["ewma_success"] == PRIOR_SUCCESS
+
+
+def test_reads_while_writer_holds_lock():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "perf.db"
+        store = ToolPerformanceStore(path, flush_interval=IDLE)
+        store.record("add", "math", True, 0.1)
+        store.flush()
+
+        def reads():
+            start = time.perf_counter()
+            assert store.stats()["add"]["count"] == 1
+            assert store.totals()["add"]["total_calls"] == 1
+            assert store.ewma("add") is not None and "math" in store.replicas("add")
+            return time.perf_counter() - start
+
+        # This process's writer is mid-batch
+        with store._db_lock:
+            assert reads() < 1.0
+
+        # Another process holds the write lock on the database
+        writer = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+        writer.execute("BEGIN IMMEDIATE")
+        writer.execute("INSERT INTO calls (ts, tool, server, success, latency, error) VALUES (?, 'add', 'math', 1, 0.2, NULL)",
+                       (time.time(),))
+        assert reads() < 1.0, "reads do not wait for the other writer"
+
+        # A flush waits for the other writer, then lands
+        store.record("add", "math", True, 0.3)
+        flushed = []
+        flusher = threading.Thread(target=lambda: flushed.append(store.flush()))
+        flusher.start()
+        time.sleep(0.3)
+        assert flusher.is_alive()
+        assert reads() < 1.0
+        writer.execute("COMMIT")
+        writer.close()
+        flusher.join(5)
+        assert flushed == [True]
+        assert store.totals()["add"]["total_calls"] == 3
+
+
+if __name__ == "__main__":
+    test_batched_flushing()
+    test_windowed_percentiles()
+    test_ewma_blends_with_prior()
+    test_reads_while_writer_holds_lock()
+    print("✅ tool performance tests passed")
@@ -0,0 +1,80 @@
+import time
+import threading
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from mcp_servers.tool_performance import ToolPerformanceStore
+
+PROFILE_YAML = Path(__file__).parent.parent / "config" / "profiles.yaml"
+
+
+class ReplicaRouter:
+    """
+    Orders the servers exposing a tool, best first, from the store's per-replica EWMAs.
+
+    score = smoothed success rate - latency_weight * smoothed latency (seconds), so a server
+    whose calls start failing or slowing down loses its traffic within a few calls. A replica
+    with no recent outcome (never called, or idle for probe_interval seconds) is tried first
+    once per probe_interval, so new and recovered servers get measured and can win traffic
+    back. Until measured, a replica scores as fully reliable at the best known latency.
+    """
+
+    def __init__(self, store: ToolPerformanceStore, latency_weight: float = 0.1, probe_interval: float = 60):
+        self.store = store
+        self.latency_weight = latency_weight
+        self.probe_interval = probe_interval
+        self._probed: dict[tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def scores(self, tool: str, servers: list[str], stats: dict[str, dict[str, float]] | None = None) -> dict[str, float]:
+        stats = self.store.replicas(tool) if stats is None else stats
+        known = [stats[s]["latency"] for s in servers if s in stats]
+        best_latency = min(known) if known else 0.0
+        scores = {}
+        for server in servers:
+            smoothed = stats.get(server) or {"success": 1.0, "latency": best_latency}
+            scores[server] = smoothed["success"] - self.latency_weight * smoothed["latency"]
+        return scores
+
+    def rank(self, tool: str, configs: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Replica configs in the order to try them (the rest are failovers)."""
+        if len(configs) < 2:
+            return list(configs)
+        stats = self.store.replicas(tool)
+        scores = self.scores(tool, [c["id"] for c in configs], stats)
+        ranked = sorted(configs, key=lambda c: scores[c["id"]], reverse=True)
+
+        now = time.time()
+        with self._lock:
+            for config in configs:
+                key = (tool, config["id"])
+                last_seen = stats.get(config["id"], {}).get("updated_at", 0.0)
+                if now - last_seen > self.probe_interval and now - self._probed.get(key, 0.0) > self.probe_interval:
+                    self._probed[key] = now
+                    if config is not ranked[0]:
+                        print(f"🔎 Probing {tool} on {config['id']} (no recent calls)")
+                    ranked.remove(config)
+                    ranked.insert(0, config)
+                    break
+        return ranked
+
+    def table(self, tool_servers: dict[str, list[str]]) -> dict[str, dict[str, float]]:
+        """Current score of every replica, for tools exposed by more than one server."""
+        return {tool: {s: round(v, 4) for s, v in self.scores(tool, servers).items()}
+                for tool, servers in tool_servers.items() if len(servers) > 1}
+
+
+def load_router(store: ToolPerformanceStore, profile_path: Path = PROFILE_YAML) -> ReplicaRouter:
+    """Router with profiles.yaml `tool_performance.routing` settings."""
+    try:
+        profile = yaml.safe_load(Path(profile_path).read_text()) or {}
+    except (OSError, yaml.YAMLError):
+        profile = {}
+    config = (profile.get("tool_performance") or {}).get("routing") or {}
+    return ReplicaRouter(
+        store,
+        latency_weight=float(config.get("latency_weight", 0.1)),
+        probe_interval=float(config.get("probe_interval", 60)),
+    )
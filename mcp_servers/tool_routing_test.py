@@ -0,0 +1,170 @@
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from mcp_servers.multiMCP import MultiMCP
+from mcp_servers.tool_performance import PRIOR_SUCCESS, ToolPerformanceStore
+from mcp_servers.tool_routing import ReplicaRouter
+
+SCHEMA = {"type": "object", "properties": {"input": {"type": "object"}}}
+
+
+class FakeStore:
+    """The store's read side the router uses, with EWMAs set by the test; record() keeps every call."""
+
+    def __init__(self, replicas=None):
+        self.stats = replicas or {}
+        self.calls = []
+
+    def replicas(self, tool):
+        return {server: dict(s) for server, s in self.stats.get(tool, {}).items()}
+
+    def record(self, tool, server, success, latency, error=None):
+        self.calls.append((tool, server, success, error))
+
+
+def measured(success, latency, age=0.0):
+    return {"success": success, "latency": latency, "updated_at": time.time() - age}
+
+
+def configs(*ids):
+    return [{"id": i, "script": f"{i}.py", "persistent": True} for i in ids]
+
+
+def order(router, tool, ids):
+    return [c["id"] for c in router.rank(tool, configs(*ids))]
+
+
+class StubSession:
+    """A persistent server session whose call_tool answers from a script of outcomes."""
+
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+
+    async def call_tool(self, tool_name, arguments):
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return SimpleNamespace(isError=outcome != "ok", content=[SimpleNamespace(text=outcome)])
+
+
+class StubMultiMCP(MultiMCP):
+    """MultiMCP whose `persistent: true` servers are StubSessions instead of processes."""
+
+    def __init__(self, sessions, store, router):
+        super().__init__([], performance_store=store, router=router)
+        self.sessions = {}
+        self.tried = []  # server ids in the order calls reached them
+        for config in configs(*sessions):
+            self.add_server(config, sessions[config["id"]])
+
+    def add_server(self, config, outcomes):
+        self.server_configs.append(config)
+        self.sessions[config["id"]] = StubSession(outcomes)
+        self.register_server(config, [SimpleNamespace(name="search", inputSchema=SCHEMA)])
+
+    async def persistent_session(self, config):
+        self.tried.append(config["id"])
+        return self.sessions[config["id"]]
+
+
+def test_unreliable_or_slow_replica_ranks_last():
+    store = FakeStore({"search": {"a": measured(0.6, 0.1), "b": measured(0.99, 0.1)}})
+    router = ReplicaRouter(store, latency_weight=0.1)
+    assert order(router, "search", ["a", "b"]) == ["b", "a"]
+
+    # 3 s of smoothed latency costs 0.3 success points: the slower replica loses despite fewer failures
+    store.stats["search"] = {"a": measured(1.0, 3.0), "b": measured(0.98, 0.2)}
+    assert order(router, "search", ["a", "b"]) == ["b", "a"]
+    assert order(ReplicaRouter(store, latency_weight=0.0), "search", ["a", "b"]) == ["a", "b"]
+
+    # Single servers are never reordered or probed
+    assert order(router, "search", ["a"]) == ["a"]
+    assert router.table({"search": ["a", "b"], "add": ["a"]}) == {"search": {"a": 0.7, "b": 0.96}}
+
+
+def test_unmeasured_and_idle_replicas_are_probed():
+    store = FakeStore({"search": {"a": measured(0.9, 0.5), "b": measured(0.95, 0.2)}})
+    router = ReplicaRouter(store, latency_weight=0.1, probe_interval=60)
+
+    # A new replica scores as fully reliable at the best known latency and is tried first once
+    assert router.scores("search", ["a", "b", "new"], store.replicas("search"))["new"] == 1.0 - 0.1 * 0.2
+    assert order(router, "search", ["a", "b", "new"]) == ["new", "b", "a"]
+    store.stats["search"]["new"] = measured(0.5, 0.2)
+    assert order(router, "search", ["a", "b", "new"]) == ["b", "a", "new"]
+
+    # A replica idle for longer than probe_interval is moved first once per interval
+    store.stats["search"]["a"] = measured(0.9, 0.5, age=120)
+    assert order(router, "search", ["a", "b", "new"]) == ["a", "b", "new"]
+    assert order(router, "search", ["a", "b", "new"]) == ["b", "a", "new"]
+    router._probed[("search", "a")] -= 61
+    assert order(router, "search", ["a", "b", "new"])[0] == "a"
+
+
+def test_error_results_fail_over():
+    fresh = {"a": measured(1.0, 0.1), "b": measured(0.9, 0.1), "c": measured(0.8, 0.1)}
+
+    async def call(sessions):
+        store = FakeStore({"search": dict(fresh)})
+        mcp = StubMultiMCP(sessions, store, ReplicaRouter(store))
+        try:
+            return await mcp.call_tool("search", {"input": {}}), store.calls
+        except Exception as e:
+            return e, store.calls
+
+    # An error result on the best replica is retried on the next, and recorded as a failure
+    result, calls = asyncio.run(call({"a": ["index missing"], "b": ["ok"], "c": ["ok"]}))
+    assert not result.isError
+    assert calls == [("search", "a", False, "index missing"), ("search", "b", True, None)]
+
+    # A raised error fails over the same way
+    result, calls = asyncio.run(call({"a": [ConnectionError("gone")], "b": ["bad input"], "c": ["ok"]}))
+    assert not result.isError
+    assert [(server, ok) for _, server, ok, _ in calls] == [("a", False), ("b", False), ("c", True)]
+    assert calls[0][3] == "ConnectionError: gone"
+
+    # When every replica fails, the last one's error result is returned ...
+    result, calls = asyncio.run(call({"a": ["bad"], "b": ["bad"], "c": ["still bad"]}))
+    assert result.isError and result.content[0].text == "still bad" and len(calls) == 3
+
+    # ... or its exception raised
+    result, calls = asyncio.run(call({"a": ["bad"], "b": ["bad"], "c": [TimeoutError("slow")]}))
+    assert isinstance(result, TimeoutError) and len(calls) == 3
+
+
+def test_failing_replica_loses_traffic():
+    with tempfile.TemporaryDirectory() as tmp:
+        alpha = 0.2
+        store = ToolPerformanceStore(Path(tmp) / "perf.db", flush_interval=3600, ewma_alpha=alpha)
+        # No latency term, so equal success rates keep the configured order
+        router = ReplicaRouter(store, latency_weight=0.0, probe_interval=3600)
+        # Replica a answers twice, then starts returning errors; b always works
+        mcp = StubMultiMCP({"a": ["ok", "ok"] + ["bad"] * 20, "b": ["ok"]}, store, router)
+
+        def first_tried():
+            start = len(mcp.tried)
+            asyncio.run(mcp.call_tool("search", {"input": {}}))
+            store.flush()
+            return mcp.tried[start]
+
+        # Each new replica is probed once; a keeps traffic until its first failure
+        assert [first_tried() for _ in range(8)] == ["a", "b", "a", "a", "b", "b", "b", "b"]
+        assert mcp.tried.count("a") == 3
+        assert store.replicas("search")["a"]["success"] == PRIOR_SUCCESS * (1 - alpha)
+
+        # A replica added later is probed, and its first failure is blended into the prior instead of scoring 0.0
+        mcp.add_server(configs("c")[0], ["bad"])
+        assert first_tried() == "c"
+        assert mcp.tried[-1] == "b"
+        assert store.replicas("search")["c"]["success"] == PRIOR_SUCCESS * (1 - alpha)
+        assert first_tried() == "b"
+
+
+if __name__ == "__main__":
+    test_unreliable_or_slow_replica_ranks_last()
+    test_unmeasured_and_idle_replicas_are_probed()
+    test_error_results_fail_over()
+    test_failing_replica_loses_traffic()
+    print("✅ tool routing tests passed")
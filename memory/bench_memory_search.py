@@ -0,0 +1,101 @@
+"""
+Benchmark memory scoring: the original per-entry fuzz loop vs FuzzyScorer (rapidfuzz
+cdist + NumPy + argpartition) on synthetic memory entries.
+
+    python -m memory.bench_memory_search --sizes 1000 10000 100000 200000
+"""
+import time
+import random
+import argparse
+from typing import List, Dict
+
+from rapidfuzz import fuzz
+
+from memory.memory_search import FuzzyScorer
+
+TEMPLATES = [
+    ("Calculate the factorial of {n}", "The factorial of {n} was computed with the factorial tool."),
+    ("What is {n} + {m}?", "{n} + {m} = {s}"),
+    ("Find the sum of first {n} natural numbers", "Sum of 1..{n} is {s}."),
+    ("Search for information about topic {n}", "Found {m} web results about topic {n}."),
+    ("Summarize the DLF document section {n}", "Section {n} describes DLF's real-estate portfolio and pricing."),
+    ("Calculate the area of a circle with radius {n}", "Area is approximately {s} square units."),
+]
+
+QUERIES = [
+    "factorial of 7",
+    "sum of the first 25 natural numbers",
+    "what does the DLF document say about pricing",
+    "area of circle radius 12",
+]
+
+
+def make_entries(size: int, seed: int = 0) -> List[Dict]:
+    rng = random.Random(seed)
+    entries = []
+    for i in range(size):
+        query, summary = TEMPLATES[i % len(TEMPLATES)]
+        n, m = rng.randint(1, 500), rng.randint(1, 500)
+        values = {"n": n, "m": m, "s": n + m}
+        entries.append({
+            "file": f"session_{i}.json",
+            "query": query.format(**values),
+            "result_requirement": "",
+            "solution_summary": summary.format(**values),
+        })
+    return entries
+
+
+def loop_top_k(user_query: str, entries: List[Dict], top_k: int) -> List[Dict]:
+    """The original MemorySearch scoring loop, kept here as the baseline."""
+    scored_results = []
+    for entry in entries:
+        query_score = fuzz.partial_ratio(user_query.lower(), entry["query"].lower())
+        summary_score = fuzz.partial_ratio(user_query.lower(), entry["solution_summary"].lower())
+        length_penalty = len(entry["solution_summary"]) / 100
+        score = 0.5 * query_score + 0.4 * summary_score - 0.05 * length_penalty
+        scored_results.append((score, entry))
+    top_matches = sorted(scored_results, key=lambda x: x[0], reverse=True)[:top_k]
+    return [match[1] for match in top_matches]
+
+
+def best_of(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memory search scoring")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 200_000])
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--skip-loop-above", type=int, default=200_000,
+                        help="skip the slow baseline for larger sizes")
+    args = parser.parse_args()
+
+    print(f"{'entries':>10} {'loop (ms)':>12} {'build (ms)':>12} {'cdist (ms)':>12} {'speedup':>9}  same top-k")
+    for size in args.sizes:
+        entries = make_entries(size)
+
+        start = time.perf_counter()
+        scorer = FuzzyScorer(entries)
+        build = time.perf_counter() - start
+
+        vectorized = sum(best_of(lambda: scorer.top_k(q, args.top_k), args.repeats) for q in QUERIES) / len(QUERIES)
+        if size <= args.skip_loop_above:
+            loop = sum(best_of(lambda: loop_top_k(q, entries, args.top_k), 1) for q in QUERIES) / len(QUERIES)
+            same = all(
+                [e["file"] for e in loop_top_k(q, entries, args.top_k)] == [e["file"] for e in scorer.top_k(q, args.top_k)]
+                for q in QUERIES
+            )
+            print(f"{size:>10,} {loop * 1000:>12.1f} {build * 1000:>12.1f} {vectorized * 1000:>12.1f} {loop / vectorized:>8.1f}x  {same}")
+        else:
+            print(f"{size:>10,} {'-':>12} {build * 1000:>12.1f} {vectorized * 1000:>12.1f} {'-':>9}  -")
+
+
+if __name__ == "__main__":
+    main()
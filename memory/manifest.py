@@ -0,0 +1,127 @@
+"""
+Per-day memory manifests.
+
+Every stored session that achieved its goal gets one summary record (session_id, file,
+query, result_requirement, solution_summary, timestamp) appended to the manifest of its
+day, YYYY/MM/DD.manifest.jsonl, next to the day directory (and to its archive once
+memory/retention.py rolls the day up). Memory search reads only these records instead
+of walking every session document.
+"""
+import json
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List
+
+from memory.memory_index import DEFAULT_LOGS_PATH, find_memory_entry
+from memory.session_events import is_archive, iter_session_files, load_session_file, read_archive, stored_timestamp
+
+MANIFEST_SUFFIX = ".manifest.jsonl"
+# Deduplicated entries of expired days (written by memory/retention.py), read like a manifest
+MEMORY_ENTRIES_NAME = "memory_entries.jsonl.gz"
+
+_append_lock = threading.Lock()
+
+
+def manifest_path(store_path: str | Path) -> Path:
+    """YYYY/MM/DD/<id>.json -> YYYY/MM/DD.manifest.jsonl"""
+    day_dir = Path(store_path).parent
+    return day_dir.with_name(f"{day_dir.name}{MANIFEST_SUFFIX}")
+
+
+def manifest_record(session_data: dict, file: str | Path, timestamp: str | None = None) -> dict | None:
+    """Summary record of a solved session; `timestamp` is when it was stored (default: now)."""
+    entry = find_memory_entry(session_data)
+    if entry is None:
+        return None
+    return {
+        "session_id": session_data.get("session_id") or Path(file).stem,
+        "file": Path(file).name,
+        **entry,
+        "timestamp": timestamp or datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def append_manifest(session_data: dict, store_path: str | Path) -> bool:
+    """Append the session's summary record to its day manifest. Returns False for unsolved sessions."""
+    record = manifest_record(session_data, store_path)
+    if record is None:
+        return False
+    with _append_lock, open(manifest_path(store_path), "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    return True
+
+
+def read_manifest(path: str | Path) -> List[Dict]:
+    """Records of one manifest; the last record of a session wins and a torn last line is ignored."""
+    records: dict[str, dict] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[record["session_id"]] = record
+    return list(records.values())
+
+
+def build_day_manifest(day: Path) -> int:
+    """
+    Write the manifest of a day stored before manifests existed, from its day directory
+    (YYYY/MM/DD) or its archive (YYYY/MM/DD.jsonl.gz). Records are stamped with the day
+    (or the file's mtime on that day), not the backfill time. Returns records written.
+    """
+    records = []
+    for file in iter_session_files(day) if day.is_dir() else [day]:
+        try:
+            content = load_session_file(file)
+            timestamp = stored_timestamp(file)
+        except Exception as e:
+            print(f"⚠️ Skipping '{file}': {e}")
+            continue
+        sessions = content if isinstance(content, list) else content.get("turns", [content]) if isinstance(content, dict) else []
+        for session in sessions:
+            if isinstance(session, dict) and (record := manifest_record(session, file, timestamp)):
+                records.append(record)
+    path = day_manifest_path(day)
+    tmp = path.with_name(f".tmp-{path.name}")
+    tmp.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+    tmp.replace(path)
+    return len(records)
+
+
+def day_manifest_path(day: Path) -> Path:
+    """Manifest of a day directory or day archive."""
+    return day.with_name(day.name[:2] + MANIFEST_SUFFIX)
+
+
+def ensure_manifests(logs_path: str | Path = DEFAULT_LOGS_PATH) -> int:
+    """Backfill manifests for stored days (directories or archives) that have none. Returns days backfilled."""
+    built = 0
+    for day in sorted(Path(logs_path).glob("[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9]*")):
+        if not (day.is_dir() or is_archive(day)) or day_manifest_path(day).exists():
+            continue
+        count = build_day_manifest(day)
+        print(f"🗂️ Manifest backfilled: {day} ({count} entries)")
+        built += 1
+    return built
+
+
+def manifest_files(logs_path: str | Path = DEFAULT_LOGS_PATH) -> List[Path]:
+    logs_path = Path(logs_path)
+    files = sorted(logs_path.glob(f"[0-9][0-9][0-9][0-9]/[0-9][0-9]/*{MANIFEST_SUFFIX}"))
+    entries = logs_path / MEMORY_ENTRIES_NAME
+    return files + ([entries] if entries.exists() else [])
+
+
+def read_manifests(logs_path: str | Path = DEFAULT_LOGS_PATH) -> List[Dict]:
+    """Every memory entry under logs_path, from manifests only (backfilled on first use)."""
+    ensure_manifests(logs_path)
+    entries = []
+    for path in manifest_files(logs_path):
+        try:
+            records = read_archive(path) if path.name == MEMORY_ENTRIES_NAME else read_manifest(path)
+            entries.extend({"file": path.name, **r} for r in records)
+        except Exception as e:
+            print(f"⚠️ Skipping '{path}': {e}")
+    return entries
@@ -0,0 +1,228 @@
+import re
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import List, Dict, Optional
+
+from memory.session_events import iter_session_files, load_session_file, stored_timestamp
+
+
+DEFAULT_LOGS_PATH = "memory/session_logs"
+INDEX_FILENAME = "memory_index.db"
+MIN_TOKEN_LENGTH = 2
+# Words too common to narrow a search; dropped unless the query has nothing else
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it",
+    "me", "of", "on", "or", "the", "then", "to", "what", "whats", "with",
+}
+
+
+def find_memory_entry(session: dict) -> Optional[Dict]:
+    """
+    Pull (query, result_requirement, solution_summary) out of a stored session: the first
+    object with original_goal_achieved == True anywhere in it, plus the first "query" string.
+    Returns None for sessions that never achieved their goal.
+    """
+    def recursive_find(obj) -> Optional[dict]:
+        if isinstance(obj, dict):
+            if obj.get("original_goal_achieved") is True:
+                return obj
+            for v in obj.values():
+                result = recursive_find(v)
+                if result:
+                    return result
+        elif isinstance(obj, list):
+            for item in obj:
+                result = recursive_find(item)
+                if result:
+                    return result
+        return None
+
+    def extract_query(obj) -> str:
+        if isinstance(obj, dict):
+            if "query" in obj and isinstance(obj["query"], str):
+                return obj["query"]
+            for v in obj.values():
+                q = extract_query(v)
+                if q:
+                    return q
+        elif isinstance(obj, list):
+            for item in obj:
+                q = extract_query(item)
+                if q:
+                    return q
+        return ""
+
+    achieved = recursive_find(session)
+    if not achieved:
+        return None
+    query = extract_query(session)
+    if not query:
+        return None
+    return {
+        "query": query,
+        "result_requirement": achieved.get("result_requirement", "") or "",
+        "solution_summary": achieved.get("solution_summary", "") or "",
+    }
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 OR-query of quoted prefix terms (no FTS syntax leaks through)."""
+    tokens = [t for t in re.findall(r"\w+", text.lower()) if len(t) >= MIN_TOKEN_LENGTH]
+    tokens = [t for t in tokens if t not in STOPWORDS] or tokens
+    return " OR ".join(f'"{t}"*' for t in dict.fromkeys(tokens))
+
+
+class MemoryIndex:
+    """
+    Persistent SQLite index of successful memory entries with FTS5 full-text search.
+
+    One row per session (query, result_requirement, solution_summary, file, timestamp),
+    kept in an external-content FTS5 table through triggers. Entries are upserted as
+    sessions are stored, so a search is a single indexed query instead of a scan of
+    every session file.
+    """
+
+    def __init__(self, path: str | Path = Path(DEFAULT_LOGS_PATH) / INDEX_FILENAME):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS entries (
+                session_id TEXT PRIMARY KEY,
+                file TEXT NOT NULL,
+                query TEXT NOT NULL,
+                result_requirement TEXT NOT NULL,
+                solution_summary TEXT NOT NULL,
+                timestamp TEXT NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+                query, result_requirement, solution_summary,
+                content='entries', content_rowid='rowid'
+            );
+            CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+                INSERT INTO entries_fts(rowid, query, result_requirement, solution_summary)
+                VALUES (new.rowid, new.query, new.result_requirement, new.solution_summary);
+            END;
+            CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+                INSERT INTO entries_fts(entries_fts, rowid, query, result_requirement, solution_summary)
+                VALUES ('delete', old.rowid, old.query, old.result_requirement, old.solution_summary);
+            END;
+            CREATE TRIGGER IF NOT EXISTS entries_au AFTER UPDATE ON entries BEGIN
+                INSERT INTO entries_fts(entries_fts, rowid, query, result_requirement, solution_summary)
+                VALUES ('delete', old.rowid, old.query, old.result_requirement, old.solution_summary);
+                INSERT INTO entries_fts(rowid, query, result_requirement, solution_summary)
+                VALUES (new.rowid, new.query, new.result_requirement, new.solution_summary);
+            END;
+            """
+        )
+        self._conn.commit()
+
+    def add_entry(self, session_id: str, file: str, query: str, result_requirement: str,
+                  solution_summary: str, timestamp: Optional[str] = None) -> None:
+        timestamp = timestamp or datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO entries (session_id, file, query, result_requirement, solution_summary, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(session_id) DO UPDATE SET
+                    file = excluded.file, query = excluded.query,
+                    result_requirement = excluded.result_requirement,
+                    solution_summary = excluded.solution_summary, timestamp = excluded.timestamp
+                """,
+                (session_id, file, query, result_requirement, solution_summary, timestamp),
+            )
+            self._conn.commit()
+
+    def add_session(self, session_data: dict, file: str | Path, timestamp: Optional[str] = None) -> bool:
+        """Index a stored session if it achieved its goal. Returns True when an entry was written."""
+        entry = find_memory_entry(session_data)
+        if entry is None:
+            return False
+        session_id = session_data.get("session_id") or Path(file).stem
+        self.add_entry(session_id, Path(file).name, entry["query"], entry["result_requirement"],
+                       entry["solution_summary"], timestamp)
+        return True
+
+    def remove(self, session_ids: List[str]) -> int:
+        if not session_ids:
+            return 0
+        with self._lock:
+            cursor = self._conn.executemany("DELETE FROM entries WHERE session_id = ?", [(s,) for s in session_ids])
+            self._conn.commit()
+        return cursor.rowcount
+
+    def search(self, text: str, limit: int = 50) -> List[Dict]:
+        """Best FTS5 (bm25) matches for the text; query terms weigh most."""
+        match = fts_query(text)
+        if not match:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT e.session_id, e.file, e.query, e.result_requirement, e.solution_summary, e.timestamp
+                FROM entries_fts JOIN entries e ON e.rowid = entries_fts.rowid
+                WHERE entries_fts MATCH ?
+                ORDER BY bm25(entries_fts, 2.0, 0.5, 1.0)
+                LIMIT ?
+                """,
+                (match, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def recent(self, limit: int = 50) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id, file, query, result_requirement, solution_summary, timestamp "
+                "FROM entries ORDER BY timestamp DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def rebuild(self, logs_path: str | Path = DEFAULT_LOGS_PATH) -> int:
+        """Backfill the index from every session file under logs_path. Returns entries indexed."""
+        indexed = 0
+        for file in iter_session_files(logs_path):
+            try:
+                content = load_session_file(file)
+                timestamp = stored_timestamp(file)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ Skipping '{file}': {e}")
+                continue
+            sessions = content if isinstance(content, list) else content.get("turns", [content]) if isinstance(content, dict) else []
+            for i, session in enumerate(sessions):
+                if not isinstance(session, dict):
+                    continue
+                session_id = session.get("session_id") or (file.stem if len(sessions) == 1 else f"{file.stem}#{i}")
+                if self.add_session({**session, "session_id": session_id}, file, timestamp):
+                    indexed += 1
+        print(f"📚 Memory index rebuilt: {indexed} entries from '{logs_path}'")
+        return indexed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared_indexes: dict[str, MemoryIndex] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_index(logs_path: str | Path = DEFAULT_LOGS_PATH) -> MemoryIndex:
+    """Process-wide index for a session log directory (stored inside it)."""
+    key = str(Path(logs_path).resolve())
+    with _shared_lock:
+        if key not in _shared_indexes:
+            _shared_indexes[key] = MemoryIndex(Path(logs_path) / INDEX_FILENAME)
+        return _shared_indexes[key]
@@ -0,0 +1,141 @@
+import json
+import random
+import re
+import tempfile
+from pathlib import Path
+
+from memory.memory_index import INDEX_FILENAME, MIN_TOKEN_LENGTH, STOPWORDS, MemoryIndex, find_memory_entry, fts_query
+from memory.session_events import iter_session_files, load_session_file
+
+WORDS = ["Factorial", "sum", "ASCII", "values", "India", "fibonacci", "numbers", "cube", "root", "of", "the",
+         "weather", "Paris", "log", "exp", "summarize", "document", "near", "and", "or", "not", "5", "120", "27"]
+PUNCTUATION = ["", "", "?", "!", ",", ".", ":", "'s", "-"]
+QUERIES = [
+    "factorial of 5", "What is the SUM of ASCII values?", "fib", "pa", "Paris weather",
+    "the", "of the and", "zzz", "5", "12",
+    # FTS5 syntax must be matched as plain words, never parsed
+    '"cube root', "cube*", "-root", "root -cube", "^sum", "values:India", "(log OR exp)",
+    "log AND exp", "NOT weather", "near(log exp)", "NEAR/2", "sum + 5", "{query}: sum", "'; DROP TABLE entries; --",
+    "", "   ", "?!*", "a",
+]
+
+
+def write_sessions(base: Path, count: int, seed: int = 11) -> None:
+    rng = random.Random(seed)
+
+    def text(n):
+        return " ".join(rng.choice(WORDS) + rng.choice(PUNCTUATION) for _ in range(n))
+
+    for i in range(count):
+        solved = i % 5 != 4
+        query = text(rng.randint(1, 6))
+        data = {"session_id": f"s{i}", "original_query": query, "query": query,
+                "state": {"original_goal_achieved": solved, "result_requirement": text(rng.randint(0, 3)),
+                          "solution_summary": text(rng.randint(0, 8))}}
+        path = base / "2026" / "01" / f"{5 + i % 3:02d}" / f"s{i}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def scan(base: Path) -> dict[str, dict]:
+    """Memory entries the old search read by scanning every session file."""
+    entries = {}
+    for file in iter_session_files(base):
+        session = load_session_file(file)
+        entry = find_memory_entry(session)
+        if entry is not None:
+            entries[session["session_id"]] = entry
+    return entries
+
+
+def scan_candidates(entries: dict[str, dict], text: str) -> set[str]:
+    """Entries where some query word (stopwords aside) starts a word of a searched field."""
+    tokens = [t for t in re.findall(r"\w+", text.lower()) if len(t) >= MIN_TOKEN_LENGTH]
+    tokens = [t for t in tokens if t not in STOPWORDS] or tokens
+    found = set()
+    for session_id, entry in entries.items():
+        words = re.findall(r"\w+", " ".join(entry.values()).lower())
+        if any(w.startswith(t) for t in tokens for w in words):
+            found.add(session_id)
+    return found
+
+
+def ids(rows):
+    return {row["session_id"] for row in rows}
+
+
+def integrity_ok(index: MemoryIndex) -> bool:
+    with index._lock:
+        index._conn.execute("INSERT INTO entries_fts(entries_fts, rank) VALUES ('integrity-check', 1)")
+    return True
+
+
+def test_fts_candidates_match_scan():
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        write_sessions(base, 80)
+        entries = scan(base)
+        index = MemoryIndex(base / INDEX_FILENAME)
+        assert index.rebuild(base) == len(entries) == 64
+        assert index.count() == len(entries)
+        for text in QUERIES:
+            assert ids(index.search(text, limit=1000)) == scan_candidates(entries, text), text
+        assert integrity_ok(index)
+        index.close()
+
+
+def test_fts_query_never_leaks_syntax():
+    assert fts_query('"cube root') == '"cube"* OR "root"*'
+    assert fts_query("log AND exp") == '"log"* OR "exp"*'
+    assert fts_query("NEAR/2") == '"near"*'
+    assert fts_query("the of") == '"the"* OR "of"*'
+    assert fts_query("Sum sum SUM") == '"sum"*'
+    assert fts_query("?!* a") == ""
+
+
+def test_triggers_follow_upserts_and_removals():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = MemoryIndex(Path(tmp) / INDEX_FILENAME)
+        index.add_entry("s1", "s1.json", "factorial of 5", "numeric result", "The factorial is 120")
+        index.add_entry("s2", "s2.json", "cube root of 27", "numeric result", "The cube root is 3")
+        assert ids(index.search("factorial")) == {"s1"}
+
+        # An upsert replaces the indexed text; the old words stop matching
+        index.add_entry("s1", "s1.json", "fibonacci numbers", "sequence", "0 1 1 2 3")
+        assert index.count() == 2
+        assert ids(index.search("factorial")) == set()
+        assert ids(index.search("fibonacci")) == {"s1"}
+        assert [row["file"] for row in index.search("fibonacci")] == ["s1.json"]
+
+        assert index.remove(["s2", "missing"]) == 1
+        assert ids(index.search("cube root")) == set()
+        assert index.count() == 1
+        assert integrity_ok(index)
+        index.close()
+
+
+def test_rebuild_backfills_like_incremental_adds():
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp) / "logs"
+        write_sessions(base, 30, seed=5)
+        incremental = MemoryIndex(Path(tmp) / "incremental.db")
+        for file in iter_session_files(base):
+            incremental.add_session(load_session_file(file), file)
+
+        rebuilt = MemoryIndex(base / INDEX_FILENAME)
+        assert rebuilt.rebuild(base) == incremental.count()
+        # Rebuilding again upserts the same rows
+        assert rebuilt.rebuild(base) == incremental.count() == rebuilt.count()
+        for text in QUERIES:
+            assert ids(rebuilt.search(text, limit=1000)) == ids(incremental.search(text, limit=1000)), text
+        assert integrity_ok(rebuilt)
+        incremental.close()
+        rebuilt.close()
+
+
+if __name__ == "__main__":
+    test_fts_candidates_match_scan()
+    test_fts_query_never_leaks_syntax()
+    test_triggers_follow_upserts_and_removals()
+    test_rebuild_backfills_like_incremental_adds()
+    print("✅ memory index tests passed")
@@ -1,110 +1,333 @@
 import os
 import json
+import threading
 from pathlib import Path
 from typing import List, Dict
-from rapidfuzz import fuzz
+import numpy as np
+from rapidfuzz import fuzz, process
+from memory.memory_index import MemoryIndex, get_shared_index
+from memory.manifest import MANIFEST_SUFFIX, MEMORY_ENTRIES_NAME, ensure_manifests, read_manifests
+from memory.session_events import read_archive
+from memory.semantic_index import SemanticMemoryIndex, get_shared_semantic_index, semantic_search_enabled
+
+# FTS candidates re-ranked with the fuzzy score; recent entries are used when FTS finds nothing
+CANDIDATE_POOL = 50
+# Hybrid ranking: weight of cosine similarity (scaled to 0-100) against the fuzzy score
+SEMANTIC_WEIGHT = 0.6
+# Paginated search (LiveMemoryIndex.search): an entry matches when the query or the summary
+# scores at least this partial ratio (0-100); unrelated text often reaches 60-70 on short overlaps
+MIN_MATCH_SCORE = 80
+
+
+class FuzzyScorer:
+    """
+    Bulk fuzzy scoring of memory entries.
+
+    Query and summary strings are lowercased once; each search scores all entries with
+    two multi-threaded rapidfuzz cdist calls, applies the length penalty in NumPy and
+    selects the top k with argpartition. Scores and tie order match the original loop.
+    """
+
+    def __init__(self, entries: List[Dict]):
+        self.entries = entries
+        self.queries = [e["query"].lower() for e in entries]
+        self.summaries = [e["solution_summary"].lower() for e in entries]
+        self.length_penalty = np.fromiter((len(e["solution_summary"]) for e in entries),
+                                          dtype=np.float64, count=len(entries)) / 100
+
+    @classmethod
+    def precomputed(cls, entries: List[Dict], queries: List[str], summaries: List[str], length_penalty: np.ndarray) -> "FuzzyScorer":
+        """Scorer over fields that were already lowercased (LiveMemoryIndex keeps them up to date)."""
+        scorer = cls.__new__(cls)
+        scorer.entries, scorer.queries, scorer.summaries, scorer.length_penalty = entries, queries, summaries, length_penalty
+        return scorer
+
+    def field_scores(self, user_query: str) -> tuple[np.ndarray, np.ndarray]:
+        needle = [user_query.lower()]
+        query_scores = process.cdist(needle, self.queries, scorer=fuzz.partial_ratio, dtype=np.float64, workers=-1)[0]
+        summary_scores = process.cdist(needle, self.summaries, scorer=fuzz.partial_ratio, dtype=np.float64, workers=-1)[0]
+        return query_scores, summary_scores
+
+    def scores(self, user_query: str) -> np.ndarray:
+        query_scores, summary_scores = self.field_scores(user_query)
+        return 0.5 * query_scores + 0.4 * summary_scores - 0.05 * self.length_penalty
+
+    def top_k(self, user_query: str, k: int) -> List[Dict]:
+        if not self.entries or k <= 0:
+            return []
+        return [self.entries[i] for i in top_k_indices(self.scores(user_query), k)]
+
+    def matches(self, user_query: str, k: int, min_score: float) -> tuple[List[Dict], int]:
+        """The k best entries whose query or summary scores at least min_score, and how many do."""
+        if not self.entries:
+            return [], 0
+        query_scores, summary_scores = self.field_scores(user_query)
+        scores = 0.5 * query_scores + 0.4 * summary_scores - 0.05 * self.length_penalty
+        matched = np.flatnonzero(np.maximum(query_scores, summary_scores) >= min_score)
+        if k <= 0 or not len(matched):
+            return [], len(matched)
+        return [self.entries[i] for i in matched[top_k_indices(scores[matched], k)]], len(matched)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k best scores, best first; earlier entries win ties as with a stable sort."""
+    k = min(k, len(scores))
+    kth_score = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    above = np.flatnonzero(scores > kth_score)
+    ties = np.flatnonzero(scores == kth_score)[:k - len(above)]
+    candidates = np.concatenate([above, ties])
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+class LiveMemoryIndex:
+    """
+    Process-wide in-memory index of the memory manifests under one log directory.
+
+    Loaded once, then refreshed incrementally before each search: directory listings are
+    re-read only when a directory's mtime changes (new days or months), manifests are
+    read from the byte offset reached last time (they are append-only), and replaced,
+    truncated or deleted manifests are reloaded or dropped. Lowercased fields and length
+    penalties are kept per entry, so a refresh with no changes costs a few stat() calls
+    and a search is just the bulk fuzzy scoring. Refreshes are serialized by a lock;
+    searches use an immutable FuzzyScorer snapshot and can run concurrently.
+    """
+
+    def __init__(self, logs_path: str | Path = "memory/session_logs"):
+        self.logs_path = Path(logs_path)
+        self._lock = threading.Lock()
+        self._dirs: dict[Path, tuple[int, list[str]]] = {}
+        self._files: dict[Path, tuple[int, int, int]] = {}  # path -> (inode, mtime_ns, bytes read)
+        self._entries: List[Dict] = []
+        self._queries: List[str] = []
+        self._summaries: List[str] = []
+        self._penalties: List[float] = []
+        self._sources: List[Path] = []
+        self._positions: dict[str, int] = {}
+        self._scorer = FuzzyScorer([])
+        self._backfilled = False
+
+    def scorer(self) -> FuzzyScorer:
+        self.refresh()
+        return self._scorer
+
+    def entries(self) -> List[Dict]:
+        return self.scorer().entries
+
+    def search(self, user_query: str, offset: int = 0, limit: int = 5,
+               min_score: float = MIN_MATCH_SCORE) -> tuple[List[Dict], int]:
+        """One page of ranked matches (see FuzzyScorer.matches) and the number of matches."""
+        page, total = self.scorer().matches(user_query, offset + limit, min_score)
+        return page[offset:], total
+
+    def recent(self, offset: int = 0, limit: int = 10) -> tuple[List[Dict], int]:
+        """One page of entries, newest first, and the total."""
+        entries = sorted(self.scorer().entries, key=lambda e: e.get("timestamp", ""), reverse=True)
+        return entries[offset:offset + limit], len(entries)
+
+    def source_of(self, session_id: str) -> Path | None:
+        """Manifest (or memory-entry file) the session's entry came from."""
+        with self._lock:
+            position = self._positions.get(session_id)
+            return self._sources[position] if position is not None else None
+
+    def refresh(self) -> bool:
+        """Pick up new or changed manifests. Returns True when the entries changed."""
+        with self._lock:
+            if not self._backfilled:
+                ensure_manifests(self.logs_path)
+                self._backfilled = True
+            changed = False
+            current = set(self._manifest_paths())
+            for path in set(self._files) - current:
+                changed |= self._drop_source(path)
+                del self._files[path]
+            for path in sorted(current):
+                changed |= self._refresh_file(path)
+            if changed:
+                self._scorer = FuzzyScorer.precomputed(
+                    list(self._entries), list(self._queries), list(self._summaries),
+                    np.array(self._penalties, dtype=np.float64),
+                )
+            return changed
+
+    def _listing(self, directory: Path) -> list[str]:
+        try:
+            mtime = directory.stat().st_mtime_ns
+        except FileNotFoundError:
+            return []
+        cached = self._dirs.get(directory)
+        if cached is None or cached[0] != mtime:
+            cached = self._dirs[directory] = (mtime, sorted(os.listdir(directory)))
+        return cached[1]
+
+    def _manifest_paths(self):
+        for year in self._listing(self.logs_path):
+            if len(year) == 4 and year.isdigit():
+                for month in self._listing(self.logs_path / year):
+                    if len(month) == 2 and month.isdigit():
+                        month_dir = self.logs_path / year / month
+                        for name in self._listing(month_dir):
+                            if name.endswith(MANIFEST_SUFFIX) and not name.startswith("."):
+                                yield month_dir / name
+            elif year == MEMORY_ENTRIES_NAME:
+                yield self.logs_path / year
+
+    def _refresh_file(self, path: Path) -> bool:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return False
+        known = self._files.get(path)
+        appendable = path.name.endswith(MANIFEST_SUFFIX)
+        if known and known[0] == stat.st_ino and known[1] == stat.st_mtime_ns:
+            return False
+        if appendable and known and known[0] == stat.st_ino and stat.st_size >= known[2]:
+            offset, changed = known[2], False
+        else:
+            offset, changed = 0, self._drop_source(path)
+
+        if appendable:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+            complete = data[: data.rfind(b"\n") + 1]  # a torn last line is read next time
+            offset += len(complete)
+            records = []
+            for line in complete.splitlines():
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        else:
+            records = read_archive(path)
+            offset = stat.st_size
+        for record in records:
+            self._upsert({"file": path.name, **record}, path)
+            changed = True
+        self._files[path] = (stat.st_ino, stat.st_mtime_ns, offset)
+        return changed
+
+    def _upsert(self, entry: Dict, source: Path):
+        fields = (entry, entry["query"].lower(), entry["solution_summary"].lower(),
+                  len(entry["solution_summary"]) / 100, source)
+        columns = (self._entries, self._queries, self._summaries, self._penalties, self._sources)
+        position = self._positions.get(entry["session_id"])
+        if position is None:
+            self._positions[entry["session_id"]] = len(self._entries)
+            for column, value in zip(columns, fields):
+                column.append(value)
+        else:
+            for column, value in zip(columns, fields):
+                column[position] = value
+
+    def _drop_source(self, source: Path) -> bool:
+        keep = [i for i, s in enumerate(self._sources) if s != source]
+        if len(keep) == len(self._entries):
+            return False
+        self._entries = [self._entries[i] for i in keep]
+        self._queries = [self._queries[i] for i in keep]
+        self._summaries = [self._summaries[i] for i in keep]
+        self._penalties = [self._penalties[i] for i in keep]
+        self._sources = [self._sources[i] for i in keep]
+        self._positions = {e["session_id"]: i for i, e in enumerate(self._entries)}
+        return True
+
+
+_live_indexes: dict[str, LiveMemoryIndex] = {}
+_shared_searches: dict[str, "MemorySearch"] = {}
+_shared_lock = threading.Lock()
+
+
+def get_live_index(logs_path: str | Path = "memory/session_logs") -> LiveMemoryIndex:
+    key = str(Path(logs_path).resolve())
+    with _shared_lock:
+        if key not in _live_indexes:
+            _live_indexes[key] = LiveMemoryIndex(logs_path)
+        return _live_indexes[key]
 
 
 class MemorySearch:
-    def __init__(self, logs_path: str = "memory/session_logs"):
+    def __init__(self, logs_path: str = "memory/session_logs", use_index: bool = True, index: MemoryIndex | None = None,
+                 use_semantic: bool | None = None, semantic_index: SemanticMemoryIndex | None = None,
+                 semantic_weight: float = SEMANTIC_WEIGHT):
         self.logs_path = Path(logs_path)
+        # The SQLite/FTS5 index replaces the per-query scan of every session file
+        self.index = index or (get_shared_index(self.logs_path) if use_index else None)
+        # Without the database, the process-wide in-memory index refreshes from the manifests
+        self.live_index = get_live_index(self.logs_path) if self.index is None else None
+        if self.index is not None and self.index.count() == 0:
+            self._backfill_index()
 
-    def search_memory(self, user_query: str, top_k: int = 3) -> List[Dict]:
-        memory_entries = self._load_queries()
-        scored_results = []
-
-        for entry in memory_entries:
-            query_score = fuzz.partial_ratio(user_query.lower(), entry["query"].lower())
-            summary_score = fuzz.partial_ratio(user_query.lower(), entry["solution_summary"].lower())
-            length_penalty = len(entry["solution_summary"]) / 100
-            score = 0.5 * query_score + 0.4 * summary_score - 0.05 * length_penalty
-            scored_results.append((score, entry))
-
-        top_matches = sorted(scored_results, key=lambda x: x[0], reverse=True)[:top_k]
-        return [match[1] for match in top_matches]
-
-    def _load_queries(self) -> List[Dict]:
-        memory_entries = []
-        all_json_files = list(self.logs_path.rglob("*.json"))
-        print(f"🔍 Found {len(all_json_files)} JSON file(s) in '{self.logs_path}'")
-
-        for file in all_json_files:
-            count_before = len(memory_entries)
+        # Embedding search catches paraphrases that share no words with the stored query
+        if use_semantic is None:
+            use_semantic = semantic_index is not None or semantic_search_enabled()
+        self.semantic_index = None
+        self.semantic_weight = semantic_weight
+        if use_semantic and self.index is not None:
             try:
-                with open(file, 'r', encoding='utf-8') as f:
-                    content = json.load(f)
-
-                if isinstance(content, list):  # FORMAT 1
-                    for session in content:
-                        self._extract_entry(session, file.name, memory_entries)
-                elif isinstance(content, dict) and "session_id" in content:  # FORMAT 2
-                    self._extract_entry(content, file.name, memory_entries)
-                elif isinstance(content, dict) and "turns" in content:  # FORMAT 3
-                    for turn in content["turns"]:
-                        self._extract_entry(turn, file.name, memory_entries)
+                self.semantic_index = semantic_index or get_shared_semantic_index(self.logs_path)
+                self._backfill_semantic()
+            except Exception as e:
+                print(f"⚠️ Semantic memory search disabled: {e}")
+                self.semantic_index = None
 
+    def _backfill_index(self):
+        entries = read_manifests(self.logs_path)
+        for e in entries:
+            self.index.add_entry(e["session_id"], e["file"], e["query"], e["result_requirement"],
+                                 e["solution_summary"], e.get("timestamp"))
+        if entries:
+            print(f"📚 Memory index backfilled from manifests: {len(entries)} entries")
+
+    def _backfill_semantic(self):
+        total = self.index.count()
+        if self.semantic_index.count() >= total:
+            return
+        added = sum(
+            self.semantic_index.add_entry(e["session_id"], e["file"], e["query"], e["result_requirement"], e["solution_summary"])
+            for e in self.index.recent(limit=total)
+        )
+        print(f"🧭 Semantic index backfilled: {added} entries")
+
+    def search_memory(self, user_query: str, top_k: int = 3) -> List[Dict]:
+        if self.index is None:
+            return self.live_index.scorer().top_k(user_query, top_k)
+        memory_entries, semantic_ok = self._load_candidates(user_query, top_k)
+        if not semantic_ok or not memory_entries or top_k <= 0:
+            return FuzzyScorer(memory_entries).top_k(user_query, top_k)
+        return self._hybrid_top_k(user_query, memory_entries, top_k)
+
+    def _load_candidates(self, user_query: str, top_k: int) -> tuple[List[Dict], bool]:
+        """FTS matches plus nearest embeddings; the flag is False when semantic ranking can't be used."""
+        pool = max(CANDIDATE_POOL, top_k * 10)
+        candidates = self.index.search(user_query, limit=pool)
+        semantic_ok = False
+        if self.semantic_index is not None:
+            try:
+                seen = {e["session_id"] for e in candidates}
+                candidates += [e for e, _ in self.semantic_index.search(user_query, k=pool) if e["session_id"] not in seen]
+                semantic_ok = True
             except Exception as e:
-                print(f"⚠️ Skipping '{file}': {e}")
-                continue
-
-            count_after = len(memory_entries)
-            if count_after > count_before:
-                print(f"✅ {file.name}: {count_after - count_before} matching entries")
-
-        print(f"📦 Total usable memory entries collected: {len(memory_entries)}\n")
-        return memory_entries
-
-    def _extract_entry(self, obj: dict, file_name: str, memory_entries: List[Dict]):
-        original_obj = obj  # keep top-level reference
-
-        def recursive_find(obj: dict) -> dict | None:
-            if isinstance(obj, dict):
-                if obj.get("original_goal_achieved") is True:
-                    query = extract_query(original_obj)  # 💡 pull from full session object
-                    return {
-                        "query": query,
-                        "summary": obj.get("solution_summary", ""),
-                        "requirement": obj.get("result_requirement", "")
-                    }
-                for v in obj.values():
-                    result = recursive_find(v)
-                    if result:
-                        return result
-            elif isinstance(obj, list):
-                for item in obj:
-                    result = recursive_find(item)
-                    if result:
-                        return result
-            return None
-
-
-        def extract_query(obj: dict) -> str:
-            if isinstance(obj, dict):
-                if "query" in obj and isinstance(obj["query"], str):
-                    return obj["query"]
-                for v in obj.values():
-                    q = extract_query(v)
-                    if q:
-                        return q
-            elif isinstance(obj, list):
-                for item in obj:
-                    q = extract_query(item)
-                    if q:
-                        return q
-            return ""
+                print(f"⚠️ Semantic memory search unavailable, using text match only: {e}")
+        return candidates or self.index.recent(limit=pool), semantic_ok
 
-        try:
-            match = recursive_find(obj)
-            if match and match["query"]:
-                print(f"✅ Extracted: {match['query'][:40]} → {match['summary'][:40]}")
-                memory_entries.append({
-                    "file": file_name,
-                    "query": match["query"],
-                    "result_requirement": match["requirement"],
-                    "solution_summary": match["summary"]
-                })
-        except Exception as e:
-            print(f"❌ Error parsing {file_name}: {e}")
+    def _hybrid_top_k(self, user_query: str, entries: List[Dict], top_k: int) -> List[Dict]:
+        """Rank by semantic_weight * cosine * 100 + (1 - semantic_weight) * fuzzy score."""
+        fuzzy = FuzzyScorer(entries).scores(user_query)
+        # The query embedding is cached by the preceding search, so this is a local lookup
+        sims = self.semantic_index.similarities(user_query, [e["session_id"] for e in entries])
+        cosine = np.fromiter((sims.get(e["session_id"], 0.0) for e in entries), dtype=np.float64, count=len(entries))
+        scores = self.semantic_weight * cosine * 100 + (1 - self.semantic_weight) * fuzzy
+        return [entries[i] for i in top_k_indices(scores, top_k)]
+
+
+def get_shared_memory_search(logs_path: str = "memory/session_logs") -> MemorySearch:
+    """One MemorySearch per log directory for the whole process (the agent loop searches every query)."""
+    key = str(Path(logs_path).resolve())
+    with _shared_lock:
+        if key not in _shared_searches:
+            _shared_searches[key] = MemorySearch(logs_path)
+        return _shared_searches[key]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+import random
+
+import numpy as np
+from rapidfuzz import fuzz
+
+from memory.memory_search import FuzzyScorer, top_k_indices
+
+WORDS = ["factorial", "sum", "ascii", "india", "fibonacci", "cube", "root", "of", "the", "numbers",
+         "exponential", "log", "document", "summarize", "weather", "paris", "5", "10", "120"]
+QUERIES = ["factorial of 5", "Sum the ASCII values of INDIA", "what is the weather in paris",
+           "fibonacci", "", "zzzz", "ROOT", "the"]
+
+
+def entries(count, seed=7):
+    rng = random.Random(seed)
+
+    def text(n):
+        return " ".join(rng.choice(WORDS) for _ in range(n))
+
+    made = []
+    for i in range(count):
+        # Every third entry repeats an earlier one, so equal scores are common
+        source = made[rng.randrange(len(made))] if made and i % 3 == 0 else None
+        made.append({
+            "session_id": f"s{i}",
+            "query": source["query"] if source else text(rng.randint(1, 6)).capitalize(),
+            "solution_summary": source["solution_summary"] if source else text(rng.randint(0, 12)),
+        })
+    return made
+
+
+def reference_top_k(memory_entries, user_query, top_k):
+    """The per-entry loop FuzzyScorer replaced."""
+    scored_results = []
+    for entry in memory_entries:
+        query_score = fuzz.partial_ratio(user_query.lower(), entry["query"].lower())
+        summary_score = fuzz.partial_ratio(user_query.lower(), entry["solution_summary"].lower())
+        length_penalty = len(entry["solution_summary"]) / 100
+        score = 0.5 * query_score + 0.4 * summary_score - 0.05 * length_penalty
+        scored_results.append((score, entry))
+    top_matches = sorted(scored_results, key=lambda x: x[0], reverse=True)[:top_k]
+    return [match[1] for match in top_matches]
+
+
+def ids(found):
+    return [e["session_id"] for e in found]
+
+
+def test_top_k_matches_reference_loop():
+    for count in (1, 2, 7, 60):
+        memory = entries(count, seed=count)
+        scorer = FuzzyScorer(memory)
+        for user_query in QUERIES:
+            for k in (1, 3, count - 1, count, count + 5):
+                if k <= 0:
+                    continue
+                assert ids(scorer.top_k(user_query, k)) == ids(reference_top_k(memory, user_query, k)), (count, user_query, k)
+    assert FuzzyScorer([]).top_k("factorial", 3) == []
+    assert FuzzyScorer(entries(5)).top_k("factorial", 0) == []
+
+
+def test_precomputed_scorer_matches():
+    memory = entries(30)
+    precomputed = FuzzyScorer.precomputed(
+        memory, [e["query"].lower() for e in memory], [e["solution_summary"].lower() for e in memory],
+        np.array([len(e["solution_summary"]) / 100 for e in memory], dtype=np.float64),
+    )
+    for user_query in QUERIES:
+        assert ids(precomputed.top_k(user_query, 10)) == ids(reference_top_k(memory, user_query, 10))
+
+
+def test_matches_filters_then_ranks():
+    memory = entries(60)
+    scorer = FuzzyScorer(memory)
+    for user_query in QUERIES:
+        matched = [e for e in memory
+                   if max(fuzz.partial_ratio(user_query.lower(), e["query"].lower()),
+                          fuzz.partial_ratio(user_query.lower(), e["solution_summary"].lower())) >= 80]
+        for k in (1, 5, len(memory) + 1):
+            page, total = scorer.matches(user_query, k, 80)
+            assert total == len(matched)
+            assert ids(page) == ids(reference_top_k(matched, user_query, k)), (user_query, k)
+
+
+def test_top_k_indices_is_a_stable_sort():
+    rng = np.random.default_rng(3)
+    for size in (1, 2, 5, 40):
+        # Few distinct values: most of the work is breaking ties by position
+        scores = rng.integers(0, 4, size).astype(np.float64)
+        expected = sorted(range(size), key=lambda i: scores[i], reverse=True)
+        for k in (1, size // 2 or 1, size, size + 3):
+            assert list(top_k_indices(scores, k)) == expected[:k], (scores, k)
+
+
+if __name__ == "__main__":
+    test_top_k_matches_reference_loop()
+    test_precomputed_scorer_matches()
+    test_matches_filters_then_ranks()
+    test_top_k_indices_is_a_stable_sort()
+    print("✅ memory search tests passed")
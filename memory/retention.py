@@ -0,0 +1,233 @@
+"""
+Tiered retention for memory/session_logs.
+
+  hot      YYYY/MM/DD/*.json (+ *.events.jsonl)   the last `hot_days` days, untouched
+  archive  YYYY/MM/DD.jsonl.gz|.jsonl.zst          one compressed JSONL file per older day
+  expired  removed after `expire_days`; their memory entries are deduplicated into
+           memory_entries.jsonl.gz so past solutions stay searchable
+
+Day manifests (memory/manifest.py) stay next to archived days; an expired day's manifest
+is dropped and its entries are read from the memory-entry file instead. Run offline:
+
+    python -m memory.retention --hot-days 7 --expire-days 180 --compression zstd
+"""
+import os
+import re
+import json
+import shutil
+import argparse
+from pathlib import Path
+from datetime import date
+from dataclasses import dataclass
+from typing import Optional
+
+import yaml
+
+from memory.memory_index import DEFAULT_LOGS_PATH, find_memory_entry, get_shared_index
+from memory.manifest import MANIFEST_SUFFIX, MEMORY_ENTRIES_NAME
+from memory.semantic_index import INDEX_DIRNAME, get_shared_semantic_index
+from memory.session_events import (
+    ARCHIVE_SUFFIXES, zstandard, iter_session_files, load_session_file, open_archive, read_archive,
+)
+
+PROFILE_YAML = Path(__file__).parent.parent / "config" / "profiles.yaml"
+
+
+@dataclass
+class RetentionPolicy:
+    hot_days: int = 7
+    expire_days: Optional[int] = None  # None keeps archives forever
+    compression: str = "gzip"          # gzip | zstd
+
+    def __post_init__(self):
+        if self.hot_days < 1:
+            raise ValueError("hot_days must be at least 1 (today is always hot)")
+        if self.expire_days is not None and self.expire_days <= self.hot_days:
+            raise ValueError("expire_days must be greater than hot_days")
+        if self.compression not in ARCHIVE_SUFFIXES:
+            raise ValueError(f"compression must be one of {list(ARCHIVE_SUFFIXES)}")
+        if self.compression == "zstd" and zstandard is None:
+            print("⚠️ zstandard is not installed; archiving with gzip instead")
+            self.compression = "gzip"
+
+
+def load_retention_policy(profile_path: Path = PROFILE_YAML) -> RetentionPolicy:
+    """profiles.yaml `memory.retention`."""
+    try:
+        profile = yaml.safe_load(Path(profile_path).read_text()) or {}
+    except (OSError, yaml.YAMLError):
+        profile = {}
+    config = (profile.get("memory") or {}).get("retention") or {}
+    return RetentionPolicy(
+        hot_days=int(config.get("hot_days", 7)),
+        expire_days=config.get("expire_days"),
+        compression=config.get("compression", "gzip"),
+    )
+
+
+def _digits(name: str, width: int) -> bool:
+    return len(name) == width and name.isdigit()
+
+
+def find_days(logs_path: Path) -> dict[date, dict[str, Path]]:
+    """Stored days -> {"hot": day dir, "archive": archive file} (either may be missing)."""
+    days: dict[date, dict[str, Path]] = {}
+    archive_pattern = re.compile(r"^(\d{2})(" + "|".join(re.escape(s) for s in ARCHIVE_SUFFIXES.values()) + r")$")
+    for year in logs_path.iterdir() if logs_path.exists() else []:
+        if not (year.is_dir() and _digits(year.name, 4)):
+            continue
+        for month in year.iterdir():
+            if not (month.is_dir() and _digits(month.name, 2)):
+                continue
+            for item in month.iterdir():
+                match = archive_pattern.match(item.name)
+                if item.is_dir() and _digits(item.name, 2):
+                    kind, day = "hot", item.name
+                elif item.is_file() and match:
+                    kind, day = "archive", match.group(1)
+                else:
+                    continue
+                try:
+                    key = date(int(year.name), int(month.name), int(day))
+                except ValueError:
+                    continue
+                days.setdefault(key, {})[kind] = item
+    return days
+
+
+def sessions_in(content, file: Path) -> list[dict]:
+    """Normalize any stored layout (list, single session, {"turns": [...]}) to sessions with ids."""
+    sessions = content if isinstance(content, list) else content.get("turns", [content]) if isinstance(content, dict) else []
+    sessions = [s for s in sessions if isinstance(s, dict)]
+    stem = file.name.split(".")[0]
+    return [
+        {**s, "session_id": s.get("session_id") or (stem if len(sessions) == 1 else f"{stem}#{i}")}
+        for i, s in enumerate(sessions)
+    ]
+
+
+def read_day(paths: dict[str, Path]) -> list[dict]:
+    """All sessions of one day, hot files overriding archived copies of the same session."""
+    by_id: dict[str, dict] = {}
+    if "archive" in paths:
+        for session in sessions_in(read_archive(paths["archive"]), paths["archive"]):
+            by_id[session["session_id"]] = session
+    if "hot" in paths:
+        for file in iter_session_files(paths["hot"]):
+            try:
+                content = load_session_file(file)
+            except Exception as e:
+                print(f"⚠️ Skipping '{file}': {e}")
+                continue
+            for session in sessions_in(content, file) if content else []:
+                by_id[session["session_id"]] = session
+    return list(by_id.values())
+
+
+def write_jsonl(path: Path, records: list[dict]):
+    """Atomically (temp file + rename) write records as compressed JSONL."""
+    tmp = path.with_name(f".tmp-{path.name}")  # keeps the suffix that selects the codec
+    with open_archive(tmp, "wt") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    os.replace(tmp, path)
+
+
+def entry_key(entry: dict) -> tuple[str, str]:
+    return (" ".join(entry["query"].lower().split()), " ".join(entry["solution_summary"].lower().split()))
+
+
+def apply_retention(logs_path: str | Path = DEFAULT_LOGS_PATH, policy: Optional[RetentionPolicy] = None,
+                    today: Optional[date] = None, dry_run: bool = False) -> dict:
+    """Archive days older than hot_days and expire days older than expire_days. Returns counts."""
+    logs_path = Path(logs_path)
+    policy = policy or load_retention_policy()
+    today = today or date.today()
+    stats = {"archived_days": 0, "archived_sessions": 0, "expired_days": 0, "expired_sessions": 0,
+             "entries_kept": 0, "duplicates_dropped": 0}
+
+    entries_path = logs_path / MEMORY_ENTRIES_NAME
+    kept = {entry_key(e): e for e in read_archive(entries_path)} if entries_path.exists() else {}
+    dropped_ids: list[str] = []
+    entries_changed = False
+
+    for day, paths in sorted(find_days(logs_path).items()):
+        age = (today - day).days
+        if age < policy.hot_days:
+            continue
+        expire = policy.expire_days is not None and age >= policy.expire_days
+        if not expire and "hot" not in paths and paths["archive"].name.endswith(ARCHIVE_SUFFIXES[policy.compression]):
+            continue  # already archived in the configured format
+
+        sessions = read_day(paths)
+        if expire:
+            # Sessions are dropped; each distinct solved (query, summary) survives once, as its newest copy
+            for session in sessions:
+                entry = find_memory_entry(session)
+                if entry is None:
+                    continue
+                key = entry_key(entry)
+                if key in kept:
+                    dropped_ids.append(kept[key]["session_id"])
+                    stats["duplicates_dropped"] += 1
+                kept[key] = {"session_id": session["session_id"], "date": day.isoformat(),
+                             "original_goal_achieved": True, **entry}
+                entries_changed = True
+            stats["expired_days"] += 1
+            stats["expired_sessions"] += len(sessions)
+        else:
+            stats["archived_days"] += 1
+            stats["archived_sessions"] += len(sessions)
+
+        if dry_run:
+            continue
+        if not expire and sessions:
+            month_dir = logs_path / f"{day.year}" / f"{day.month:02d}"
+            write_jsonl(month_dir / f"{day.day:02d}{ARCHIVE_SUFFIXES[policy.compression]}", sessions)
+        for kind, path in paths.items():
+            if kind == "hot":
+                shutil.rmtree(path)
+            elif expire or not path.name.endswith(ARCHIVE_SUFFIXES[policy.compression]):
+                path.unlink()
+        if expire:
+            # The day's entries now live in memory_entries.jsonl.gz
+            (logs_path / f"{day.year}" / f"{day.month:02d}" / f"{day.day:02d}{MANIFEST_SUFFIX}").unlink(missing_ok=True)
+
+    stats["entries_kept"] = len(kept)
+    if not dry_run:
+        if entries_changed or dropped_ids:
+            write_jsonl(entries_path, list(kept.values()))
+        if dropped_ids:
+            get_shared_index(logs_path).remove(dropped_ids)
+            # The semantic index keeps its own rows and vectors (only if one was ever built)
+            if (logs_path / INDEX_DIRNAME / "entries.db").exists():
+                get_shared_semantic_index(logs_path).remove(dropped_ids)
+        for month in sorted(logs_path.glob("[0-9]" * 4 + "/[0-9][0-9]"), reverse=True):
+            if not any(month.iterdir()):
+                month.rmdir()
+                if not any(month.parent.iterdir()):
+                    month.parent.rmdir()
+    return stats
+
+
+def main():
+    defaults = load_retention_policy()
+    parser = argparse.ArgumentParser(description="Archive and expire stored agent sessions")
+    parser.add_argument("--logs-path", default=DEFAULT_LOGS_PATH)
+    parser.add_argument("--hot-days", type=int, default=defaults.hot_days, help="days kept as plain JSON files")
+    parser.add_argument("--expire-days", type=int, default=defaults.expire_days,
+                        help="days after which sessions are dropped (memory entries are kept)")
+    parser.add_argument("--compression", choices=list(ARCHIVE_SUFFIXES), default=defaults.compression)
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without touching files")
+    args = parser.parse_args()
+
+    policy = RetentionPolicy(hot_days=args.hot_days, expire_days=args.expire_days, compression=args.compression)
+    stats = apply_retention(args.logs_path, policy, dry_run=args.dry_run)
+    prefix = "🧪 Dry run: " if args.dry_run else "🗄️ "
+    print(f"{prefix}archived {stats['archived_sessions']} sessions from {stats['archived_days']} days, "
+          f"expired {stats['expired_sessions']} sessions from {stats['expired_days']} days")
+    print(f"📚 Memory entries kept: {stats['entries_kept']} ({stats['duplicates_dropped']} duplicates dropped)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import json
+import tempfile
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+import memory.semantic_index as semantic_index
+from memory.manifest import MANIFEST_SUFFIX, MEMORY_ENTRIES_NAME, read_manifests
+from memory.memory_index import MemoryIndex, get_shared_index
+from memory.memory_search import LiveMemoryIndex
+from memory.retention import RetentionPolicy, apply_retention, sessions_in
+from memory.semantic_index import INDEX_DIRNAME, SemanticMemoryIndex
+from memory.session_events import iter_session_files, load_session_file, read_archive
+from memory.session_log import record_stored_session
+
+TODAY = date(2026, 1, 10)
+
+
+def store(base: Path, day: str, session_id: str, query: str, summary: str) -> dict:
+    """A solved session file, with its manifest record and memory-index row, as the agent stores it."""
+    data = {"session_id": session_id, "original_query": query, "query": query,
+            "state": {"original_goal_achieved": True, "result_requirement": "numeric result", "solution_summary": summary}}
+    path = base / day / f"{session_id}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data), encoding="utf-8")
+    record_stored_session(data, path, str(base))
+    return data
+
+
+def stored_ids(base: Path) -> list[str]:
+    return sorted(s["session_id"] for f in iter_session_files(base) for s in sessions_in(load_session_file(f), f))
+
+
+def test_archived_days_stay_readable():
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        store(base, "2026/01/05", "s-add", "add 2 and 3", "The sum is 5")
+        store(base, "2026/01/05", "s-mul", "multiply 4 by 6", "The product is 24")
+        store(base, "2026/01/06", "s-fact", "factorial of 5", "The factorial is 120")
+        store(base, "2026/01/09", "s-hot", "power of two", "2 to the 8 is 256")
+        before = stored_ids(base)
+
+        stats = apply_retention(base, RetentionPolicy(hot_days=3, compression="gzip"), today=TODAY)
+        assert (stats["archived_days"], stats["archived_sessions"]) == (2, 3)
+        assert not (base / "2026/01/05").exists() and (base / "2026/01/05.jsonl.gz").exists()
+        assert (base / "2026/01/09/s-hot.json").exists()
+        assert sorted(s["session_id"] for s in read_archive(base / "2026/01/05.jsonl.gz")) == ["s-add", "s-mul"]
+
+        # Every shared reader still sees the archived sessions
+        assert stored_ids(base) == before
+        assert (base / f"2026/01/05{MANIFEST_SUFFIX}").exists()
+        assert sorted(e["session_id"] for e in read_manifests(base)) == before
+        live = LiveMemoryIndex(base)
+        page, total = live.search("factorial of 5")
+        assert total == 1 and page[0]["session_id"] == "s-fact"
+        assert live.source_of("s-add") is not None
+        rebuilt = MemoryIndex(base / "rebuilt.db")
+        assert rebuilt.rebuild(base) == 4
+        assert [e["session_id"] for e in rebuilt.search("multiply")] == ["s-mul"]
+
+        # Running again leaves archives in the configured format alone
+        assert apply_retention(base, RetentionPolicy(hot_days=3, compression="gzip"), today=TODAY)["archived_days"] == 0
+
+
+def test_expiry_drops_duplicates_from_both_indexes():
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        semantic = SemanticMemoryIndex(base / INDEX_DIRNAME, embed_fn=lambda text: np.ones(8, dtype=np.float32))
+        semantic_index._shared_indexes[str(base.resolve())] = semantic
+        try:
+            sessions = [store(base, "2026/01/05", "s-old", "add 2 and 3", "The sum is 5"),
+                        store(base, "2026/01/06", "s-new", "Add 2 and  3", "the sum is 5"),
+                        store(base, "2026/01/06", "s-other", "factorial of 5", "The factorial is 120")]
+            for data in sessions:
+                semantic.add_session(data, base / f"{data['session_id']}.json")
+            assert semantic.count() == 3
+
+            stats = apply_retention(base, RetentionPolicy(hot_days=1, expire_days=3, compression="gzip"), today=TODAY)
+            assert (stats["expired_days"], stats["expired_sessions"]) == (2, 3)
+            assert (stats["entries_kept"], stats["duplicates_dropped"]) == (2, 1)
+
+            assert not list(base.glob("2026*"))
+            assert list(iter_session_files(base)) == [base / MEMORY_ENTRIES_NAME]  # read like a day file
+            kept = read_archive(base / MEMORY_ENTRIES_NAME)
+            assert sorted(e["session_id"] for e in kept) == ["s-new", "s-other"]
+            assert {e["session_id"]: e["date"] for e in kept} == {"s-new": "2026-01-06", "s-other": "2026-01-06"}
+
+            assert "s-old" not in [e["session_id"] for e in get_shared_index(base).search("add 2 and 3")]
+            assert sorted(r["session_id"] for r in semantic._conn.execute("SELECT session_id FROM entries")) == ["s-new", "s-other"]
+            page, total = LiveMemoryIndex(base).search("add 2 and 3")
+            assert total == 1 and page[0]["session_id"] == "s-new"
+        finally:
+            semantic_index._shared_indexes.pop(str(base.resolve()), None)
+
+
+def test_dry_run_changes_nothing():
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        store(base, "2026/01/01", "s-add", "add 2 and 3", "The sum is 5")
+        files = sorted(p for p in base.rglob("*") if p.is_file())
+        stats = apply_retention(base, RetentionPolicy(hot_days=1, expire_days=3), today=TODAY, dry_run=True)
+        assert stats["expired_sessions"] == 1
+        assert sorted(p for p in base.rglob("*") if p.is_file()) == files
+
+
+if __name__ == "__main__":
+    test_archived_days_stay_readable()
+    test_expiry_drops_duplicates_from_both_indexes()
+    test_dry_run_changes_nothing()
+    print("✅ retention tests passed")
@@ -0,0 +1,268 @@
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import requests
+import yaml
+
+from memory.memory_index import DEFAULT_LOGS_PATH, find_memory_entry
+
+try:
+    import faiss
+except ImportError:  # faiss is optional here; brute-force NumPy search is the fallback
+    faiss = None
+
+# Same embedding endpoint and model as mcp_servers/mcp_server_2.get_embedding
+EMBED_URL = "http://localhost:11434/api/embeddings"
+EMBED_MODEL = "nomic-embed-text"
+INDEX_DIRNAME = "semantic_index"
+PROFILE_YAML = Path(__file__).parent.parent / "config" / "profiles.yaml"
+
+
+def get_embedding(text: str) -> np.ndarray:
+    result = requests.post(EMBED_URL, json={"model": EMBED_MODEL, "prompt": text}, timeout=60)
+    result.raise_for_status()
+    return np.array(result.json()["embedding"], dtype=np.float32)
+
+
+def entry_text(query: str, solution_summary: str) -> str:
+    return f"{query}\n{solution_summary}"
+
+
+def normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticMemoryIndex:
+    """
+    Embedding index of memory entries, stored next to the session logs.
+
+    Entries (query + solution summary) are embedded with the same Ollama model as the
+    document RAG server. Embeddings are cached in SQLite by content hash, so unchanged
+    entries are never re-embedded. Vectors live in a FAISS inner-product index over
+    unit vectors (cosine similarity) that is updated incrementally. When faiss is not
+    installed, a NumPy matrix is used instead.
+    """
+
+    def __init__(self, path: str | Path = Path(DEFAULT_LOGS_PATH) / INDEX_DIRNAME,
+                 embed_fn: Callable[[str], np.ndarray] = get_embedding, model: str = EMBED_MODEL):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.embed_fn = embed_fn
+        self.model = model
+        self.index_file = self.path / "index.faiss"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path / "entries.db"), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                content_hash TEXT PRIMARY KEY,
+                vector BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT UNIQUE NOT NULL,
+                file TEXT NOT NULL,
+                query TEXT NOT NULL,
+                result_requirement TEXT NOT NULL,
+                solution_summary TEXT NOT NULL,
+                content_hash TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+        self._index = None
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: Optional[np.ndarray] = None
+        self._load_vectors()
+
+    # ------------------------------------------------------------------
+    # Embeddings
+    # ------------------------------------------------------------------
+
+    def content_hash(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\n{text}".encode("utf-8")).hexdigest()
+
+    def embed(self, text: str) -> np.ndarray:
+        """Unit-length embedding for text, served from the content-hash cache when possible."""
+        key = self.content_hash(text)
+        with self._lock:
+            row = self._conn.execute("SELECT vector FROM embedding_cache WHERE content_hash = ?", (key,)).fetchone()
+        if row is not None:
+            return np.frombuffer(row["vector"], dtype=np.float32)
+        vector = normalize(np.asarray(self.embed_fn(text), dtype=np.float32))
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO embedding_cache VALUES (?, ?)", (key, vector.tobytes()))
+            self._conn.commit()
+        return vector
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+
+    def _vectors_by_id(self) -> tuple[np.ndarray, Optional[np.ndarray]]:
+        rows = self._conn.execute(
+            "SELECT e.id, c.vector FROM entries e JOIN embedding_cache c ON c.content_hash = e.content_hash ORDER BY e.id"
+        ).fetchall()
+        if not rows:
+            return np.empty(0, dtype=np.int64), None
+        ids = np.array([r["id"] for r in rows], dtype=np.int64)
+        return ids, np.vstack([np.frombuffer(r["vector"], dtype=np.float32) for r in rows])
+
+    def _load_vectors(self):
+        with self._lock:
+            ids, matrix = self._vectors_by_id()
+            if faiss is None:
+                self._ids, self._matrix = ids, matrix
+                return
+            if self.index_file.exists():
+                index = faiss.read_index(str(self.index_file))
+                if index.ntotal == len(ids):
+                    self._index = index
+                    return
+            # Missing or out of sync with the entry table: rebuild from the stored vectors
+            self._index = None
+            if matrix is not None:
+                self._index = faiss.IndexIDMap(faiss.IndexFlatIP(matrix.shape[1]))
+                self._index.add_with_ids(matrix, ids)
+                faiss.write_index(self._index, str(self.index_file))
+
+    def add_entry(self, session_id: str, file: str, query: str, result_requirement: str, solution_summary: str) -> bool:
+        """Insert or update one entry. Returns False when the stored entry is already current."""
+        text = entry_text(query, solution_summary)
+        key = self.content_hash(text)
+        with self._lock:
+            row = self._conn.execute("SELECT id, content_hash FROM entries WHERE session_id = ?", (session_id,)).fetchone()
+        if row is not None and row["content_hash"] == key:
+            return False
+
+        vector = self.embed(text)
+        with self._lock:
+            if row is not None:
+                self._conn.execute("DELETE FROM entries WHERE id = ?", (row["id"],))
+            cursor = self._conn.execute(
+                "INSERT INTO entries (session_id, file, query, result_requirement, solution_summary, content_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, file, query, result_requirement, solution_summary, key),
+            )
+            self._conn.commit()
+            new_id = cursor.lastrowid
+            self._add_vector(new_id, vector, replaced_id=row["id"] if row is not None else None)
+        return True
+
+    def _add_vector(self, new_id: int, vector: np.ndarray, replaced_id: Optional[int]):
+        if faiss is None:
+            ids, matrix = self._ids, self._matrix
+            if replaced_id is not None and matrix is not None:
+                keep = ids != replaced_id
+                ids, matrix = ids[keep], matrix[keep]
+            self._ids = np.append(ids, np.int64(new_id)) if ids is not None else np.array([new_id], dtype=np.int64)
+            self._matrix = np.vstack([matrix, vector]) if matrix is not None and len(matrix) else vector[None, :]
+            return
+        if self._index is None:
+            self._index = faiss.IndexIDMap(faiss.IndexFlatIP(len(vector)))
+        if replaced_id is not None:
+            self._index.remove_ids(np.array([replaced_id], dtype=np.int64))
+        self._index.add_with_ids(vector[None, :], np.array([new_id], dtype=np.int64))
+        faiss.write_index(self._index, str(self.index_file))
+
+    def add_session(self, session_data: dict, file: str | Path) -> bool:
+        entry = find_memory_entry(session_data)
+        if entry is None:
+            return False
+        session_id = session_data.get("session_id") or Path(file).stem
+        return self.add_entry(session_id, Path(file).name, entry["query"], entry["result_requirement"], entry["solution_summary"])
+
+    def remove(self, session_ids: List[str]) -> int:
+        if not session_ids:
+            return 0
+        placeholders = ",".join("?" for _ in session_ids)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT id FROM entries WHERE session_id IN ({placeholders})", list(session_ids)).fetchall()
+            ids = np.array([r["id"] for r in rows], dtype=np.int64)
+            self._conn.execute(f"DELETE FROM entries WHERE session_id IN ({placeholders})", list(session_ids))
+            self._conn.commit()
+            if faiss is not None and self._index is not None and len(ids):
+                self._index.remove_ids(ids)
+                faiss.write_index(self._index, str(self.index_file))
+            elif self._matrix is not None and len(ids):
+                keep = ~np.isin(self._ids, ids)
+                self._ids, self._matrix = self._ids[keep], self._matrix[keep]
+        return len(ids)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def search(self, text: str, k: int = 50) -> List[tuple[Dict, float]]:
+        """Nearest entries by cosine similarity, best first."""
+        query_vector = self.embed(text)
+        with self._lock:
+            if faiss is not None:
+                if self._index is None or self._index.ntotal == 0:
+                    return []
+                sims, ids = self._index.search(query_vector[None, :], min(k, self._index.ntotal))
+                hits = [(int(i), float(s)) for i, s in zip(ids[0], sims[0]) if i != -1]
+            else:
+                if self._matrix is None or not len(self._matrix):
+                    return []
+                sims = self._matrix @ query_vector
+                top = np.argsort(-sims)[:k]
+                hits = [(int(self._ids[i]), float(sims[i])) for i in top]
+            entries = self._entries_by_id([i for i, _ in hits])
+        return [(entries[i], s) for i, s in hits if i in entries]
+
+    def similarities(self, text: str, session_ids: List[str]) -> Dict[str, float]:
+        """Cosine similarity between text and each listed entry that has a vector."""
+        if not session_ids:
+            return {}
+        query_vector = self.embed(text)
+        placeholders = ",".join("?" for _ in session_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT e.session_id, c.vector FROM entries e JOIN embedding_cache c ON c.content_hash = e.content_hash "
+                f"WHERE e.session_id IN ({placeholders})",
+                list(session_ids),
+            ).fetchall()
+        return {r["session_id"]: float(np.frombuffer(r["vector"], dtype=np.float32) @ query_vector) for r in rows}
+
+    def _entries_by_id(self, ids: List[int]) -> Dict[int, Dict]:
+        if not ids:
+            return {}
+        placeholders = ",".join("?" for _ in ids)
+        rows = self._conn.execute(
+            f"SELECT id, session_id, file, query, result_requirement, solution_summary FROM entries WHERE id IN ({placeholders})",
+            ids,
+        ).fetchall()
+        return {r["id"]: {k: r[k] for k in ("session_id", "file", "query", "result_requirement", "solution_summary")} for r in rows}
+
+
+def semantic_search_enabled(profile_path: Path = PROFILE_YAML) -> bool:
+    """profiles.yaml `memory.semantic_search`."""
+    try:
+        profile = yaml.safe_load(Path(profile_path).read_text()) or {}
+    except (OSError, yaml.YAMLError):
+        return False
+    return bool((profile.get("memory") or {}).get("semantic_search", False))
+
+
+_shared_indexes: dict[str, SemanticMemoryIndex] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_semantic_index(logs_path: str | Path = DEFAULT_LOGS_PATH) -> SemanticMemoryIndex:
+    key = str(Path(logs_path).resolve())
+    with _shared_lock:
+        if key not in _shared_indexes:
+            _shared_indexes[key] = SemanticMemoryIndex(Path(logs_path) / INDEX_DIRNAME)
+        return _shared_indexes[key]
@@ -0,0 +1,214 @@
+import io
+import gzip
+import json
+from pathlib import Path
+from datetime import date, datetime
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd archives need the optional zstandard package; gzip always works
+    zstandard = None
+
+# <session_id>.events.jsonl, next to where the compacted <session_id>.json will be written
+EVENTS_SUFFIX = ".events.jsonl"
+# Compressed per-day archives written by memory/retention.py: one session per line
+ARCHIVE_SUFFIXES = {"gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+
+class SessionEventLog:
+    """
+    Append-only JSONL log of one session's changes.
+
+    Each record() compares the session against what was already logged and appends
+    only the differences: the session header, the perception, new plan versions,
+    steps whose content changed, state changes and the agent loop's checkpoint
+    (counters and failure memory, see agent/checkpoint.py). A live update therefore costs
+    O(changed steps) instead of re-serializing and rewriting the whole session.
+    replay_events() rebuilds the to_json() form from the log.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._started = False
+        self._perception: Optional[str] = None
+        self._plans = 0
+        self._steps: dict[tuple[int, int], str] = {}
+        self._state: Optional[str] = None
+        self._checkpoint: Optional[str] = None
+
+    def record(self, session_obj) -> int:
+        """Append the session's changes since the last call. Returns the number of events written."""
+        lines = self.diff(session_obj)
+        if lines:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        return len(lines)
+
+    def diff(self, session_obj) -> list[str]:
+        """Event lines for the session's changes since the last diff (marked as logged)."""
+        lines = []
+        if not self._started:
+            lines.append(_event("session", session_id=session_obj.session_id, original_query=session_obj.original_query))
+            self._started = True
+
+        perception = session_obj.perception.to_json_text() if session_obj.perception else None
+        if perception != self._perception:
+            lines.append(f'{{"event": "perception", "perception": {perception}}}')
+            self._perception = perception
+
+        for version, plan in enumerate(session_obj.plan_versions):
+            if version >= self._plans:
+                lines.append(_event("plan", version=version, plan_text=plan["plan_text"]))
+                self._plans = version + 1
+            for position, step in enumerate(plan["steps"]):
+                serialized = step.to_json_text()  # memoized: unchanged steps cost a lookup
+                if self._steps.get((version, position)) != serialized:
+                    lines.append(f'{{"event": "step", "version": {version}, "position": {position}, "step": {serialized}}}')
+                    self._steps[(version, position)] = serialized
+
+        state = json.dumps(session_obj.state)
+        if state != self._state:
+            lines.append(f'{{"event": "state", "state": {state}}}')
+            self._state = state
+
+        if session_obj.checkpoint is not None:
+            checkpoint = json.dumps(session_obj.checkpoint)
+            if checkpoint != self._checkpoint:
+                lines.append(f'{{"event": "checkpoint", "checkpoint": {checkpoint}}}')
+                self._checkpoint = checkpoint
+        return lines
+
+
+def _event(kind: str, **fields) -> str:
+    return json.dumps({"event": kind, **fields})
+
+
+def replay_events(path: str | Path, include_runtime: bool = False) -> Optional[dict]:
+    """
+    Rebuild a session's to_json() form from its event log. A torn last line (crash
+    mid-append) is ignored. Returns None when the log has no session header.
+    include_runtime adds the full "state" and the last "checkpoint", for resuming.
+    """
+    session = None
+    state = {}
+    checkpoint = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            kind = event.get("event")
+            if kind == "session":
+                session = {"session_id": event["session_id"], "original_query": event["original_query"],
+                           "perception": None, "plan_versions": []}
+                state, checkpoint = {}, None  # a resumed run re-logs the session from its header
+            elif session is None:
+                continue
+            elif kind == "perception":
+                session["perception"] = event["perception"]
+            elif kind == "plan":
+                while len(session["plan_versions"]) <= event["version"]:
+                    session["plan_versions"].append({"plan_text": [], "steps": []})
+                session["plan_versions"][event["version"]]["plan_text"] = event["plan_text"]
+            elif kind == "step":
+                steps = session["plan_versions"][event["version"]]["steps"]
+                while len(steps) <= event["position"]:
+                    steps.append(None)
+                steps[event["position"]] = event["step"]
+            elif kind == "state":
+                state = event["state"]
+            elif kind == "checkpoint":
+                checkpoint = event["checkpoint"]
+    if session is None:
+        return None
+
+    plans = session["plan_versions"]
+    session["state_snapshot"] = {
+        "session_id": session["session_id"],
+        "query": session["original_query"],
+        "final_plan": plans[-1]["plan_text"] if plans else [],
+        "final_steps": [s for p in plans for s in p["steps"] if s and s.get("status") == "completed"],
+        "final_answer": state.get("final_answer"),
+        "confidence": state.get("confidence", 0.0),
+        "reasoning_note": state.get("reasoning_note", ""),
+    }
+    if include_runtime:
+        session["state"] = state
+        session["checkpoint"] = checkpoint
+    return session
+
+
+def open_archive(path: str | Path, mode: str = "rt"):
+    """Text stream over a .jsonl.gz or .jsonl.zst archive ("rt" or "wt")."""
+    path = Path(path)
+    if path.name.endswith(ARCHIVE_SUFFIXES["gzip"]):
+        return gzip.open(path, mode, encoding="utf-8")
+    if zstandard is None:
+        raise RuntimeError(f"zstandard is not installed; cannot open {path}")
+    raw = open(path, mode[0] + "b")
+    if mode[0] == "r":
+        stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    else:
+        stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+    return io.TextIOWrapper(stream, encoding="utf-8")
+
+
+def read_archive(path: str | Path) -> list[dict]:
+    with open_archive(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def is_archive(path: Path) -> bool:
+    return path.name.endswith(tuple(ARCHIVE_SUFFIXES.values()))
+
+
+def load_session_file(path: str | Path):
+    """Parsed content of a stored session: a JSON snapshot, a replayed event log or an archive (list)."""
+    path = Path(path)
+    if path.name.endswith(EVENTS_SUFFIX):
+        return replay_events(path)
+    if is_archive(path):
+        return read_archive(path)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def stored_day(path: Path) -> Optional[date]:
+    """Day a stored file belongs to: YYYY/MM/DD/<file> or a YYYY/MM/DD<suffix> day archive/manifest."""
+    parts = path.parts
+    candidates = [parts[-4:-1], (*parts[-3:-1], path.name[:2])] if len(parts) >= 4 else []
+    for year, month, day in candidates:
+        try:
+            return date(int(year), int(month), int(day))
+        except ValueError:
+            continue
+    return None
+
+
+def stored_timestamp(path: str | Path) -> str:
+    """
+    When a stored session file was written, for records backfilled later: its mtime if that
+    falls on the file's day, otherwise the start of the day (archives are rewritten later).
+    """
+    path = Path(path)
+    modified = datetime.fromtimestamp(path.stat().st_mtime)
+    day = stored_day(path)
+    if day is None or modified.date() == day:
+        return modified.isoformat(timespec="seconds")
+    return datetime.combine(day, datetime.min.time()).isoformat(timespec="seconds")
+
+
+def iter_session_files(base_dir: str | Path = "memory/session_logs"):
+    """Every stored session file: compacted snapshots, event logs not yet compacted and archives."""
+    base_dir = Path(base_dir)
+    snapshots = list(base_dir.rglob("*.json"))
+    compacted = {p.with_suffix("") for p in snapshots}
+    yield from snapshots
+    for events in base_dir.rglob(f"*{EVENTS_SUFFIX}"):
+        if events.with_name(events.name[: -len(EVENTS_SUFFIX)]) not in compacted:
+            yield events
+    for suffix in ARCHIVE_SUFFIXES.values():
+        # Dot-prefixed names are archives still being written
+        yield from (p for p in base_dir.rglob(f"*{suffix}") if not p.name.startswith("."))
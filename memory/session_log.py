@@ -1,16 +1,24 @@
 import json
+import threading
 from pathlib import Path
 from datetime import datetime
+from memory.memory_index import get_shared_index
+from memory.manifest import append_manifest
+from memory.session_events import EVENTS_SUFFIX, SessionEventLog
+from memory.session_writer import get_session_writer
+from memory.semantic_index import get_shared_semantic_index, semantic_search_enabled
 
 
-def get_store_path(session_id: str, base_dir: str = "memory/session_logs") -> Path:
+def get_store_path(session_id: str, base_dir: str = "memory/session_logs", create: bool = True) -> Path:
     """
     Construct the full path to the session file based on current date and session ID.
     Format: memory/session_logs/YYYY/MM/DD/<session_id>.json
+    With create=False the day directory is left to the caller (the background writer).
     """
     now = datetime.now()
     day_dir = Path(base_dir) / str(now.year) / f"{now.month:02d}" / f"{now.day:02d}"
-    day_dir.mkdir(parents=True, exist_ok=True)
+    if create:
+        day_dir.mkdir(parents=True, exist_ok=True)
     filename = f"{session_id}.json"
     return day_dir / filename
 
@@ -45,15 +53,94 @@ def append_session_to_store(session_obj, base_dir: str = "memory/session_logs")
         json.dump(session_data, f, indent=2)
 
     print(f"✅ Session stored: {store_path}")
+    record_stored_session(session_data, store_path, base_dir)
+
+
+def record_stored_session(session_data: dict, store_path: Path, base_dir: str = "memory/session_logs") -> None:
+    # The day manifest gets the precomputed memory entry, so search never re-walks the session
+    try:
+        append_manifest(session_data, store_path)
+    except Exception as e:
+        print(f"⚠️ Could not update memory manifest: {e}")
+
+    # Sessions that achieved their goal become searchable memory right away
+    try:
+        if get_shared_index(base_dir).add_session(session_data, store_path):
+            print(f"📚 Memory index updated: {simplify_session_id(session_data['session_id'])}")
+    except Exception as e:
+        print(f"⚠️ Could not update memory index: {e}")
+
+    # Embedded only when the entry text changed, so live updates don't re-embed
+    if semantic_search_enabled():
+        try:
+            if get_shared_semantic_index(base_dir).add_session(session_data, store_path):
+                print(f"🧭 Semantic index updated: {simplify_session_id(session_data['session_id'])}")
+        except Exception as e:
+            print(f"⚠️ Could not update semantic index: {e}")
+
+
+def get_events_path(session_id: str, base_dir: str = "memory/session_logs") -> Path:
+    """memory/session_logs/YYYY/MM/DD/<session_id>.events.jsonl"""
+    return get_store_path(session_id, base_dir, create=False).with_name(f"{session_id}{EVENTS_SUFFIX}")
+
+
+_event_logs: dict[str, SessionEventLog] = {}
+_event_logs_lock = threading.Lock()
 
 
 def live_update_session(session_obj, base_dir: str = "memory/session_logs") -> None:
     """
-    Update (or overwrite) the session file with latest data.
-    In per-file format, this is identical to append.
+    Queue the session's latest changes for its event log. Only the diff is computed
+    here; the append happens on the background session writer. The full snapshot is
+    written once, by compact_session_log() when the run ends.
     """
     try:
-        append_session_to_store(session_obj, base_dir)
-        print("📝 Session live-updated.")
+        with _event_logs_lock:
+            log = _event_logs.get(session_obj.session_id)
+            if log is None:
+                log = _event_logs[session_obj.session_id] = SessionEventLog(get_events_path(session_obj.session_id, base_dir))
+        get_session_writer().append(log.path, log.diff(session_obj))
     except Exception as e:
         print(f"❌ Failed to update session: {e}")
+
+
+def resume_session_log(session_obj, events_path: str | Path) -> None:
+    """
+    Continue logging a session restored from an existing event log (which may belong to
+    an earlier day). The first live update re-logs the whole session to that file.
+    """
+    with _event_logs_lock:
+        _event_logs[session_obj.session_id] = SessionEventLog(events_path)
+
+
+def release_session_log(session_obj) -> None:
+    """
+    Stop tracking a session whose run raised. Its event log stays on disk, so the
+    session can still be resumed (AgentLoop.resume) or inspected.
+    """
+    with _event_logs_lock:
+        _event_logs.pop(session_obj.session_id, None)
+
+
+def compact_session_log(session_obj, base_dir: str = "memory/session_logs") -> None:
+    """Queue the final session snapshot; once written it is indexed and the event log dropped."""
+    with _event_logs_lock:
+        log = _event_logs.pop(session_obj.session_id, None)
+    try:
+        session_data = session_obj.to_json()
+        session_data["_session_id_short"] = simplify_session_id(session_data["session_id"])
+        if log is not None:
+            # Next to its event log, which a resumed session may have started on an earlier day
+            store_path = log.path.with_name(f"{session_data['session_id']}.json")
+        else:
+            store_path = get_store_path(session_data["session_id"], base_dir, create=False)
+    except Exception as e:
+        print(f"❌ Failed to compact session: {e}")
+        return
+
+    def finish():
+        record_stored_session(session_data, store_path, base_dir)
+        if log is not None:
+            log.path.unlink(missing_ok=True)
+
+    get_session_writer().write_snapshot(store_path, session_data, on_done=finish)
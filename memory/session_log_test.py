@@ -0,0 +1,95 @@
+import json
+import tempfile
+from pathlib import Path
+
+from agent.agentSession import AgentSession, PerceptionSnapshot, Step, ToolCode
+from memory.memory_index import get_shared_index
+from memory.session_events import SessionEventLog, replay_events
+from memory.session_log import compact_session_log, get_events_path, live_update_session, release_session_log
+from memory.session_writer import get_session_writer
+
+
+def perception(goal_achieved=False, summary="Not ready yet"):
+    return PerceptionSnapshot(
+        entities=["factorial"], result_requirement="factorial of 5", original_goal_achieved=goal_achieved,
+        reasoning="r", local_goal_achieved=goal_achieved, local_reasoning="l",
+        last_tooluse_summary="None", solution_summary=summary, confidence="0.9",
+    )
+
+
+def run_session(session: AgentSession, update):
+    """Walk a session through the changes AgentLoop makes, calling update() after each one."""
+    update(session)
+    session.add_perception(perception())
+    update(session)
+    step = session.add_plan_version(["Compute factorial(5)"], [Step(
+        index=0, description="Compute factorial", type="CODE",
+        code=ToolCode(tool_name="raw_code_block", tool_arguments={"code": "return factorial(5)"}))])
+    update(session)
+    step.execution_result = {"status": "error", "error": "timeout"}
+    step.status = "completed"
+    step.perception = perception()
+    update(session)
+    retry = session.add_plan_version(["Retry", "Conclude"], [Step(
+        index=1, description="Retry factorial", type="CODE",
+        code=ToolCode(tool_name="raw_code_block", tool_arguments={"code": "return factorial(5)"}))])
+    update(session)
+    retry.execution_result = {"status": "success", "result": "120"}
+    retry.status = "completed"
+    retry.perception = perception(goal_achieved=True, summary="The factorial of 5 is 120.")
+    session.mark_complete(retry.perception, final_answer="120")
+    update(session)
+    update(session)  # nothing changed: nothing logged
+
+
+def test_replay_rebuilds_to_json():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = SessionEventLog(Path(tmp) / "s.events.jsonl")
+        counts = []
+        run_session(AgentSession("replay-test", "What is the factorial of 5?"),
+                    lambda s: counts.append(log.record(s)))
+        session = AgentSession("replay-test", "What is the factorial of 5?")
+        run_session(session, lambda s: None)
+        assert replay_events(log.path) == session.to_json()
+        assert counts[-1] == 0
+
+        # A torn last line (crash mid-append) is ignored
+        with open(log.path, "a", encoding="utf-8") as f:
+            f.write('{"event": "step", "vers')
+        assert replay_events(log.path) == session.to_json()
+
+
+def test_record_replay_compact_round_trip():
+    with tempfile.TemporaryDirectory() as tmp:
+        session = AgentSession("round-trip-test", "What is the factorial of 5?")
+        run_session(session, lambda s: live_update_session(s, tmp))
+        assert get_session_writer().flush(10)
+        events_path = get_events_path(session.session_id, tmp)
+        assert replay_events(events_path) == session.to_json()
+
+        compact_session_log(session, tmp)
+        assert get_session_writer().flush(10)
+        assert not events_path.exists()
+        snapshot = json.loads(events_path.with_name(f"{session.session_id}.json").read_text(encoding="utf-8"))
+        assert snapshot == {**session.to_json(), "_session_id_short": "round"}
+        assert [e["session_id"] for e in get_shared_index(tmp).search("factorial")] == [session.session_id]
+
+
+def test_released_session_keeps_its_event_log():
+    with tempfile.TemporaryDirectory() as tmp:
+        session = AgentSession("released-test", "What is the factorial of 5?")
+        live_update_session(session, tmp)
+        release_session_log(session)
+        assert get_session_writer().flush(10)
+        events_path = get_events_path(session.session_id, tmp)
+        assert replay_events(events_path)["session_id"] == session.session_id
+        compact_session_log(session, tmp)  # no tracked log: snapshot goes to today's directory
+        assert get_session_writer().flush(10)
+        assert events_path.exists() and events_path.with_name("released-test.json").exists()
+
+
+if __name__ == "__main__":
+    test_replay_rebuilds_to_json()
+    test_record_replay_compact_round_trip()
+    test_released_session_keeps_its_event_log()
+    print("✅ session log tests passed")
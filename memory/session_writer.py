@@ -0,0 +1,206 @@
+import os
+import json
+import queue
+import atexit
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+import yaml
+
+PROFILE_YAML = Path(__file__).parent.parent / "config" / "profiles.yaml"
+FSYNC_POLICIES = ("always", "batch", "never")
+_STOP = object()
+
+
+class _Job:
+    __slots__ = ("lines", "data", "on_done")
+
+    def __init__(self):
+        self.lines: list[str] = []
+        self.data: Optional[dict] = None
+        self.on_done: list[Callable[[], None]] = []
+
+
+class SessionWriter:
+    """
+    Background writer for session logs.
+
+    Callers hand over event lines or finished snapshots and return immediately; a
+    single daemon thread does the mkdir/open/write work. Pending work is keyed by
+    file, so several updates to the same file queued behind a slow disk are coalesced
+    into one write (event lines are concatenated, only the newest snapshot is kept).
+    The queue is bounded: when it is full, submitting blocks until the writer catches up.
+
+    Snapshots are written to a temp file and renamed over the target, so a crash never
+    leaves a half-written JSON file. fsync policy:
+      always - fsync every write (and the directory after a rename)
+      batch  - fsync the files written once the queue drains
+      never  - leave flushing to the OS
+    """
+
+    def __init__(self, max_pending: int = 256, fsync: str = "batch"):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.fsync = fsync
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._pending: dict[Path, _Job] = {}
+        self._lock = threading.Lock()
+        self._known_dirs: set[Path] = set()
+        self._unsynced: set[Path] = set()
+        self.stats = {"submitted": 0, "coalesced": 0, "writes": 0, "fsyncs": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Submission (caller side)
+    # ------------------------------------------------------------------
+
+    def append(self, path: str | Path, lines: list[str]):
+        """Append lines to a JSONL file."""
+        if lines:
+            self._submit(Path(path), lambda job: job.lines.extend(lines))
+
+    def write_snapshot(self, path: str | Path, data: dict, on_done: Optional[Callable[[], None]] = None):
+        """Atomically replace path with data as JSON; on_done runs on the writer thread afterwards."""
+        def merge(job: _Job):
+            job.data = data
+            if on_done is not None:
+                job.on_done.append(on_done)
+        self._submit(Path(path), merge)
+
+    def _submit(self, path: Path, merge: Callable[[_Job], None]):
+        with self._lock:
+            self.stats["submitted"] += 1
+            job = self._pending.get(path)
+            if job is not None:
+                merge(job)
+                self.stats["coalesced"] += 1
+                return
+            job = self._pending[path] = _Job()
+            merge(job)
+        self._queue.put(path)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything submitted so far is written. Returns False on timeout."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._sync_batch()
+                return
+            if isinstance(item, threading.Event):
+                self._sync_batch()
+                item.set()
+                continue
+            with self._lock:
+                job = self._pending.pop(item)
+            try:
+                self._write(item, job)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"❌ Session write failed for {item}: {e}")
+            if self._queue.empty():
+                self._sync_batch()
+
+    def _write(self, path: Path, job: _Job):
+        if path.parent not in self._known_dirs:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._known_dirs.add(path.parent)
+
+        if job.lines:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n".join(job.lines) + "\n")
+                self._after_write(path, f)
+
+        if job.data is not None:
+            tmp = path.with_name(f".{path.name}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(job.data, f, indent=2)
+                self._after_write(path, f)
+            os.replace(tmp, path)
+            if self.fsync == "always":
+                self._fsync_dir(path.parent)
+        self.stats["writes"] += 1
+
+        for callback in job.on_done:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️ Session write callback failed for {path}: {e}")
+
+    def _after_write(self, path: Path, f):
+        if self.fsync == "always":
+            f.flush()
+            os.fsync(f.fileno())
+            self.stats["fsyncs"] += 1
+        elif self.fsync == "batch":
+            self._unsynced.add(path)
+
+    def _sync_batch(self):
+        for path in self._unsynced:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                os.fsync(fd)
+                self.stats["fsyncs"] += 1
+            finally:
+                os.close(fd)
+        for directory in {p.parent for p in self._unsynced}:
+            self._fsync_dir(directory)
+        self._unsynced.clear()
+
+    @staticmethod
+    def _fsync_dir(directory: Path):
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass  # not supported on every platform/filesystem
+        finally:
+            os.close(fd)
+
+
+def load_writer_config(profile_path: Path = PROFILE_YAML) -> dict:
+    """profiles.yaml `memory.session_writer`."""
+    try:
+        profile = yaml.safe_load(Path(profile_path).read_text()) or {}
+    except (OSError, yaml.YAMLError):
+        return {}
+    return (profile.get("memory") or {}).get("session_writer") or {}
+
+
+_writer: Optional[SessionWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_session_writer() -> SessionWriter:
+    """Process-wide writer; flushed and stopped at interpreter exit."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            config = load_writer_config()
+            _writer = SessionWriter(
+                max_pending=int(config.get("max_pending", 256)),
+                fsync=config.get("fsync", "batch"),
+            )
+            atexit.register(_writer.close)
+        return _writer
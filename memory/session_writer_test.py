@@ -0,0 +1,107 @@
+import json
+import tempfile
+import threading
+from pathlib import Path
+
+from memory.session_writer import SessionWriter
+
+
+def blocked(writer: SessionWriter, tmp: Path) -> threading.Event:
+    """Occupy the writer thread until the returned event is set, so submissions pile up."""
+    started, release = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    writer.write_snapshot(tmp / "blocker.json", {}, on_done=hold)
+    assert started.wait(5)
+    return release
+
+
+def test_coalesced_appends_keep_submission_order():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        writer = SessionWriter()
+        release = blocked(writer, tmp)
+        log = tmp / "day" / "session.events.jsonl"
+        for i in range(5):
+            writer.append(log, [f"a{i}", f"b{i}"])
+        writer.append(tmp / "other.jsonl", ["x"])
+        assert writer.stats["coalesced"] == 4
+        release.set()
+        writer.append(log, ["after"])  # a new job once the coalesced one is taken
+        assert writer.flush(5)
+        expected = [f"{p}{i}" for i in range(5) for p in "ab"] + ["after"]
+        assert log.read_text(encoding="utf-8").splitlines() == expected
+        assert (tmp / "other.jsonl").read_text(encoding="utf-8") == "x\n"
+        writer.close()
+
+
+def test_coalesced_snapshots_keep_the_newest_and_run_every_callback():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        writer = SessionWriter(fsync="always")
+        release = blocked(writer, tmp)
+        done = []
+        for i in range(3):
+            writer.write_snapshot(tmp / "session.json", {"version": i}, on_done=lambda i=i: done.append(i))
+        release.set()
+        assert writer.flush(5)
+        assert json.loads((tmp / "session.json").read_text(encoding="utf-8")) == {"version": 2}
+        assert done == [0, 1, 2]
+        assert not list(tmp.glob(".*.tmp"))
+        assert writer.stats["fsyncs"] >= 1
+        writer.close()
+
+
+def test_failing_callback_and_write_do_not_stop_later_writes():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        writer = SessionWriter()
+
+        def fail():
+            raise RuntimeError("callback failed")
+
+        writer.write_snapshot(tmp / "first.json", {"n": 1}, on_done=fail)
+        (tmp / "not_a_dir").write_text("")
+        writer.append(tmp / "not_a_dir" / "log.jsonl", ["lost"])  # parent is a file: the write fails
+        writer.append(tmp / "log.jsonl", ["kept"])
+        assert writer.flush(5)
+        assert json.loads((tmp / "first.json").read_text(encoding="utf-8")) == {"n": 1}
+        assert (tmp / "log.jsonl").read_text(encoding="utf-8") == "kept\n"
+        assert writer.stats["errors"] == 1
+        writer.close()
+
+
+def test_close_drains_the_queue():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        writer = SessionWriter(max_pending=4, fsync="never")
+        for i in range(50):
+            writer.append(tmp / f"log{i % 7}.jsonl", [str(i)])
+        writer.close()
+        assert not writer._thread.is_alive()
+        lines = [int(line) for i in range(7) for line in (tmp / f"log{i}.jsonl").read_text(encoding="utf-8").split()]
+        assert sorted(lines) == list(range(50))
+        for i in range(7):
+            written = [int(x) for x in (tmp / f"log{i}.jsonl").read_text(encoding="utf-8").split()]
+            assert written == sorted(written)
+        writer.close()  # closing twice is a no-op
+
+
+def test_rejects_unknown_fsync_policy():
+    try:
+        SessionWriter(fsync="sometimes")
+    except ValueError:
+        return
+    raise AssertionError("expected ValueError")
+
+
+if __name__ == "__main__":
+    test_coalesced_appends_keep_submission_order()
+    test_coalesced_snapshots_keep_the_newest_and_run_every_callback()
+    test_failing_callback_and_write_do_not_stop_later_writes()
+    test_close_drains_the_queue()
+    test_rejects_unknown_fsync_policy()
+    print("✅ session writer tests passed")
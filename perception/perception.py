@@ -4,54 +4,71 @@ import uuid
 import datetime
 from pathlib import Path
 from dotenv import load_dotenv
+from llm.cache import LLMResponseCache, get_shared_cache
+from llm.prompt_governor import PromptGovernor, PERCEPTION_BUDGETS
+from llm.provider import LLMProvider, get_provider
+from llm.cascade import ModelCascade, confidence_below
+from llm.hedging import has_json_block
+from llm.schemas import PERCEPTION_SCHEMA, extract_json, parse_stats, schema_hash
 
-# Only import Google AI if API key is available
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-
-if api_key:
-    from google import genai
-    from google.genai.errors import ServerError
-    client = genai.Client(api_key=api_key)
-else:
-    # Mock client for testing when no API key is available
-    class MockClient:
-        def __init__(self):
-            self.models = MockModels()
-    
-    class MockModels:
-        def generate_content(self, model, contents):
-            return MockResponse()
-    
-    class MockResponse:
-        @property
-        def text(self):
-            return '''```json
+# Mock client for testing when no API key is available
+class MockClient:
+    offline = True  # canned answers: never cached (LLMProvider.cacheable)
+
+    def __init__(self):
+        self.models = MockModels()
+
+class MockModels:
+    def generate_content(self, model, contents):
+        return MockResponse()
+
+class MockResponse:
+    @property
+    def text(self):
+        return '''```json
 {
-    "entities": ["test"],
-    "result_requirement": "Test requirement",
-    "original_goal_achieved": false,
-    "reasoning": "Test reasoning",
-    "local_goal_achieved": false,
-    "local_reasoning": "Test local reasoning",
-    "last_tooluse_summary": "Test summary",
-    "solution_summary": "Test solution",
-    "confidence": "0.8"
+"entities": ["test"],
+"result_requirement": "Test requirement",
+"original_goal_achieved": false,
+"reasoning": "Test reasoning",
+"local_goal_achieved": false,
+"local_reasoning": "Test local reasoning",
+"last_tooluse_summary": "Test summary",
+"solution_summary": "Test solution",
+"confidence": "0.8"
 }
 ```'''
-    
-    client = MockClient()
+
+
+# Fields that change on every call and must not take part in the cache key
+VOLATILE_INPUT_FIELDS = ("run_id", "timestamp")
+
 
 class Perception:
-    def __init__(self, perception_prompt_path: str, api_key: str | None = None, model: str = "gemini-2.0-flash"):
+    def __init__(self, perception_prompt_path: str, api_key: str | None = None, model: str = "gemini-2.0-flash",
+                 cache: LLMResponseCache | None = None, use_cache: bool = True, governor: PromptGovernor | None = None,
+                 provider: LLMProvider | None = None, cascade: ModelCascade | None = None,
+                 structured_output: bool = False):
         load_dotenv()
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
+        if provider is not None:
+            self.provider = provider
+        elif not self.api_key:
             print("⚠️ Warning: GEMINI_API_KEY not found. Using mock client for testing.")
-            self.client = MockClient()
+            self.provider = LLMProvider(client=MockClient())
         else:
-            self.client = genai.Client(api_key=self.api_key)
+            self.provider = get_provider(self.api_key)
+        # Canned answers from a mock or fake client must not be replayed to real runs
+        use_cache = use_cache and self.provider.cacheable
         self.perception_prompt_path = perception_prompt_path
+        self.model = model
+        self.use_cache = use_cache
+        self.cache = (cache if cache is not None else get_shared_cache()) if use_cache else None
+        self.governor = governor or PromptGovernor()
+        # Optional cheapest-first cascade; escalates on parse failure or low confidence
+        self.cascade = cascade
+        # Structured mode asks the model for schema-constrained JSON (PerceptionSnapshot fields)
+        self.structured_output = structured_output
 
     def build_perception_input(self, raw_input: str, memory: list, current_plan = "", snapshot_type: str = "user_query") -> dict:
         if memory:
@@ -77,16 +94,67 @@ class Perception:
             "current_plan" : current_plan or "Inain Query Mode, plan not created"
         }
     
-    def run(self, perception_input: dict) -> dict:
+    def normalize_output(self, output: dict) -> dict:
+        """Patch missing fields so the output always fits PerceptionSnapshot."""
+        required_fields = {
+            "entities": [],
+            "result_requirement": "No requirement specified.",
+            "original_goal_achieved": False,
+            "reasoning": "No reasoning given.",
+            "local_goal_achieved": False,
+            "local_reasoning": "No local reasoning given.",
+            "last_tooluse_summary": "None",
+            "solution_summary": "No summary.",
+            "confidence": "0.0"
+        }
+        for key, default in required_fields.items():
+            output.setdefault(key, default)
+        return output
+
+    def cascade_check(self, raw_text: str) -> str | None:
+        """Escalation reason for a cheaper cascade tier's response, or None to accept it."""
+        try:
+            output = extract_json(raw_text)
+        except ValueError:
+            return "parse_failure"
+        if confidence_below(output, self.cascade.confidence_threshold):
+            return "low_confidence"
+        return None
+
+    def cache_params(self) -> dict:
+        """Cache key material besides model and prompt: who answers and in which output mode."""
+        params = {"provider": self.provider.identity,
+                  "response_schema": schema_hash(PERCEPTION_SCHEMA if self.structured_output else None)}
+        if self.cascade is not None:
+            params["cascade"] = self.cascade.cache_identity()
+        return params
+
+    def _generate(self, full_prompt: str, cache_prompt: str, use_cache: bool) -> tuple[str, bool]:
+        """Call the model, serving repeated prompts from the response cache. Returns (text, from_cache)."""
+        if use_cache:
+            cached = self.cache.get(self.model, cache_prompt, self.cache_params())
+            if cached is not None:
+                print(f"⚡ Perception cache hit (hit rate {self.cache.hit_rate():.0%})")
+                return cached, True
+
+        schema = PERCEPTION_SCHEMA if self.structured_output else None
+        if self.cascade is not None:
+            return self.cascade.generate(full_prompt, self.cascade_check, response_schema=schema), False
+        return self.provider.generate(full_prompt, model=self.model, validate=has_json_block, response_schema=schema), False
+
+    def run(self, perception_input: dict, bypass_cache: bool = False) -> dict:
         """Run perception on given input using the specified prompt file."""
         prompt_template = Path(self.perception_prompt_path).read_text(encoding="utf-8")
+        perception_input = self.governor.govern(perception_input, PERCEPTION_BUDGETS)
         full_prompt = f"{prompt_template.strip()}\n\n```json\n{json.dumps(perception_input, indent=2)}\n```"
+        self.governor.log_prompt("Perception", full_prompt)
+        stable_input = {k: v for k, v in perception_input.items() if k not in VOLATILE_INPUT_FIELDS}
+        cache_prompt = f"{prompt_template.strip()}\n\n```json\n{json.dumps(stable_input, indent=2, sort_keys=True)}\n```"
+
+        use_cache = self.cache is not None and self.use_cache and not bypass_cache
 
         try:
-            response = self.client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=full_prompt
-            )
+            raw_text, from_cache = self._generate(full_prompt, cache_prompt, use_cache)
         except Exception as e:
             print(f"🚫 Perception LLM Error: {e}")
             return {
@@ -101,33 +169,19 @@ class Perception:
                 "confidence": "0.0"
             }
 
-        raw_text = response.text.strip()
-
         try:
-            json_block = raw_text.split("```json")[1].split("```")[0].strip()
-
-            # Minimal sanitization — no unicode decoding
-            output = json.loads(json_block)
-
-            # ✅ Patch missing fields for PerceptionSnapshot
-            required_fields = {
-                "entities": [],
-                "result_requirement": "No requirement specified.",
-                "original_goal_achieved": False,
-                "reasoning": "No reasoning given.",
-                "local_goal_achieved": False,
-                "local_reasoning": "No local reasoning given.",
-                "last_tooluse_summary": "None",
-                "solution_summary": "No summary.",
-                "confidence": "0.0"
-            }
+            # Bare JSON in structured mode, otherwise the ```json fenced block
+            output = self.normalize_output(extract_json(raw_text))
+            parse_stats.record("perception", True)
 
-            for key, default in required_fields.items():
-                output.setdefault(key, default)
+            # Only responses that parsed cleanly are worth serving again
+            if use_cache and not from_cache:
+                self.cache.put(self.model, cache_prompt, raw_text, self.cache_params())
 
             return output
 
         except Exception as e:
+            parse_stats.record("perception", False)
             print("❌ EXCEPTION IN PERCEPTION:", e)
             return {
                 "entities": [],
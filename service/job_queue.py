@@ -0,0 +1,162 @@
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+from llm.hedging import percentile
+
+DEFAULT_JOBS_PATH = "memory/service/jobs.db"
+DEFAULT_MAX_ATTEMPTS = 3
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+
+class JobQueue:
+    """
+    Persistent FIFO of agent queries in SQLite (WAL), shared by the service's workers.
+
+    A job moves queued -> running -> done | failed. claim() is a single atomic UPDATE, so
+    concurrent workers never take the same job. Each job gets its session_id when claimed;
+    jobs still "running" when the service stopped are requeued on the next start
+    (one service per jobs file) with that session_id, so the worker can resume the session.
+    A job interrupted on each of its `max_attempts` attempts (e.g. one that crashes the
+    service) is marked failed instead of being requeued again.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_JOBS_PATH, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.max_attempts = max(1, max_attempts)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA busy_timeout=5000;
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                status TEXT NOT NULL,
+                session_id TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs(finished_at);
+            """
+        )
+        self._conn.commit()
+
+    def submit(self, query: str) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, query, status, created_at) VALUES (?, ?, 'queued', ?)",
+                (job_id, query, time.time()),
+            )
+            self._conn.commit()
+        return job_id
+
+    def claim(self) -> Optional[dict]:
+        """Oldest queued job, marked running with a session_id (kept from an interrupted attempt)."""
+        with self._lock:
+            row = self._conn.execute(
+                """
+                UPDATE jobs
+                SET status = 'running', started_at = ?, attempts = attempts + 1,
+                    session_id = COALESCE(session_id, ?)
+                WHERE id = (SELECT id FROM jobs WHERE status = 'queued' AND attempts < ? ORDER BY created_at LIMIT 1)
+                RETURNING *
+                """,
+                (time.time(), str(uuid.uuid4()), self.max_attempts),
+            ).fetchone()
+            self._conn.commit()
+        return self._row(row) if row else None
+
+    def complete(self, job_id: str, result: dict[str, Any]):
+        self._finish(job_id, "done", result=json.dumps(result))
+
+    def fail(self, job_id: str, error: str):
+        self._finish(job_id, "failed", error=error)
+
+    def _finish(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def requeue_running(self) -> tuple[int, int]:
+        """
+        Put jobs left running by a stopped service back in the queue, and fail those that
+        have no attempts left (also queued ones, if max_attempts was lowered). Returns
+        (requeued, failed).
+        """
+        with self._lock:
+            failed = self._conn.execute(
+                """
+                UPDATE jobs SET status = 'failed', error = ?, finished_at = ?
+                WHERE status IN ('running', 'queued') AND attempts >= ?
+                """,
+                (f"Interrupted {self.max_attempts} times; not retried (max_attempts = {self.max_attempts})",
+                 time.time(), self.max_attempts),
+            ).rowcount
+            requeued = self._conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'").rowcount
+            self._conn.commit()
+        return requeued, failed
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def recent(self, status: Optional[str] = None, limit: int = 50) -> list[dict]:
+        """Most recent jobs first, optionally of one status."""
+        with self._lock:
+            if status:
+                rows = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)
+                ).fetchall()
+            else:
+                rows = self._conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._row(r) for r in rows]
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in JOB_STATUSES} | {status: n for status, n in rows}
+
+    def latency_stats(self, window_seconds: float = 3600) -> dict[str, Any]:
+        """Queue wait and run time percentiles of jobs finished within the window."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT created_at, started_at, finished_at FROM jobs WHERE finished_at >= ? AND started_at IS NOT NULL",
+                (time.time() - window_seconds,),
+            ).fetchall()
+        waits = [r["started_at"] - r["created_at"] for r in rows]
+        runs = [r["finished_at"] - r["started_at"] for r in rows]
+
+        def summary(values):
+            return {f"p{int(q * 100)}": round(percentile(values, q), 3) if values else None for q in (0.5, 0.95, 0.99)}
+
+        return {
+            "window_seconds": window_seconds,
+            "finished": len(rows),
+            "throughput_per_minute": round(len(rows) / (window_seconds / 60), 3),
+            "queue_wait_seconds": summary(waits),
+            "run_seconds": summary(runs),
+        }
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
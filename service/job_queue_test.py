@@ -0,0 +1,91 @@
+import tempfile
+import threading
+from pathlib import Path
+
+from service.job_queue import JobQueue
+
+
+def new_queue(tmp: str, max_attempts: int = 3) -> JobQueue:
+    return JobQueue(Path(tmp) / "jobs.db", max_attempts=max_attempts)
+
+
+def test_claim_is_fifo_and_assigns_a_session_id():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = new_queue(tmp)
+        first, second = queue.submit("first"), queue.submit("second")
+        job = queue.claim()
+        assert (job["id"], job["status"], job["attempts"]) == (first, "running", 1)
+        assert job["session_id"]
+        assert queue.claim()["id"] == second
+        assert queue.claim() is None
+
+
+def test_concurrent_claims_take_each_job_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = new_queue(tmp)
+        submitted = {queue.submit(f"query {i}") for i in range(40)}
+        # Two queues on one file: separate connections race on the same rows
+        other = new_queue(tmp)
+        claimed, lock = [], threading.Lock()
+
+        def worker(q):
+            while (job := q.claim()) is not None:
+                with lock:
+                    claimed.append(job["id"])
+
+        threads = [threading.Thread(target=worker, args=(q,)) for q in (queue, other) * 4]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sorted(claimed) == sorted(submitted)
+
+
+def test_complete_and_fail():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = new_queue(tmp)
+        done, failed = queue.submit("a"), queue.submit("b")
+        queue.claim(), queue.claim()
+        queue.complete(done, {"final_answer": "42"})
+        queue.fail(failed, "boom")
+        assert (queue.get(done)["status"], queue.get(done)["result"]) == ("done", {"final_answer": "42"})
+        assert (queue.get(failed)["status"], queue.get(failed)["error"]) == ("failed", "boom")
+        assert queue.counts() == {"queued": 0, "running": 0, "done": 1, "failed": 1}
+        assert queue.requeue_running() == (0, 0)  # finished jobs stay finished
+
+
+def test_requeue_keeps_the_session_id_until_attempts_run_out():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = new_queue(tmp, max_attempts=2)
+        job_id = queue.submit("crashes the service")
+        session_id = queue.claim()["session_id"]
+
+        assert queue.requeue_running() == (1, 0)  # restart after attempt 1
+        retry = queue.claim()
+        assert (retry["id"], retry["attempts"], retry["session_id"]) == (job_id, 2, session_id)
+
+        assert queue.requeue_running() == (0, 1)  # restart after attempt 2: no attempts left
+        job = queue.get(job_id)
+        assert job["status"] == "failed" and "max_attempts = 2" in job["error"]
+        assert queue.claim() is None
+
+
+def test_claim_skips_queued_jobs_without_attempts_left():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = new_queue(tmp, max_attempts=3)
+        job_id = queue.submit("q")
+        queue.claim()
+        queue.requeue_running()
+        lowered = new_queue(tmp, max_attempts=1)  # config lowered between restarts
+        assert lowered.claim() is None
+        assert lowered.requeue_running() == (0, 1)
+        assert lowered.get(job_id)["status"] == "failed"
+
+
+if __name__ == "__main__":
+    test_claim_is_fifo_and_assigns_a_session_id()
+    test_concurrent_claims_take_each_job_once()
+    test_complete_and_fail()
+    test_requeue_keeps_the_session_id_until_attempts_run_out()
+    test_claim_skips_queued_jobs_without_attempts_left()
+    print("✅ job queue tests passed")
@@ -0,0 +1,291 @@
+"""
+Local agent service: accepts queries over HTTP (TCP or a Unix socket), keeps them in a
+persistent SQLite job queue and runs them on a pool of async workers that share one
+AgentLoop and one MultiMCP.
+
+    python -m service.server --workers 4 --port 8765
+    python -m service.server --unix-socket /tmp/agent.sock
+    python -m service.server --offline          # fake LLM backend (config/fake_llm_fixtures.yaml)
+
+Endpoints (JSON in, JSON out):
+
+    POST /jobs                  {"query": "..."} -> 202 {"job_id", "status"}
+    GET  /jobs?status=&limit=   recent jobs, newest first
+    GET  /jobs/<id>             status, timings, session_id, result or error
+    GET  /jobs/<id>/result      200 when done, 202 while queued/running; ?wait=<seconds> long-polls
+    GET  /metrics               queue depth, busy workers, queue-wait/run-time percentiles, tool routing
+    GET  /health
+"""
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from http import HTTPStatus
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import yaml
+
+from agent.agent_loop2 import AgentLoop
+from mcp_servers.multiMCP import MultiMCP
+from llm.provider import LLMProvider
+from llm.fake_backend import FakeLLMBackend
+from service.job_queue import DEFAULT_JOBS_PATH, DEFAULT_MAX_ATTEMPTS, JOB_STATUSES, JobQueue
+
+PROFILE_YAML = Path(__file__).parent.parent / "config" / "profiles.yaml"
+MAX_BODY_BYTES = 1024 * 1024
+MAX_WAIT_SECONDS = 300
+
+
+class AgentService:
+    def __init__(self, agent, queue: JobQueue, workers: int = 4, poll_interval: float = 1.0):
+        self.agent = agent
+        self.queue = queue
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.busy = 0
+        self.started_at = time.time()
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "resumed": 0}
+        self._wakeup = asyncio.Event()
+        self._finished: dict[str, asyncio.Event] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._servers: list[asyncio.AbstractServer] = []
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self, host: Optional[str] = "127.0.0.1", port: Optional[int] = 8765,
+                    unix_socket: Optional[str] = None):
+        requeued, failed = self.queue.requeue_running()
+        if requeued:
+            print(f"♻️ Requeued {requeued} jobs interrupted by the last shutdown")
+        if failed:
+            print(f"🛑 Failed {failed} interrupted jobs after {self.queue.max_attempts} attempts")
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        if unix_socket:
+            Path(unix_socket).unlink(missing_ok=True)
+            self._servers.append(await asyncio.start_unix_server(self._handle, path=unix_socket))
+            print(f"🛰️ Agent service listening on unix:{unix_socket}")
+        if port is not None:
+            self._servers.append(await asyncio.start_server(self._handle, host, port))
+            print(f"🛰️ Agent service listening on http://{host}:{port}")
+        print(f"👷 {self.workers} workers, jobs in {self.queue.path}")
+
+    async def stop(self):
+        """Stop accepting requests and cancel workers; their jobs are requeued on the next start."""
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    async def _worker(self, number: int):
+        while True:
+            job = self.queue.claim()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self.busy += 1
+            try:
+                result = await self.run_job(job)
+                self.queue.complete(job["id"], result)
+                self.stats["completed"] += 1
+            except asyncio.CancelledError:
+                raise  # shutting down: the job stays "running" and is requeued on restart
+            except Exception as e:
+                print(f"❌ Job {job['id']} failed: {e}")
+                self.queue.fail(job["id"], str(e))
+                self.stats["failed"] += 1
+            finally:
+                self.busy -= 1
+            event = self._finished.pop(job["id"], None)
+            if event is not None:
+                event.set()
+
+    async def run_job(self, job: dict) -> dict[str, Any]:
+        """Run (or, after an interrupted attempt, resume) the job's session; each worker task has its own AgentContext."""
+        session = None
+        if job["attempts"] > 1:
+            session = await self.agent.resume(job["session_id"])
+            if session is not None:
+                self.stats["resumed"] += 1
+        if session is None:
+            session = await self.agent.run(job["query"], session_id=job["session_id"])
+        return {
+            "session_id": session.session_id,
+            "original_goal_achieved": session.state.get("original_goal_achieved", False),
+            "final_answer": session.state.get("final_answer"),
+            "solution_summary": session.state.get("solution_summary"),
+            "confidence": session.state.get("confidence"),
+            "reasoning_note": session.state.get("reasoning_note"),
+            "plan_versions": len(session.plan_versions),
+            "step_count": self.agent.step_count,
+            "retry_count": self.agent.retry_count,
+        }
+
+    def submit(self, query: str) -> str:
+        job_id = self.queue.submit(query)
+        self.stats["submitted"] += 1
+        self._wakeup.set()
+        return job_id
+
+    def metrics(self) -> dict[str, Any]:
+        counts = self.queue.counts()
+        return {
+            "queue_depth": counts["queued"],
+            "jobs": counts,
+            "workers": {"total": self.workers, "busy": self.busy, "idle": self.workers - self.busy},
+            "latency": self.queue.latency_stats(),
+            "tool_routing": self.agent.multi_mcp.routing_table(),
+            "service": {**self.stats, "uptime_seconds": round(time.time() - self.started_at, 1)},
+        }
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            method, target, _ = request_line.split(" ", 2)
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length") or 0)
+            if length > MAX_BODY_BYTES:
+                status, payload = 413, {"error": f"body larger than {MAX_BODY_BYTES} bytes"}
+            else:
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.route(method.upper(), target, body)
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            status, payload = 400, {"error": f"bad request: {e}"}
+        except Exception as e:
+            status, payload = 500, {"error": str(e)}
+
+        data = json.dumps(payload).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n")
+        try:
+            writer.write(head.encode("latin-1") + data)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def route(self, method: str, target: str, body: bytes) -> tuple[int, Any]:
+        url = urlsplit(target)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [p for p in url.path.split("/") if p]
+
+        if parts == ["health"] and method == "GET":
+            return 200, {"status": "ok", "workers": self.workers}
+        if parts == ["metrics"] and method == "GET":
+            return 200, self.metrics()
+        if parts == ["jobs"] and method == "POST":
+            try:
+                request = json.loads(body or b"{}")
+            except json.JSONDecodeError as e:
+                return 400, {"error": f"invalid JSON: {e}"}
+            query = request.get("query") if isinstance(request, dict) else None
+            if not isinstance(query, str) or not query.strip():
+                return 400, {"error": "'query' must be a non-empty string"}
+            return 202, {"job_id": self.submit(query.strip()), "status": "queued"}
+        if parts == ["jobs"] and method == "GET":
+            status = params.get("status")
+            if status and status not in JOB_STATUSES:
+                return 400, {"error": f"status must be one of {list(JOB_STATUSES)}"}
+            return 200, {"jobs": self.queue.recent(status, int(params.get("limit", 50)))}
+        if len(parts) in (2, 3) and parts[0] == "jobs" and method == "GET":
+            job = self.queue.get(parts[1])
+            if job is None:
+                return 404, {"error": f"no job {parts[1]}"}
+            if len(parts) == 2:
+                return 200, job
+            if parts[2] == "result":
+                return await self.job_result(job, float(params.get("wait", 0)))
+        return 404, {"error": f"no route for {method} {url.path}"}
+
+    async def job_result(self, job: dict, wait: float) -> tuple[int, Any]:
+        if job["status"] in ("queued", "running") and wait > 0:
+            event = self._finished.setdefault(job["id"], asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), min(wait, MAX_WAIT_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+            job = self.queue.get(job["id"])
+        body = {"job_id": job["id"], "status": job["status"], "result": job["result"], "error": job["error"]}
+        return (200 if job["status"] in ("done", "failed") else 202), body
+
+
+def load_service_config(profile_path: Path = PROFILE_YAML) -> dict:
+    """profiles.yaml `service`."""
+    try:
+        profile = yaml.safe_load(Path(profile_path).read_text()) or {}
+    except (OSError, yaml.YAMLError):
+        return {}
+    return profile.get("service") or {}
+
+
+async def build_agent(offline: bool = False):
+    """AgentLoop over the configured MCP servers, without human-in-the-loop prompts."""
+    with open("config/mcp_server_config.yaml", "r") as f:
+        configs = list((yaml.safe_load(f) or {}).get("mcp_servers", []))
+    multi_mcp = MultiMCP(server_configs=configs)
+    await multi_mcp.initialize()
+    return AgentLoop(
+        perception_prompt_path="prompts/perception_prompt.txt",
+        decision_prompt_path="prompts/decision_prompt.txt",
+        multi_mcp=multi_mcp,
+        strategy="exploratory",
+        use_llm_cache=not offline,
+        llm_provider=LLMProvider(client=FakeLLMBackend.from_yaml()) if offline else None,
+        interactive=False,
+    )
+
+
+async def serve(args):
+    agent = await build_agent(args.offline)
+    service = AgentService(agent, JobQueue(args.jobs_db, max_attempts=args.max_attempts), workers=args.workers)
+    await service.start(args.host, args.port, args.unix_socket)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.stop()
+
+
+def main():
+    config = load_service_config()
+    parser = argparse.ArgumentParser(description="Local agent service with a persistent job queue")
+    parser.add_argument("--host", default=config.get("host", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=config.get("port"),
+                        help="TCP port (default 8765 unless only --unix-socket is given)")
+    parser.add_argument("--unix-socket", default=config.get("unix_socket"))
+    parser.add_argument("--workers", type=int, default=config.get("workers", 4), help="concurrent agent sessions")
+    parser.add_argument("--jobs-db", default=config.get("jobs_db", DEFAULT_JOBS_PATH))
+    parser.add_argument("--max-attempts", type=int, default=config.get("max_attempts", DEFAULT_MAX_ATTEMPTS),
+                        help="fail a job instead of requeuing it once this many attempts were interrupted")
+    parser.add_argument("--offline", action="store_true", help="use the fake LLM backend")
+    args = parser.parse_args()
+    if args.port is None and not args.unix_socket:
+        args.port = 8765
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("👋 Agent service stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from service.job_queue import JobQueue
+from service.server import MAX_BODY_BYTES, AgentService
+
+
+class StubAgent:
+    """Answers every query at once; resume() finds only the sessions listed in `stored`."""
+
+    def __init__(self, stored=()):
+        self.stored = set(stored)
+        self.multi_mcp = SimpleNamespace(routing_table=lambda: {})
+        self.step_count = self.retry_count = 0
+        self.runs, self.resumed = [], []
+
+    def session(self, session_id, query):
+        return SimpleNamespace(session_id=session_id, plan_versions=[], original_query=query,
+                               state={"original_goal_achieved": True, "final_answer": f"answer to {query}"})
+
+    async def run(self, query, session_id=None):
+        self.runs.append(session_id)
+        return self.session(session_id, query)
+
+    async def resume(self, session_id):
+        if session_id not in self.stored:
+            return None
+        self.resumed.append(session_id)
+        return self.session(session_id, "resumed")
+
+
+def new_service(tmp, agent=None):
+    return AgentService(agent or StubAgent(), JobQueue(Path(tmp) / "jobs.db"), workers=1)
+
+
+class FakeWriter:
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+async def handle(service, raw: bytes) -> tuple[int, dict]:
+    reader = asyncio.StreamReader()
+    reader.feed_data(raw)
+    reader.feed_eof()
+    writer = FakeWriter()
+    await service._handle(reader, writer)
+    head, _, body = writer.data.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def test_routes():
+    async def main():
+        with tempfile.TemporaryDirectory() as tmp:
+            service = new_service(tmp)
+            assert await service.route("GET", "/health", b"") == (200, {"status": "ok", "workers": 1})
+
+            status, body = await service.route("POST", "/jobs", json.dumps({"query": " 2 + 2 "}).encode())
+            assert (status, body["status"]) == (202, "queued")
+            job_id = body["job_id"]
+            assert service.queue.get(job_id)["query"] == "2 + 2"
+
+            assert (await service.route("GET", f"/jobs/{job_id}/result", b""))[0] == 202
+            status, jobs = await service.route("GET", "/jobs?status=queued", b"")
+            assert status == 200 and [j["id"] for j in jobs["jobs"]] == [job_id]
+            status, metrics = await service.route("GET", "/metrics", b"")
+            assert status == 200 and metrics["queue_depth"] == 1
+
+            for body in (b"{not json", b'{"query": ""}', b'["query"]', b'{"query": 3}'):
+                assert (await service.route("POST", "/jobs", body))[0] == 400, body
+            assert (await service.route("GET", "/jobs?status=paused", b""))[0] == 400
+            assert (await service.route("GET", "/jobs/missing", b""))[0] == 404
+            assert (await service.route("GET", "/jobs/missing/result", b""))[0] == 404
+            assert (await service.route("DELETE", "/jobs", b""))[0] == 404
+            assert (await service.route("GET", "/nowhere", b""))[0] == 404
+
+    asyncio.run(main())
+
+
+def test_http_errors():
+    async def main():
+        with tempfile.TemporaryDirectory() as tmp:
+            service = new_service(tmp)
+            body = b'{"query": "hi"}'
+            status, payload = await handle(service, b"POST /jobs HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+            assert status == 202 and payload["status"] == "queued"
+
+            big = b"POST /jobs HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % (MAX_BODY_BYTES + 1)
+            assert (await handle(service, big))[0] == 413
+            assert (await handle(service, b"garbage\r\n\r\n"))[0] == 400
+            truncated = b"POST /jobs HTTP/1.1\r\nContent-Length: 50\r\n\r\n{}"
+            assert (await handle(service, truncated))[0] == 400
+            assert (await handle(service, b"GET /jobs?limit=many HTTP/1.1\r\n\r\n"))[0] == 400
+
+    asyncio.run(main())
+
+
+def test_run_job_resumes_with_the_claimed_session_id():
+    async def main():
+        with tempfile.TemporaryDirectory() as tmp:
+            agent = StubAgent()
+            service = new_service(tmp, agent)
+            job_id = service.submit("first try")
+            job = service.queue.claim()
+            result = await service.run_job(job)
+            assert result["session_id"] == job["session_id"] and agent.runs == [job["session_id"]]
+
+            service.queue.requeue_running()  # pretend the service died before completing it
+            retry = service.queue.claim()
+            agent.stored.add(retry["session_id"])
+            result = await service.run_job(retry)
+            assert retry["id"] == job_id and agent.resumed == [job["session_id"]]
+            assert result["session_id"] == job["session_id"] and service.stats["resumed"] == 1
+
+    asyncio.run(main())
+
+
+def test_worker_completes_jobs_and_wakes_result_waiters():
+    async def main():
+        with tempfile.TemporaryDirectory() as tmp:
+            service = new_service(tmp)
+            await service.start(port=None)
+            try:
+                _, body = await service.route("POST", "/jobs", b'{"query": "hello"}')
+                status, result = await service.route("GET", f"/jobs/{body['job_id']}/result?wait=5", b"")
+            finally:
+                await service.stop()
+            assert (status, result["status"]) == (200, "done")
+            assert result["result"]["final_answer"] == "answer to hello"
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    test_routes()
+    test_http_errors()
+    test_run_job_resumes_with_the_claimed_session_id()
+    test_worker_completes_jobs_and_wakes_result_waiters()
+    print("✅ service tests passed")
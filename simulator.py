@@ -4,12 +4,24 @@ import time
 import random
 from datetime import datetime
 from agent.agent_loop2 import AgentLoop
+from agent.fast_path import FastPathRouter
 from mcp_servers.multiMCP import MultiMCP
+from llm.provider import LLMProvider
+from llm.fake_backend import FakeLLMBackend
+from llm.hedging import load_hedging
+from llm.schemas import parse_stats
+import argparse
 import yaml
 
 class AgentSimulator:
-    def __init__(self, config_path="config/mcp_server_config.yaml"):
+    def __init__(self, config_path="config/mcp_server_config.yaml", fast_path: bool = True, offline: bool = False,
+                 structured_output: bool = False):
         self.config_path = config_path
+        self.fast_path = fast_path
+        self.structured_output = structured_output
+        # Offline mode answers every LLM call from the fixture-driven fake backend
+        self.offline = offline
+        self.fake_llm = FakeLLMBackend.from_yaml() if offline else None
         self.test_results = []
         self.load_test_queries()
         
@@ -74,7 +86,7 @@ class AgentSimulator:
             ]
             self.test_queries.extend(base_queries)
     
-    async def initialize_agent(self):
+    async def initialize_agent(self, interactive: bool = True):
         """Initialize the agent with MCP servers"""
         print("Initializing MCP Servers...")
         with open(self.config_path, "r") as f:
@@ -90,7 +102,12 @@ class AgentSimulator:
             perception_prompt_path="prompts/perception_prompt.txt",
             decision_prompt_path="prompts/decision_prompt.txt",
             multi_mcp=multi_mcp,
-            strategy="exploratory"
+            strategy="exploratory",
+            pre_router=FastPathRouter() if self.fast_path else None,
+            use_llm_cache=not self.offline,
+            llm_provider=LLMProvider(client=self.fake_llm, hedging=load_hedging()) if self.offline else None,
+            structured_output=self.structured_output,
+            interactive=interactive
         )
         print("✅ Agent initialized successfully")
     
@@ -149,14 +166,32 @@ class AgentSimulator:
                 "timestamp": datetime.now().isoformat()
             }
     
-    async def run_simulation(self, num_tests: int = 100, sleep_between_tests: float = 2.0):
+    async def run_simulation(self, num_tests: int = 100, sleep_between_tests: float = 2.0, concurrency: int = 1):
         """Run the full simulation"""
         print(f"🚀 Starting Agent Simulation")
         print(f"Total tests: {num_tests}")
         print(f"Sleep between tests: {sleep_between_tests}s")
         
         # Initialize agent
-        await self.initialize_agent()
+        # Concurrent tests cannot share the terminal, so they run without human-in-the-loop prompts
+        await self.initialize_agent(interactive=concurrency <= 1)
+
+        if concurrency > 1:
+            # One AgentLoop runs several sessions at once; each test task keeps its own counters
+            print(f"Concurrency: {concurrency}")
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def run_test(i):
+                async with semaphore:
+                    return await self.run_single_test(self.test_queries[i], i + 1)
+
+            self.test_results.extend(await asyncio.gather(
+                *(run_test(i) for i in range(min(num_tests, len(self.test_queries))))
+            ))
+            await self.agent.multi_mcp.shutdown()
+            await asyncio.to_thread(self.agent.multi_mcp.performance.flush)  # report every call
+            self.generate_report()
+            return
         
         # Run tests
         for i in range(min(num_tests, len(self.test_queries))):
@@ -168,6 +203,8 @@ class AgentSimulator:
             if i < num_tests - 1:  # Don't sleep after the last test
                 print(f"😴 Sleeping for {sleep_between_tests}s...")
                 await asyncio.sleep(sleep_between_tests)
+        await self.agent.multi_mcp.shutdown()
+        await asyncio.to_thread(self.agent.multi_mcp.performance.flush)  # report every call
         
         # Generate report
         self.generate_report()
@@ -210,6 +247,42 @@ class AgentSimulator:
                 if stats['total_calls'] > 0:
                     success_rate = (stats['successful_calls'] / stats['total_calls']) * 100
                     print(f"  {tool_name}: {success_rate:.1f}% success rate ({stats['total_calls']} calls)")
+
+        # LLM response cache analysis
+        if getattr(self.agent, 'llm_cache', None):
+            cache_stats = self.agent.llm_cache.stats()
+            print(f"\n⚡ LLM Cache: {cache_stats['hit_rate']*100:.1f}% hit rate "
+                  f"({cache_stats['hits']} hits / {cache_stats['misses']} misses, {cache_stats['entries']} entries)")
+
+        # Model cascade analysis
+        if getattr(self.agent, 'cascade', None):
+            print(f"\n🪜 Model Cascade:")
+            for tier, tier_stats in self.agent.cascade.stats().items():
+                print(f"  {tier}: {tier_stats['hit_rate']*100:.1f}% accepted of {tier_stats['calls']} calls, "
+                      f"avg {tier_stats['avg_latency']:.2f}s, escalations {tier_stats['escalations']}")
+
+        # LLM response parse failures
+        parse_summary = parse_stats.stats()
+        if parse_summary:
+            print(f"\n🧩 LLM JSON parse failures:")
+            for label, counts in parse_summary.items():
+                print(f"  {label}: {counts['failure_rate']*100:.1f}% ({counts['failed']} of {counts['parsed'] + counts['failed']})")
+
+        # Hedged request analysis
+        hedging = self.agent.perception.provider.hedging
+        if hedging:
+            hedge_stats = hedging.metrics()
+            if hedge_stats['p99'] is not None:
+                print(f"\n🪃 Hedging: {hedge_stats['hedged']} hedges ({hedge_stats['hedge_wins']} won, {hedge_stats['capped']} capped) "
+                      f"over {hedge_stats['calls']} calls; p99 {hedge_stats['p99']:.2f}s vs "
+                      f"{hedge_stats['p99_without_hedging']:.2f}s unhedged (-{hedge_stats['p99_reduction']:.2f}s)")
+
+        # Fake LLM backend analysis (offline mode)
+        if self.fake_llm:
+            fake_stats = self.fake_llm.stats
+            avg_latency = fake_stats['latency_total'] / fake_stats['calls'] if fake_stats['calls'] else 0.0
+            print(f"\n🧪 Fake LLM: {fake_stats['calls']} calls, avg latency {avg_latency:.2f}s, "
+                  f"{fake_stats['errors']} injected errors, {fake_stats['rate_limited']} rate-limited")
         
         # Save detailed results
         self.save_results()
@@ -228,6 +301,11 @@ class AgentSimulator:
                 "success_rate": (sum(1 for r in self.test_results if r['success']) / len(self.test_results)) * 100
             },
             "tool_performance": self.agent.tool_performance_log if hasattr(self.agent, 'tool_performance_log') else {},
+            "llm_cache": self.agent.llm_cache.stats() if getattr(self.agent, 'llm_cache', None) else {},
+            "fake_llm": self.fake_llm.stats if self.fake_llm else {},
+            "parse_stats": parse_stats.stats(),
+            "cascade": self.agent.cascade.stats() if getattr(self.agent, 'cascade', None) else {},
+            "hedging": self.agent.perception.provider.hedging.metrics() if self.agent.perception.provider.hedging else {},
             "test_results": self.test_results
         }
         
@@ -238,10 +316,19 @@ class AgentSimulator:
 
 async def main():
     """Main function to run the simulation"""
-    simulator = AgentSimulator()
-    
+    parser = argparse.ArgumentParser(description="Run the agent simulator")
+    parser.add_argument("--offline", action="store_true", help="use the fake LLM backend (config/fake_llm_fixtures.yaml)")
+    parser.add_argument("--structured", action="store_true", help="request schema-constrained JSON from the LLM")
+    parser.add_argument("--tests", type=int, default=100)
+    parser.add_argument("--sleep", type=float, default=None, help="seconds between tests (default 2.0, 0 offline)")
+    parser.add_argument("--concurrency", type=int, default=1, help="tests run at the same time (no sleep between them)")
+    args = parser.parse_args()
+
+    simulator = AgentSimulator(offline=args.offline, structured_output=args.structured)
+    sleep = args.sleep if args.sleep is not None else (0.0 if args.offline else 2.0)
+
     # Run simulation with 100 tests and 2 second sleep
-    await simulator.run_simulation(num_tests=100, sleep_between_tests=2.0)
+    await simulator.run_simulation(num_tests=args.tests, sleep_between_tests=sleep, concurrency=args.concurrency)
 
 if __name__ == "__main__":
     asyncio.run(main())